@@ -1,9 +1,17 @@
+import os
 import time
+import tempfile
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 import database as db  
-from engine_wrapper import ProfessionalTicketEngine
+from engine_loader import EngineLoader
+from batch_scheduler import TicketBatcher
+from inference_service import InferenceClient
+from metrics import REGISTRY as stage_metrics
+from lifecycle import LifecycleScheduler
+from write_behind import shared_writer
+from export import export as export_table, cli_command as export_command
 
 # 1. Initialize Database and AI Engine
 
@@ -12,14 +20,80 @@ db.init_feedback_table()
 db.init_comments_table()
 db.init_preferences_table()
 db.init_model_feedback_table() 
+
+# Auto-close, SLA breach marking and escalation run on a timer, once per process,
+# instead of on every page render
 @st.cache_resource
-def load_engine():
+def load_lifecycle():
+    return LifecycleScheduler(interval=60).start()
+lifecycle = load_lifecycle()
+
+# Optional write-behind queue (SERVICE_DESK_WRITE_BEHIND=1): inserts are grouped
+# into one commit every few ms instead of one commit per request
+writer = shared_writer()
+inserts = writer or db
+
+def flush_writes():
+    """Make queued inserts visible before st.rerun() reads them back."""
+    if writer:
+        writer.flush()
+
+def rerun_with(message):
+    """Flush, then rerun straight away; `message` is shown as a toast on the next run."""
+    flush_writes()
+    st.session_state.flash = message
+    st.rerun()
+
+# Tab 3 search shows the top matches only; ranking puts the best ones first
+SEARCH_LIMIT = 200
+# Tickets per page in the Tab 1 queue
+QUEUE_PAGE_SIZE = 25
+# st.download_button holds the file in server memory, so larger exports get the export.py command instead
+EXPORT_DOWNLOAD_MAX_MB = int(os.environ.get("EXPORT_DOWNLOAD_MAX_MB") or 50)
+
+# TICKET_WORKERS=N runs inference in N worker processes (worker_pool.py) instead of
+# in the Streamlit process; each batcher batch is then split over the workers
+WORKERS = int(os.environ.get("TICKET_WORKERS") or 0)
+
+def build_engine():
+    # Heavy imports (torch, transformers, sklearn) happen here, on the loader thread
+    if WORKERS > 0:
+        from inference_service import default_pool
+        return default_pool(WORKERS)
+    from engine_wrapper import ProfessionalTicketEngine
+    from prediction_cache import PredictionCache
     return ProfessionalTicketEngine(
         bert_path="Kaggle Dataset/models/final_bert_model",
         svm_path="Kaggle Dataset/models/svm_model.pkl",
-        tfidf_path="Kaggle Dataset/models/tfidf_vectorizer.pkl"
+        tfidf_path="Kaggle Dataset/models/tfidf_vectorizer.pkl",
+        cache=PredictionCache(max_entries=10000, ttl_seconds=7 * 24 * 3600)
     )
-engine = load_engine()
+
+# Client mode: set TICKET_SERVICE_URL (e.g. http://127.0.0.1:8765, see inference_service.py)
+# to classify through the shared inference service instead of loading models in this process
+SERVICE_URL = os.environ.get("TICKET_SERVICE_URL")
+
+# Starts loading in the background so the UI renders immediately
+@st.cache_resource
+def load_engine():
+    return EngineLoader(build_engine, warm_up=True)
+engine_loader = None if SERVICE_URL else load_engine()
+
+# One batcher per process so concurrent sessions share BERT/SVM forward passes.
+# Only the ticket-submit path calls this, so only it waits for the models.
+@st.cache_resource
+def load_batcher():
+    return TicketBatcher(engine_loader.wait(), max_batch_size=16, max_wait_ms=10, max_queue_size=256)
+
+def get_classifier():
+    if SERVICE_URL:
+        return InferenceClient(SERVICE_URL)
+    return load_batcher()
+
+# The sidebar renders on every rerun; probe the service at most every few seconds
+@st.cache_data(ttl=5, show_spinner=False)
+def service_ready():
+    return InferenceClient(SERVICE_URL).ready()
 
 # 2. Page Configuration & Styling
 # 2. Page Configuration & Styling
@@ -66,28 +140,21 @@ if 'role' not in st.session_state:
 
 def show_top_metrics():
     try:
-        # Auto-close tickets resolved for 24+ hours
-        try:
-            db.auto_close_resolved()
-        except Exception as auto_close_err:
-            pass  # Non-critical, continue anyway
-        
-        all_data = db.get_tickets()
-        # If no tickets exist, don't try to create a DataFrame
-        if not all_data:
+        # Trigger-maintained counters: a handful of rows, whatever the table size
+        counts = db.get_ticket_counts()
+        # If no tickets exist, don't try to show metrics
+        if not counts["total"]:
             st.info("System Initialized: No tickets recorded yet.")
             return
 
-        # Correct column mapping: id[0], ticket_id[1], user_id[2], user_name[3], title[4], desc[5], cat[6], priority[7], status[8], created_at[9]
-        df = pd.DataFrame(all_data, columns=['id', 'ticket_id', 'user_id', 'user_name', 'title', 'description', 'category', 'priority', 'status', 'created_at'])
-        
         # Display Metrics
+        by_status = counts["status"]
         c1, c2, c3, c4, c5 = st.columns(5)
-        c1.metric("Total Tickets", len(df))
-        c2.metric("Open Tickets", len(df[df['status'] == 'Open']))
-        c3.metric("In Progress", len(df[df['status'] == 'In Progress']))
-        c4.metric("Resolved", len(df[df['status'] == 'Resolved']))
-        c5.metric("Closed", len(df[df['status'] == 'Closed']))
+        c1.metric("Total Tickets", counts["total"])
+        c2.metric("Open Tickets", by_status.get('Open', 0))
+        c3.metric("In Progress", by_status.get('In Progress', 0))
+        c4.metric("Resolved", by_status.get('Resolved', 0))
+        c5.metric("Closed", by_status.get('Closed', 0))
         st.divider()
     except Exception as e:
         # Debug the error
@@ -118,6 +185,8 @@ if not st.session_state.role:
 
 # --- AUTHORIZED DASHBOARDS ---
 else:
+    if "flash" in st.session_state:
+        st.toast(st.session_state.pop("flash"))
     show_top_metrics()
     
     # SIDEBAR: User Info, Help & Support, Logout
@@ -126,6 +195,20 @@ else:
         st.write(f"**Role:** {st.session_state.role}")
         st.write(f"**ID:** {st.session_state.user_id}")
         
+        # AI engine readiness (models load in the background after startup)
+        if SERVICE_URL:
+            ok = service_ready()
+            st.caption(f"{'🟢' if ok else '🔴'} AI service {'ready' if ok else 'unavailable'}")
+        elif engine_loader.ready:
+            st.caption(f"🟢 AI engine ready ({engine_loader.load_seconds}s load)")
+        elif engine_loader.state == "failed":
+            st.caption("🔴 AI engine failed to load")
+            if st.button("🔄 Retry loading", key="retry_engine", use_container_width=True):
+                engine_loader.retry(force=True)
+                st.rerun()
+        else:
+            st.caption("🟡 AI engine loading...")
+        
         st.divider()
         
         # Help & Support Link
@@ -166,8 +249,18 @@ else:
         
         if st.button("Execute AI Triage", use_container_width=True):
             if t_title and t_desc:
+                if engine_loader and not engine_loader.ready:
+                    with st.spinner("⏳ Loading AI models..."):
+                        try:
+                            engine_loader.wait()
+                        except Exception as e:
+                            st.error(f"❌ AI engine failed to load: {str(e)}")
+                            st.stop()
                 with st.spinner("🤖 AI Analyzing..."):
-                    result = engine.process_ticket(t_desc)
+                    try:
+                        result = get_classifier().process_ticket(t_desc)
+                    except Exception as e:
+                        result = {"error": f"AI categorization unavailable: {str(e)}"}
                     
                     # Check for validation errors
                     if result.get('error'):
@@ -175,7 +268,8 @@ else:
                     else:
                         # SAVE TO DB - only if not in "Requires Manual Review" status with very low confidence
                         if result['confidence'] >= 20:  # Only save if somewhat relevant
-                            db.add_ticket(st.session_state.user_id, st.session_state.user_name, t_title, t_desc, result['category'], result['urgency'])
+                            inserts.add_ticket(st.session_state.user_id, st.session_state.user_name, t_title, t_desc, result['category'], result['urgency'])
+                            flush_writes()  # The history below reads it back in this same run
                             
                             # Show categorization details
                             col1, col2, col3 = st.columns(3)
@@ -223,13 +317,17 @@ else:
         st.header("🎧 Support Management Console")
         
         # Create tabs for different sections
-        tab1, tab2, tab3, tab4, tab5 = st.tabs([
+        tab_names = [
             "🎫 Support Management",
             "🔍 Search & Filter", 
             "📊 Feedback Analytics",
             "💬 Ticket Comments",
             "📈 Advanced Analytics"
-        ])
+        ]
+        if st.session_state.role == "Administrator":
+            tab_names.append("⏱️ Performance")
+        tabs = st.tabs(tab_names)
+        tab1, tab2, tab3, tab4, tab5 = tabs[:5]
         
         # ============= TAB 1: SUPPORT MANAGEMENT CONSOLE =============
         with tab1:
@@ -244,33 +342,60 @@ else:
             with col3:
                 show_archived = st.checkbox("Show Closed/Archived", value=False, key="tab1_archived")
         
-            # Fetch all tickets from the database
-            all_tickets = db.get_tickets()
+            # Filters run in SQL and only one page is fetched and rendered per rerun
+            queue_statuses = list(filter_status) + (["Closed"] if show_archived and "Closed" not in filter_status else [])
+            queue_filters = {"status": queue_statuses, "category": filter_category}
+
+            # Back to the first page whenever the filters change
+            filter_signature = (tuple(queue_statuses), tuple(filter_category))
+            if st.session_state.get("queue_filters") != filter_signature:
+                st.session_state.queue_filters = filter_signature
+                st.session_state.queue_cursor = None
+                st.session_state.queue_page = 1
+
+            page_cursor = st.session_state.queue_cursor
+            going_back = bool(page_cursor) and page_cursor[0] == "before"
+            page_rows = []
+            if queue_statuses:  # No status selected -> nothing shown
+                page_rows = db.get_tickets_page(queue_filters, limit=QUEUE_PAGE_SIZE + 1,
+                                                after=page_cursor[1] if page_cursor and not going_back else None,
+                                                before=page_cursor[1] if going_back else None)
+                if going_back and len(page_rows) <= QUEUE_PAGE_SIZE:
+                    # Walked back to the newest tickets: show the first page
+                    st.session_state.queue_cursor, st.session_state.queue_page = None, 1
+                    going_back = False
+                    page_rows = db.get_tickets_page(queue_filters, limit=QUEUE_PAGE_SIZE + 1)
+            # One extra row tells us whether a further page exists in that direction
+            if going_back:
+                filtered_tickets = page_rows[-QUEUE_PAGE_SIZE:]
+                has_next = True
+            else:
+                filtered_tickets = page_rows[:QUEUE_PAGE_SIZE]
+                has_next = len(page_rows) > QUEUE_PAGE_SIZE
+            has_prev = st.session_state.queue_page > 1
+            total_tickets = db.count_tickets()
             
-            if not all_tickets:
+            if not total_tickets:
                 st.info("No tickets currently in the system.")
             else:
-                # Apply filters
-                filtered_tickets = []
-                for t in all_tickets:
-                    # Mapping: id[0], ticket_id[1], user_id[2], user_name[3], title[4], desc[5], cat[6], priority[7], status[8], created_at[9]
-                    t_status = t[8]  # status is at index 8
-                    t_category = t[6]  # category is at index 6
-                    
-                    # Apply status filter
-                    if t_status not in filter_status and not (t_status == "Closed" and show_archived):
-                        continue
-                    
-                    # Apply category filter - if no category filter selected, show all
-                    if filter_category and t_category not in filter_category:
-                        continue
-                    
-                    filtered_tickets.append(t)
-                
                 if not filtered_tickets:
                     st.info("No tickets match the current filters.")
                 else:
-                    st.write(f"**Showing {len(filtered_tickets)} of {len(all_tickets)} tickets**")
+                    matching = db.count_tickets(queue_filters)
+                    first = (st.session_state.queue_page - 1) * QUEUE_PAGE_SIZE + 1
+                    st.write(f"**Showing {first}–{first + len(filtered_tickets) - 1} of {matching} matching tickets "
+                             f"({total_tickets} total)**")
+                    
+                    nav_prev, nav_page, nav_next = st.columns([1, 4, 1])
+                    if nav_prev.button("◀ Previous", disabled=not has_prev, key="queue_prev"):
+                        st.session_state.queue_cursor = ("before", db.page_key(filtered_tickets[0]))
+                        st.session_state.queue_page -= 1
+                        st.rerun()
+                    nav_page.caption(f"Page {st.session_state.queue_page} of {max(1, -(-matching // QUEUE_PAGE_SIZE))}")
+                    if nav_next.button("Next ▶", disabled=not has_next, key="queue_next"):
+                        st.session_state.queue_cursor = ("after", db.page_key(filtered_tickets[-1]))
+                        st.session_state.queue_page += 1
+                        st.rerun()
                     
                     # Create table header
                     cols = st.columns([0.8, 2, 2, 1, 1.2, 1.2, 1, 0.8])
@@ -353,15 +478,11 @@ else:
                         
                         if col_update.button("✓", key=f"update_{t_id}", help="Update status"):
                             db.update_status(t_id, updated_status)
-                            st.success(f"Ticket #{t_id} updated to {updated_status}!")
-                            time.sleep(0.5)
-                            st.rerun()
+                            rerun_with(f"✅ Ticket #{t_id} updated to {updated_status}!")
                         
                         if col_delete.button("🗑️", key=f"delete_{t_id}", help="Delete ticket (Admin/Support only)"):
                             db.delete_ticket(t_id)
-                            st.warning(f"Ticket #{t_id} has been deleted.")
-                            time.sleep(0.5)
-                            st.rerun()
+                            rerun_with(f"🗑️ Ticket #{t_id} has been deleted.")
                         
                         # === MODEL FEEDBACK TRACKING ===
                         with st.expander(f"🤖 Report AI Category Issue - {t_ticket_id}", expanded=False):
@@ -375,7 +496,8 @@ else:
                                                    key=f"type_{t_id}")
                             
                             if st.button("📝 Submit Feedback", key=f"submit_feedback_{t_id}"):
-                                db.add_model_feedback(t_id, t_cat, correct_cat, 0.5, feedback_type)
+                                inserts.add_model_feedback(t_id, t_cat, correct_cat, 0.5, feedback_type)
+                                flush_writes()
                                 st.success("Thank you! Feedback recorded for model retraining.")
                         
                         # === PRIORITY OVERRIDE ===
@@ -386,9 +508,7 @@ else:
                                                        key=f"priority_{t_id}")
                             if st.button("✅ Override Priority", key=f"override_priority_{t_id}"):
                                 db.update_priority(t_id, new_priority)
-                                st.success(f"Priority changed to {new_priority}")
-                                time.sleep(0.5)
-                                st.rerun()
+                                rerun_with(f"⚡ Priority changed to {new_priority}")
                         
                         st.divider()
             
@@ -397,14 +517,14 @@ else:
             col1, col2 = st.columns(2)
             
             with col1:
-                st.info("💡 **Auto-Close**: Resolved tickets automatically close after 24 hours.")
+                st.info(f"💡 **Auto-Close**: Resolved tickets automatically close {db.AUTO_CLOSE_HOURS} hours after they were resolved. "
+                        f"Tickets open longer than {db.SLA_BREACH_HOURS}h are marked as SLA breaches and escalated "
+                        f"{db.ESCALATE_AFTER_HOURS}h later.")
             
             with col2:
                 if st.button("🔄 Refresh & Auto-Close Now"):
-                    db.auto_close_resolved()
-                    st.success("Auto-close process completed!")
-                    time.sleep(0.5)
-                    st.rerun()
+                    runs = lifecycle.run_once(force=True)
+                    rerun_with("Lifecycle jobs completed: " + ", ".join(f"{r['job']} {r['rows_touched']}" for r in runs))
         
         # ============= TAB 2: SEARCH & FILTERING =============
         with tab2:
@@ -444,13 +564,15 @@ else:
             # Perform search
             if search_query or search_filters:
                 try:
-                    search_results = db.search_tickets(search_query if search_query else "", search_filters)
-                    st.success(f"Found {len(search_results)} tickets")
+                    search_results = db.search_tickets(search_query if search_query else "", search_filters,
+                                                       limit=SEARCH_LIMIT, with_snippets=True)
+                    more = "+" if len(search_results) == SEARCH_LIMIT else ""
+                    st.success(f"Found {len(search_results)}{more} tickets" + (", best matches first" if search_query else ""))
                     
                     if search_results:
-                        st.dataframe(pd.DataFrame(search_results, columns=['ID', 'Ticket ID', 'User', 'Title', 
+                        st.dataframe(pd.DataFrame(search_results, columns=['ID', 'Ticket ID', 'User ID', 'User', 'Title', 
                                                                            'Description', 'Category', 'Priority', 
-                                                                           'Status', 'Created']), use_container_width=True)
+                                                                           'Status', 'Created', 'Match']), use_container_width=True)
                 except Exception as e:
                     st.error(f"Search error: {str(e)}")
             
@@ -468,10 +590,9 @@ else:
                     if bulk_ids:
                         id_list = [int(x.strip()) for x in bulk_ids.split(",") if x.strip().isdigit()]
                         try:
-                            db.bulk_update_status(id_list, bulk_status)
-                            st.success(f"Updated {len(id_list)} tickets to '{bulk_status}'")
-                            time.sleep(0.5)
-                            st.rerun()
+                            outcome = db.bulk_update_status(id_list, bulk_status)
+                            rerun_with(f"✅ Updated {outcome['rows_touched']} tickets to '{bulk_status}' "
+                                       f"in {outcome['duration_ms']:.0f} ms")
                         except Exception as e:
                             st.error(f"Error: {str(e)}")
                 
@@ -479,38 +600,67 @@ else:
                     if bulk_ids and st.checkbox("Confirm deletion", key="confirm_delete_tab2"):
                         id_list = [int(x.strip()) for x in bulk_ids.split(",") if x.strip().isdigit()]
                         try:
-                            db.bulk_delete(id_list)
-                            st.success(f"Deleted {len(id_list)} tickets")
-                            time.sleep(0.5)
-                            st.rerun()
+                            outcome = db.bulk_delete(id_list)
+                            rerun_with(f"🗑️ Deleted {outcome['rows_touched']} tickets in {outcome['duration_ms']:.0f} ms")
                         except Exception as e:
                             st.error(f"Error: {str(e)}")
             
+            # Whole filtered set in one statement (the search text is not applied here)
+            if search_filters:
+                if st.button(f"✅ Set every ticket matching the filters above to '{bulk_status}'", key="bulk_update_filter_tab2"):
+                    try:
+                        outcome = db.bulk_update_status_where(search_filters, bulk_status)
+                        rerun_with(f"✅ Updated {outcome['rows_touched']} tickets to '{bulk_status}' "
+                                   f"in {outcome['duration_ms']:.0f} ms")
+                    except Exception as e:
+                        st.error(f"Error: {str(e)}")
+            
             # === EXPORT FUNCTIONALITY ===
             st.divider()
             st.subheader("📥 Export Data")
             
+            # Streamed to a temporary file chunk by chunk (see export.py), never held as a DataFrame.
+            # Only exports up to EXPORT_DOWNLOAD_MAX_MB are offered as a download; bigger ones get the CLI command.
+            export_format = st.radio("Format", ["CSV", "Parquet"], horizontal=True, key="export_format_tab2")
+            export_ext = export_format.lower()
+            export_mime = "text/csv" if export_ext == "csv" else "application/vnd.apache.parquet"
+            export_columns = st.multiselect("Ticket columns", list(db.EXPORT_TABLES["tickets"][1]),
+                                            default=list(db.EXPORT_TABLES["tickets"][1]), key="export_columns_tab2")
+            export_filtered = st.checkbox("Only tickets matching the filters above (search text not applied)",
+                                          key="export_filtered_tab2")
+            
+            def offer_export(table, columns, filters, label, key):
+                fd, path = tempfile.mkstemp(suffix=f".{export_ext}")
+                os.close(fd)
+                try:
+                    report = export_table(path, table, export_ext, columns, filters)
+                    st.caption(f"{report['rows']} rows in {report['elapsed_s']}s ({report['rows_per_sec']:.0f} rows/sec)")
+                    if report["bytes"] > EXPORT_DOWNLOAD_MAX_MB * 1e6:
+                        st.warning(f"The export is {report['bytes'] / 1e6:.0f} MB, over the "
+                                   f"{EXPORT_DOWNLOAD_MAX_MB} MB download limit. Run it on the server instead:")
+                        st.code(export_command(table, f"exports/{table}.{export_ext}", columns, filters), language="bash")
+                        return
+                    with open(path, "rb") as f:
+                        st.download_button(label, f.read(), f"{table}_export.{export_ext}", export_mime, key=key)
+                finally:
+                    os.remove(path)
+            
             export_col1, export_col2 = st.columns(2)
             with export_col1:
-                if st.button("📊 Export All Tickets to CSV", key="export_tickets_tab2"):
-                    try:
-                        all_tickets = db.get_tickets()
-                        df = pd.DataFrame(all_tickets, columns=['ID', 'Ticket ID', 'User ID', 'User Name', 
-                                                               'Title', 'Description', 'Category', 'Priority', 
-                                                               'Status', 'Created At'])
-                        csv = df.to_csv(index=False)
-                        st.download_button("Download Tickets CSV", csv, "tickets_export.csv", "text/csv", key="download_tickets_tab2")
-                    except Exception as e:
-                        st.error(f"Export error: {str(e)}")
+                if st.button("📊 Export Tickets", key="export_tickets_tab2"):
+                    if not export_columns:
+                        st.error("Select at least one ticket column to export")
+                    else:
+                        try:
+                            offer_export("tickets", export_columns, search_filters if export_filtered else None,
+                                         f"Download Tickets {export_format}", "download_tickets_tab2")
+                        except Exception as e:
+                            st.error(f"Export error: {str(e)}")
             
             with export_col2:
-                if st.button("📊 Export All Feedback to CSV", key="export_feedback_tab2"):
+                if st.button("📊 Export All Feedback", key="export_feedback_tab2"):
                     try:
-                        all_feedback = db.get_all_feedback()
-                        df = pd.DataFrame(all_feedback, columns=['ID', 'User ID', 'User Name', 'Email', 
-                                                                'Type', 'Message', 'Rating', 'Created At'])
-                        csv = df.to_csv(index=False)
-                        st.download_button("Download Feedback CSV", csv, "feedback_export.csv", "text/csv", key="download_feedback_tab2")
+                        offer_export("feedback", None, None, f"Download Feedback {export_format}", "download_feedback_tab2")
                     except Exception as e:
                         st.error(f"Export error: {str(e)}")
         
@@ -560,18 +710,16 @@ else:
             
             comment_col1, comment_col2 = st.columns(2)
             with comment_col1:
-                comment_ticket_id = st.text_input("Enter Ticket ID (e.g., TK000001 or ticket number)", key="comment_ticket_id_tab4", placeholder="Search by ticket ID...")
+                comment_ticket_id = st.text_input("Enter Ticket ID (e.g., TIC-250101-000042 or ticket number)", key="comment_ticket_id_tab4", placeholder="Search by ticket ID...")
             
             with comment_col2:
                 if st.button("🔍 Search Ticket", key="search_ticket_tab4"):
                     if comment_ticket_id:
-                        all_tickets = db.get_tickets()
-                        found_ticket = None
-                        for t in all_tickets:
-                            # t[1] is ticket_id
-                            if str(t[1]).lower() == str(comment_ticket_id).lower() or str(t[0]) == str(comment_ticket_id):
-                                found_ticket = t
-                                break
+                        # Indexed lookups: by ticket ID (TIC-...), or by row number
+                        lookup = comment_ticket_id.strip()
+                        found_ticket = db.get_ticket_by_ticket_id(lookup.upper())
+                        if not found_ticket and lookup.isdigit():
+                            found_ticket = db.get_ticket_by_id(int(lookup))
                         
                         if found_ticket:
                             st.session_state.selected_comment_ticket = found_ticket
@@ -591,12 +739,10 @@ else:
                 if st.button("➕ Add Comment", key="add_comment_tab4"):
                     if comment_text:
                         try:
-                            db.add_comment(ticket[0], st.session_state.user_id, 
-                                         st.session_state.user_name, comment_text, int(is_internal))
-                            st.success("Comment added!")
+                            inserts.add_comment(ticket[0], st.session_state.user_id, 
+                                              st.session_state.user_name, comment_text, int(is_internal))
                             del st.session_state.selected_comment_ticket
-                            time.sleep(0.5)
-                            st.rerun()
+                            rerun_with("💬 Comment added!")
                         except Exception as e:
                             st.error(f"Error adding comment: {str(e)}")
             else:
@@ -606,40 +752,109 @@ else:
         with tab5:
             st.subheader("📈 Advanced Analytics")
             
+            # Served from the daily rollups, so this stays fast at any table size
+            window = st.selectbox("Date Range", ["All time", "Last 7 days", "Last 30 days", "Last 90 days", "Custom"],
+                                  key="analytics_window_tab5")
+            date_from = date_to = None
+            if window == "Custom":
+                custom_range = st.date_input("From / To", value=(datetime.now().date() - timedelta(days=30), datetime.now().date()),
+                                             key="analytics_range_tab5")
+                if len(custom_range) == 2:
+                    date_from, date_to = custom_range
+            elif window != "All time":
+                date_from = datetime.now().date() - timedelta(days=int(window.split()[1]) - 1)
+            
             try:
-                all_tickets = db.get_tickets()
-                if all_tickets:
-                    df_all = pd.DataFrame(all_tickets, columns=['ID', 'Ticket ID', 'User ID', 'User Name', 
-                                                               'Title', 'Description', 'Category', 'Priority', 
-                                                               'Status', 'Created At'])
-                    
+                analytics = db.get_ticket_analytics(date_from, date_to)
+                if not analytics["total"]:
+                    st.info("No tickets in this date range.")
+                else:
+                    st.caption(f"{analytics['total']} tickets")
                     analytics_col1, analytics_col2 = st.columns(2)
                     
                     with analytics_col1:
                         st.write("**Tickets by Category:**")
-                        cat_counts = df_all['Category'].value_counts()
-                        st.bar_chart(cat_counts)
+                        st.bar_chart(pd.Series(analytics["category"], name="count"))
                     
                     with analytics_col2:
                         st.write("**Tickets by Status:**")
-                        status_counts = df_all['Status'].value_counts()
-                        st.bar_chart(status_counts)
+                        st.bar_chart(pd.Series(analytics["status"], name="count"))
                     
                     # Priority distribution
                     st.write("**Tickets by Priority:**")
-                    priority_counts = df_all['Priority'].value_counts()
-                    st.bar_chart(priority_counts)
+                    st.bar_chart(pd.Series(analytics["priority"], name="count"))
                     
                     # Time-based analysis
                     st.write("**Tickets Created Over Time:**")
-                    if df_all['Created At'].dtype == 'object':
-                        df_all['Created At'] = pd.to_datetime(df_all['Created At'], errors='coerce')
-                    df_all['Date'] = df_all['Created At'].dt.date
-                    time_series = df_all.groupby('Date').size()
+                    time_series = pd.Series(analytics["daily"], name="tickets")
+                    time_series.index = pd.to_datetime(time_series.index)
                     st.line_chart(time_series)
                     
             except Exception as e:
                 st.error(f"Analytics error: {str(e)}")
+        
+        # ============= TAB 6: PERFORMANCE (ADMIN ONLY) =============
+        if st.session_state.role == "Administrator":
+            with tabs[5]:
+                st.subheader("⏱️ Inference & Database Latency")
+                st.caption("Recent per-stage timings (rolling window of the last 1000 calls per stage, this process only)")
+                
+                summary = stage_metrics.summary()
+                if summary:
+                    perf_df = pd.DataFrame.from_dict(summary, orient="index")
+                    perf_df.index.name = "Stage"
+                    perf_df = perf_df.rename(columns={"count": "Calls (total)", "window": "Calls (window)",
+                                                      "p50_ms": "p50 (ms)", "p95_ms": "p95 (ms)",
+                                                      "p99_ms": "p99 (ms)", "per_sec": "Calls/sec"})
+                    engine_rows = perf_df[perf_df.index.str.startswith("engine.")]
+                    db_rows = perf_df[perf_df.index.str.startswith("db.")]
+                    if not engine_rows.empty:
+                        st.write("**AI Pipeline Stages:**")
+                        st.dataframe(engine_rows, use_container_width=True)
+                    if not db_rows.empty:
+                        st.write("**Database Calls:**")
+                        st.dataframe(db_rows, use_container_width=True)
+                else:
+                    st.info("No timings recorded yet.")
+                
+                # Engine-side counters
+                if engine_loader and engine_loader.ready:
+                    perf_col1, perf_col2, perf_col3 = st.columns(3)
+                    live_engine = engine_loader.wait()
+                    perf_col1.write("**Batcher:**")
+                    perf_col1.json(load_batcher().stats())
+                    if WORKERS > 0:
+                        perf_col2.write("**Worker Pool:**")
+                        perf_col2.json(live_engine.stats())
+                    else:
+                        perf_col2.write("**Cascade:**")
+                        perf_col2.json(live_engine.cascade_stats())
+                    if getattr(live_engine, "cache", None):
+                        perf_col3.write("**Prediction Cache:**")
+                        perf_col3.json(live_engine.cache.stats())
+                elif SERVICE_URL:
+                    st.info(f"AI pipeline stages run in the inference service: see {SERVICE_URL}/metrics")
+
+                # Database read cache and connection pool (this process)
+                db_col1, db_col2, db_col3 = st.columns(3)
+                db_col1.write("**Read Cache:**")
+                db_col1.json(db.cache_stats())
+                db_col2.write("**Connection Pool:**")
+                db_col2.json(db.pool_stats())
+                if writer:
+                    db_col3.write("**Write-Behind Queue:**")
+                    db_col3.json(writer.stats())
+
+                # Background lifecycle jobs (all processes, from the database)
+                lifecycle_runs = db.get_lifecycle_runs(limit=30)
+                if lifecycle_runs:
+                    st.write("**Lifecycle Job Runs:**")
+                    st.dataframe(pd.DataFrame(lifecycle_runs, columns=['Run', 'Job', 'Started', 'Rows Touched',
+                                                                       'Duration (ms)', 'Error']),
+                                 use_container_width=True, hide_index=True)
+                
+                with st.expander("Prometheus export"):
+                    st.code(stage_metrics.prometheus(), language="text")
 
 
 
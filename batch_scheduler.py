@@ -0,0 +1,151 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Cross-session request coalescer for ProfessionalTicketEngine.
+# Streamlit runs every session on its own thread; instead of each one calling
+# engine.process_ticket() and competing for CPU, submissions are queued and a
+# single worker thread runs them through engine.process_tickets() in batches.
+
+class TicketBatcher:
+    def __init__(self, engine, max_batch_size=16, max_wait_ms=10, max_queue_size=256):
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()  # Orders submits against shutdown()
+        self._stats = {
+            "submitted": 0,
+            "rejected": 0,
+            "processed": 0,
+            "batches": 0,
+            "max_batch_size_seen": 0,
+            "last_batch_size": 0,
+        }
+        self._stopped = False
+        self._worker = threading.Thread(target=self._run, name="ticket-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text, timeout=None):
+        """Queue one ticket and return a Future for its result.
+
+        Raises queue.Full if the queue stays full for `timeout` seconds
+        (immediately when timeout is 0).
+        """
+        future = Future()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            # The stop check and the put happen under the lock shutdown() takes, so nothing
+            # is queued behind the worker's final drain. Waiting for room happens outside it.
+            with self._state_lock:
+                if self._stopped:
+                    raise RuntimeError("TicketBatcher has been shut down")
+                try:
+                    self._queue.put_nowait((text, future))
+                    break
+                except queue.Full:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        with self._lock:
+                            self._stats["rejected"] += 1
+                        raise
+            with self._queue.not_full:
+                self._queue.not_full.wait(0.05 if remaining is None else min(remaining, 0.05))
+        with self._lock:
+            self._stats["submitted"] += 1
+        return future
+
+    def process_ticket(self, text, timeout=None):
+        """Drop-in replacement for engine.process_ticket() that goes through the batcher.
+
+        `timeout` covers both waiting for room in the queue (queue.Full) and for the result (TimeoutError).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        future = self.submit(text, timeout=timeout)
+        return future.result(timeout=None if deadline is None else max(0, deadline - time.monotonic()))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["avg_batch_size"] = round(stats["processed"] / stats["batches"], 2) if stats["batches"] else 0.0
+        return stats
+
+    def shutdown(self, wait=True):
+        """Stop accepting tickets; the worker finishes what is queued, then exits. Never blocks on a full queue."""
+        with self._state_lock:
+            self._stopped = True
+            try:
+                self._queue.put_nowait(None)  # Wakes an idle worker straight away
+            except queue.Full:
+                pass  # Busy worker: it sees _stopped once the queue is drained
+        if wait:
+            self._worker.join()
+
+    def _collect(self):
+        # Block for the first item, then gather more until the batch is full or max_wait expires
+        while True:
+            try:
+                first = self._queue.get(timeout=0.5)
+                break
+            except queue.Empty:
+                if self._stopped:
+                    return None
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then stop (if the marker can't be put back, _stopped still ends the loop)
+                try:
+                    self._queue.put_nowait(None)
+                except queue.Full:
+                    pass
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+
+            # Skip callers that cancelled while waiting in the queue
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                results = self.engine.process_tickets([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+
+            with self._lock:
+                self._stats["processed"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["last_batch_size"] = len(batch)
+                self._stats["max_batch_size_seen"] = max(self._stats["max_batch_size_seen"], len(batch))
+
+        # Safety net: submit() can't queue after shutdown(), but a caller must never wait forever
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(RuntimeError("TicketBatcher has been shut down"))
@@ -0,0 +1,348 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+from datetime import datetime, timedelta
+
+# End-to-end performance benchmark for the inference engine and database layer.
+# Runs offline on a CPU-only machine: when the real model weights are missing
+# (e.g. Git LFS pointers), a tiny randomly initialized DistilBERT plus a small
+# TF-IDF/SVM trained on synthetic tickets stand in, so timings reflect the
+# pipeline overhead rather than model quality. Results are written as JSON and
+# can be compared against a previous run with --compare.
+#
+#   python benchmark.py                          # inference + 1k/100k row databases
+#   python benchmark.py --db-sizes 1000 100000 1000000 --compare benchmark_results/baseline.json
+
+CATEGORIES = ['Access', 'Administrative rights', 'Hardware', 'HR Support',
+              'Internal Project', 'Miscellaneous', 'Purchase', 'Storage']
+
+CATEGORY_PHRASES = {
+    'Access': ["cannot log in to the VPN", "my password expired", "account is locked out",
+               "no access to the finance share", "MFA prompt keeps failing"],
+    'Administrative rights': ["need local admin rights", "install permission denied",
+                              "please grant elevated privileges", "admin approval to install software"],
+    'Hardware': ["laptop screen is flickering", "keyboard is broken", "docking station not detected",
+                 "printer jams on every page", "monitor shows no signal"],
+    'HR Support': ["question about my payroll", "leave balance looks wrong", "update my bank details for salary",
+                   "onboarding documents missing"],
+    'Internal Project': ["need a repository for the new project", "sprint board access for the team",
+                         "build pipeline for the internal tool", "project milestone tracking setup"],
+    'Miscellaneous': ["general question about the office", "coffee machine is making noises",
+                      "where do I find the meeting room calendar", "lost and found item"],
+    'Purchase': ["purchase order for two licenses", "quote for a new laptop", "buy an extra monitor",
+                 "renew the software subscription"],
+    'Storage': ["network drive quota is full", "cannot save files to the shared drive",
+                "need more OneDrive storage", "disk space running out on my laptop"],
+}
+FILLER = ("please help as soon as possible this started yesterday after the update and it affects "
+          "my whole team we already tried restarting and clearing the cache without success").split()
+URGENT = ["urgent", "critical", "outage", "down"]
+STATUSES = ["Open", "In Progress", "Resolved", "Closed"]
+PRIORITIES = ["High", "Standard"]
+NEEDLE, NEEDLE_ROWS = "quasar", 20
+
+
+def generate_tickets(n, seed=0, min_words=3, max_words=120):
+    """Synthetic tickets across all 8 categories and a spread of lengths.
+
+    Returns a list of (category, title, description).
+    """
+    rng = random.Random(seed)
+    tickets = []
+    for i in range(n):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        phrase = rng.choice(CATEGORY_PHRASES[category])
+        # Log-uniform length so short tickets dominate, like real intake
+        length = int(round(min_words * (max_words / min_words) ** rng.random()))
+        words = phrase.split() + rng.choices(FILLER, k=max(0, length - len(phrase.split())))
+        if rng.random() < 0.15:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(URGENT))
+        tickets.append((category, phrase.capitalize(), " ".join(words)))
+    return tickets
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def pct(p):
+        if not ordered:
+            return None
+        k = (len(ordered) - 1) * p / 100.0
+        lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+        return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+    return {
+        "n": len(ordered),
+        "p50_ms": round(pct(50) * 1000, 3) if ordered else None,
+        "p95_ms": round(pct(95) * 1000, 3) if ordered else None,
+        "p99_ms": round(pct(99) * 1000, 3) if ordered else None,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else None,
+    }
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+# --- INFERENCE ---
+def _has_real_weights(bert_path, svm_path, tfidf_path):
+    # LFS pointer files are ~130 bytes; real artifacts are far larger
+    weights = os.path.join(bert_path, "model.safetensors")
+    return all(os.path.exists(p) and os.path.getsize(p) > 4096 for p in (weights, svm_path, tfidf_path))
+
+
+def build_tiny_models(workdir, tokenizer_path, seed=0):
+    """Tiny random DistilBERT + TF-IDF/SVM trained on synthetic tickets, saved under workdir."""
+    import joblib
+    import torch
+    from transformers import AutoTokenizer, DistilBertConfig, DistilBertForSequenceClassification
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.svm import SVC
+
+    torch.manual_seed(seed)
+    bert_path = os.path.join(workdir, "tiny_bert")
+    config = DistilBertConfig(dim=64, hidden_dim=128, n_layers=2, n_heads=2, num_labels=len(CATEGORIES))
+    DistilBertForSequenceClassification(config).save_pretrained(bert_path)
+    AutoTokenizer.from_pretrained(tokenizer_path).save_pretrained(bert_path)
+
+    train = generate_tickets(800, seed=seed + 1)
+    texts = [t[2] for t in train]
+    labels = [CATEGORIES.index(t[0]) for t in train]
+    tfidf = TfidfVectorizer().fit(texts)
+    svm = SVC(kernel="linear", probability=True, random_state=seed).fit(tfidf.transform(texts), labels)
+    svm_path = os.path.join(workdir, "svm_model.pkl")
+    tfidf_path = os.path.join(workdir, "tfidf_vectorizer.pkl")
+    joblib.dump(svm, svm_path)
+    joblib.dump(tfidf, tfidf_path)
+    return bert_path, svm_path, tfidf_path
+
+
+def load_bench_engine(bert_path, svm_path, tfidf_path, workdir, **engine_kwargs):
+    from engine_wrapper import ProfessionalTicketEngine
+    model = "real"
+    if not _has_real_weights(bert_path, svm_path, tfidf_path):
+        bert_path, svm_path, tfidf_path = build_tiny_models(workdir, bert_path)
+        model = "tiny-random"
+    engine = ProfessionalTicketEngine(bert_path, svm_path, tfidf_path, **engine_kwargs)
+    engine.warm_up()
+    return engine, model
+
+
+def bench_inference(engine, n_single=200, n_batch=1024, batch_sizes=(8, 32, 128), seed=0):
+    results = {}
+    singles = [t[2] for t in generate_tickets(n_single, seed=seed)]
+    samples = []
+    start = time.perf_counter()
+    for text in singles:
+        t0 = time.perf_counter()
+        engine.process_ticket(text)
+        samples.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    results["single"] = {**percentiles(samples), "tickets_per_sec": round(len(singles) / elapsed, 1)}
+
+    texts = [t[2] for t in generate_tickets(n_batch, seed=seed + 7)]
+    for size in batch_sizes:
+        samples = []
+        start = time.perf_counter()
+        for i in range(0, len(texts), size):
+            t0 = time.perf_counter()
+            engine.process_tickets(texts[i:i + size])
+            samples.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+        results[f"batch_{size}"] = {**percentiles(samples), "tickets_per_sec": round(len(texts) / elapsed, 1)}
+    return results
+
+
+# --- DATABASE ---
+def populate_db(n_rows, seed=0, chunk=50000):
+    """Fill the configured database with n_rows synthetic tickets spread over the last 90 days."""
+    import database as db
+
+    db.init_db()
+    db.init_feedback_table()
+    db.init_comments_table()
+    db.init_preferences_table()
+    db.init_model_feedback_table()
+    tickets = generate_tickets(2000, seed=seed)
+    rng = random.Random(seed)
+    now = datetime.now()
+    for start in range(0, n_rows, chunk):
+        rows = []
+        for i in range(start, min(start + chunk, n_rows)):
+            category, title, text = tickets[i % len(tickets)]
+            if i < NEEDLE_ROWS:
+                text += f" {NEEDLE}"  # Same number of matches at every size, for the selective-search case
+            created = now - timedelta(seconds=rng.randrange(90 * 24 * 3600))
+            rows.append((f"TIC-BENCH-{i}", f"user{i % 500}", f"User {i % 500}", title, text, category,
+                         rng.choice(PRIORITIES), rng.choice(STATUSES), created))
+        with db.connection(write=True) as conn:
+            conn.executemany('''
+                INSERT INTO tickets (ticket_id, user_id, user_name, title, description, category, priority, status, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+
+
+def bench_database(n_rows, repeat=5, seed=0):
+    import database as db
+
+    populate_db(n_rows, seed=seed)
+    ids = list(range(1, min(n_rows, 500) + 1))
+    db.read_cache.enabled = False  # Time the queries themselves, not repeated cache hits
+
+    def like_scan(q):
+        with db.connection() as conn:
+            return conn.execute("SELECT id FROM tickets WHERE title LIKE ? OR description LIKE ? OR category LIKE ?",
+                                (f"%{q}%",) * 3).fetchall()
+
+    def metrics_header():
+        # Same work show_top_metrics does: read the trigger-maintained counters
+        return len(db.get_ticket_counts()["status"])
+
+    cases = {
+        "get_tickets_all": lambda: db.get_tickets(),
+        "get_tickets_user": lambda: db.get_tickets("user42"),
+        "search_tickets": lambda: db.search_tickets("printer"),
+        "search_tickets_filtered": lambda: db.search_tickets("drive", {"status": ["Open"], "category": ["Storage"]}),
+        # Full-text index: should stay flat as the table grows (bounded by matches, not rows)
+        "search_selective": lambda: db.search_tickets(NEEDLE, with_snippets=True),
+        "search_prefix_top50": lambda: db.search_tickets("print", limit=50, with_snippets=True),
+        # The old LIKE '%q%' scan, for comparison
+        "search_like_scan": lambda: like_scan(NEEDLE),
+        "metrics_header": metrics_header,
+        "analytics_all_time": lambda: db.get_ticket_analytics(),
+        "analytics_last_7d": lambda: db.get_ticket_analytics((datetime.now() - timedelta(days=6)).date()),
+        "bulk_update_status_500": lambda: db.bulk_update_status(ids, "In Progress"),
+        # Past SQLite's bound-variable limit; staged through a temp table
+        "bulk_update_status_50k": lambda: db.bulk_update_status(range(1, 50001), "Open"),
+        "bulk_update_status_where": lambda: db.bulk_update_status_where({"status": ["In Progress"],
+                                                                          "category": ["Hardware"]}, "Open"),
+        "auto_close_resolved": lambda: db.auto_close_resolved(),
+    }
+    results = {}
+    for name, fn in cases.items():
+        results[name] = percentiles(timed(fn, repeat))
+    # Whole table through the chunked export path (bounded memory, see export.py)
+    from export import export
+    with tempfile.TemporaryDirectory() as tmp:
+        results["export_csv_all"] = percentiles(timed(lambda: export(os.path.join(tmp, "t.csv")), 1))
+    results["bulk_delete_500"] = percentiles(timed(lambda: db.bulk_delete(ids), 1))
+
+    # An unchanged Streamlit rerun: the same reads again, served by the read cache
+    db.read_cache.enabled = True
+
+    def cached_rerun():
+        db.get_ticket_counts()
+        db.get_tickets_page({"status": ["Open", "In Progress"]}, limit=26)
+        db.get_ticket_analytics()
+        db.get_all_feedback()
+    cached_rerun()
+    results["cached_rerun_reads"] = percentiles(timed(cached_rerun, repeat))
+    # Hot queries that fell back to a full scan or a sort (see database.check_query_plans)
+    results["index_misses"] = [name for name, r in db.check_query_plans().items() if not r["ok"]]
+    return results
+
+
+# --- REGRESSION COMPARISON ---
+def compare(current, baseline, threshold=0.10):
+    """List metrics whose p50/p95 got more than `threshold` slower than the baseline."""
+    regressions = []
+
+    def walk(cur, base, path):
+        for key, value in cur.items():
+            if key not in base:
+                continue
+            if isinstance(value, dict):
+                walk(value, base[key], path + [key])
+            elif key in ("p50_ms", "p95_ms") and value and base[key]:
+                change = (value - base[key]) / base[key]
+                if change > threshold:
+                    regressions.append({"metric": "/".join(path + [key]), "baseline": base[key],
+                                        "current": value, "change_pct": round(change * 100, 1)})
+
+    walk(current.get("results", {}), baseline.get("results", {}), [])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark inference latency and database operations")
+    parser.add_argument("--bert-path", default="Kaggle Dataset/models/final_bert_model")
+    parser.add_argument("--svm-path", default="Kaggle Dataset/models/svm_model.pkl")
+    parser.add_argument("--tfidf-path", default="Kaggle Dataset/models/tfidf_vectorizer.pkl")
+    parser.add_argument("--db-sizes", type=int, nargs="*", default=[1000, 100000])
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions per database operation")
+    parser.add_argument("--single", type=int, default=200, help="Tickets for the single-ticket latency run")
+    parser.add_argument("--batch-total", type=int, default=1024, help="Tickets for each batched run")
+    parser.add_argument("--skip-inference", action="store_true")
+    parser.add_argument("--output", help="Result JSON path (default: benchmark_results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Baseline result JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown before flagging (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, repo_dir)
+    paths = [os.path.abspath(p) for p in (args.bert_path, args.svm_path, args.tfidf_path)]
+    output = os.path.abspath(args.output or os.path.join(
+        "benchmark_results", datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"))
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "results": {},
+    }
+
+    import database as db
+
+    workdir = tempfile.mkdtemp(prefix="ticket-bench-")
+    db_path = db.DB_PATH
+    try:
+        if not args.skip_inference:
+            engine, model = load_bench_engine(*paths, workdir)
+            report["model"] = model
+            print(f"Inference benchmark ({model} weights, backend={engine.bert_backend.name})...")
+            report["results"]["inference"] = bench_inference(engine, args.single, args.batch_total)
+
+        # Each size gets its own scratch database file
+        for n_rows in args.db_sizes:
+            db.configure(os.path.join(workdir, f"db_{n_rows}.db"))
+            print(f"Database benchmark with {n_rows:,} tickets...")
+            report["results"][f"db_{n_rows}"] = bench_database(n_rows, args.repeat)
+    finally:
+        db.configure(db_path)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["results"], indent=2))
+    print(f"Results written to {output}")
+
+    misses = {size: r["index_misses"] for size, r in report["results"].items() if r.get("index_misses")}
+    for size, names in misses.items():
+        print(f"INDEX MISS {size}: {', '.join(names)} (run python database.py for the query plans)")
+    if misses:
+        sys.exit(1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['metric']}: {r['baseline']} -> {r['current']} ms (+{r['change_pct']}%)")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
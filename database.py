@@ -1,330 +1,1486 @@
+import os
+import re
 import sqlite3
-from datetime import datetime
+import functools
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 import uuid
+from metrics import REGISTRY as metrics
+
+# --- CONNECTION POOL ---
+# Opening a connection per call is slow and, with the default rollback journal,
+# readers and writers block each other ("database is locked" under concurrent
+# sessions). Connections are opened once, tuned for WAL, and reused: a thread
+# checks one out for the duration of a call (nested calls on the same thread
+# share it) and returns it to the idle pool afterwards. Streamlit runs each
+# rerun on a fresh thread, so idle connections are pooled across threads
+# instead of being pinned to a thread that is about to exit.
+#
+# Each connection keeps sqlite3's prepared-statement cache, so the fixed
+# queries below are parsed once per connection rather than once per call.
+
+DB_PATH = os.environ.get("SERVICE_DESK_DB", "service_desk.db")
+
+PRAGMAS = {
+    "journal_mode": "WAL",      # Readers never block the writer and vice versa
+    "synchronous": "NORMAL",    # Durable at checkpoints; safe with WAL and much cheaper than FULL
+    "cache_size": -16000,       # 16 MB page cache per connection
+    "mmap_size": 134217728,     # 128 MB memory-mapped reads
+    "busy_timeout": 5000,       # Wait up to 5 s for a lock instead of failing immediately
+    "temp_store": "MEMORY",
+}
+
+
+class ConnectionPool:
+    def __init__(self, path, pragmas=None, max_idle=8, cached_statements=256):
+        self.path = path
+        self.pragmas = dict(PRAGMAS if pragmas is None else pragmas)
+        self.max_idle = max_idle
+        self.cached_statements = cached_statements
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._generation = 0
+        self._probe = None
+        self._probe_lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+
+    def _open(self):
+        # Autocommit mode: reads never hold a transaction open, writes use explicit BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    def _checkout(self):
+        with self._lock:
+            if self._idle:
+                self.reused += 1
+                return self._idle.pop(), self._generation
+            generation = self._generation
+        return self._open(), generation
+
+    def _checkin(self, conn, generation):
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        with self._lock:
+            if generation == self._generation and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(self, write=False):
+        """Yield a pooled connection. write=True wraps the block in BEGIN IMMEDIATE ... COMMIT."""
+        conn = getattr(self._local, "conn", None)
+        owner = conn is None
+        if owner:
+            conn, generation = self._checkout()
+            self._local.conn = conn
+        begun = write and not conn.in_transaction
+        try:
+            if begun:
+                # Take the write lock up front so busy_timeout applies, rather than
+                # failing on a read-to-write upgrade halfway through
+                conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            if begun:
+                conn.execute("COMMIT")
+        except BaseException:
+            if begun and conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            if owner:
+                self._local.conn = None
+                self._checkin(conn, generation)
+
+    def data_version(self):
+        """A token that changes whenever any connection commits a change to the database.
+
+        PRAGMA data_version only moves for commits made by *other* connections, so it
+        is read on a dedicated connection that never writes: every pooled writer and
+        every other process then counts as "other"."""
+        with self._probe_lock:
+            if self._probe is None:
+                self._probe = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            return self._probe.execute("PRAGMA data_version").fetchone()[0]
+
+    def close_all(self):
+        """Close idle connections. Checked-out ones are closed when returned."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._generation += 1
+        for conn in idle:
+            conn.close()
+        with self._probe_lock:
+            if self._probe is not None:
+                self._probe.close()
+                self._probe = None
+
+    def stats(self):
+        with self._lock:
+            return {"path": self.path, "opened": self.opened, "reused": self.reused, "idle": len(self._idle)}
+
+
+_pool = ConnectionPool(DB_PATH)
+
+
+def configure(path=None, **pragmas):
+    """Point the module at another database file and/or override PRAGMAs (e.g. synchronous="FULL")."""
+    global _pool, _cache_pool
+    old = _pool
+    _pool = ConnectionPool(path or old.path, {**old.pragmas, **pragmas}, old.max_idle, old.cached_statements)
+    old.close_all()
+    read_cache.clear()
+    old_cache = _cache_pool
+    _cache_pool = ConnectionPool(prediction_cache_path(_pool.path), _pool.pragmas, old.max_idle, old.cached_statements)
+    old_cache.close_all()
+
+
+def connection(write=False):
+    return _pool.connection(write)
+
+
+def close_connections():
+    _pool.close_all()
+    _cache_pool.close_all()
+
+
+def pool_stats():
+    return _pool.stats()
+
+
+# --- READ CACHE ---
+# Every Streamlit interaction reruns app.py top to bottom, re-issuing the same
+# reads against an unchanged database. Read functions decorated with
+# @cached_query keep their results in one process-wide LRU (shared by every
+# session), keyed by function and arguments. Before each lookup the cache
+# compares the pool's data_version with the one its entries were filled under;
+# any commit, from this process or another, changes it and drops every entry.
+# That check is a single PRAGMA (~5 µs), so unchanged reruns never touch the
+# tables. Cached results are shared between callers and must not be mutated.
+# @cached_query goes above @metrics.timed, so the db.* latency histograms only
+# see real queries; hits are timed together under db.read_cache_hit.
+
+class ReadCache:
+    def __init__(self, max_entries=512, max_rows=20000, enabled=True):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.max_rows = max_rows  # Larger results (e.g. a full export) are not worth pinning in memory
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _sync(self, version):
+        # Caller holds the lock
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self._version = version
+
+    def get(self, key, version):
+        with self._lock:
+            self._sync(version)
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                raise
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, version, value):
+        if isinstance(value, list) and len(value) > self.max_rows:
+            return
+        with self._lock:
+            self._sync(version)
+            if version != self._version:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "hits": self.hits, "misses": self.misses, "invalidations": self.invalidations,
+                    "hit_rate": round(self.hits / lookups, 3) if lookups else None}
+
+
+read_cache = ReadCache()
+
+
+def _freeze(value):
+    """Hashable form of a call argument (filter dicts hold lists of statuses)."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = tuple(_freeze(v) for v in value)
+        return tuple(sorted(items, key=repr)) if isinstance(value, (set, frozenset)) else items
+    return value
+
+
+def cached_query(fn):
+    """Serve `fn` from read_cache while the database is unchanged."""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def inner(*args, **kwargs):
+        local_conn = getattr(_pool._local, "conn", None)
+        if not read_cache.enabled:
+            return fn(*args, **kwargs)
+        if local_conn is not None and local_conn.in_transaction:
+            return fn(*args, **kwargs)  # Inside a write: must see its own uncommitted rows
+        try:
+            key = (name, _freeze(args), _freeze(kwargs))
+            hash(key)
+        except TypeError:
+            return fn(*args, **kwargs)  # Arguments we can't key on
+        # Read the version before the query: a commit racing with it makes the entry stale-on-arrival
+        started = time.perf_counter()
+        version = _pool.data_version()
+        try:
+            value = read_cache.get(key, version)
+        except KeyError:
+            pass
+        else:
+            metrics.observe("db.read_cache_hit", time.perf_counter() - started)
+            return value
+        value = fn(*args, **kwargs)
+        read_cache.put(key, version, value)
+        return value
+    return inner
+
+
+def cache_stats():
+    return read_cache.stats()
+
+
+# Column order of every ticket row returned by this module
+TICKET_COLUMNS = "id, ticket_id, user_id, user_name, title, description, category, priority, status, created_at"
 
 # Initialize the database and create tables
 def init_db():
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    # Requirement 2: Fields for id, title, desc, category, priority, status, and time
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS tickets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ticket_id TEXT UNIQUE,
-            user_id TEXT NOT NULL,
-            user_name TEXT,
-            title TEXT,
-            description TEXT NOT NULL,
-            category TEXT,
-            priority TEXT,
-            status TEXT DEFAULT 'Open',
-            created_at TIMESTAMP
-        )
-    ''')
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        # Requirement 2: Fields for id, title, desc, category, priority, status, and time
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS tickets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ticket_id TEXT UNIQUE,
+                user_id TEXT NOT NULL,
+                user_name TEXT,
+                title TEXT,
+                description TEXT NOT NULL,
+                category TEXT,
+                priority TEXT,
+                status TEXT DEFAULT 'Open',
+                created_at TIMESTAMP,
+                resolved_at TIMESTAMP,
+                sla_breached_at TIMESTAMP,
+                escalated_at TIMESTAMP
+            )
+        ''')
     
-    # Migration: Add missing columns for existing databases
-    cursor.execute("PRAGMA table_info(tickets)")
-    columns = [column[1] for column in cursor.fetchall()]
+        # Migration: Add missing columns for existing databases
+        cursor.execute("PRAGMA table_info(tickets)")
+        columns = [column[1] for column in cursor.fetchall()]
     
-    # Add ticket_id column if it doesn't exist
-    if 'ticket_id' not in columns:
-        try:
-            cursor.execute("ALTER TABLE tickets ADD COLUMN ticket_id TEXT")
-            # Populate existing rows with generated ticket IDs
-            cursor.execute("SELECT id, created_at FROM tickets WHERE ticket_id IS NULL")
-            rows = cursor.fetchall()
-            for row_id, created_at in rows:
-                if created_at:
-                    try:
-                        dt = datetime.strptime(str(created_at), '%Y-%m-%d %H:%M:%S.%f')
-                    except:
-                        dt = datetime.strptime(str(created_at), '%Y-%m-%d %H:%M:%S')
-                    ticket_id = f"TIC-{dt.strftime('%H%M%S')}"
-                else:
-                    ticket_id = f"TIC-{datetime.now().strftime('%H%M%S')}"
-                cursor.execute("UPDATE tickets SET ticket_id = ? WHERE id = ?", (ticket_id, row_id))
-        except Exception as e:
-            pass  # Column might already exist
+        # Add ticket_id column if it doesn't exist
+        if 'ticket_id' not in columns:
+            try:
+                cursor.execute("ALTER TABLE tickets ADD COLUMN ticket_id TEXT")
+            except Exception as e:
+                pass  # Column might already exist
+        init_ticket_id_sequence()
+        backfill_ticket_ids()
     
-    # Add title column if it doesn't exist
-    if 'title' not in columns:
-        try:
-            cursor.execute("ALTER TABLE tickets ADD COLUMN title TEXT")
-        except Exception as e:
-            pass  # Column might already exist
-    
-    conn.commit()
-    conn.close()
+        # Add title column if it doesn't exist
+        if 'title' not in columns:
+            try:
+                cursor.execute("ALTER TABLE tickets ADD COLUMN title TEXT")
+            except Exception as e:
+                pass  # Column might already exist
+
+        # Lifecycle timestamps (see LIFECYCLE JOBS)
+        for column in ('resolved_at', 'sla_breached_at', 'escalated_at'):
+            if column not in columns:
+                cursor.execute(f"ALTER TABLE tickets ADD COLUMN {column} TIMESTAMP")
+                if column == 'resolved_at':
+                    # When existing tickets were resolved is unknown; start their auto-close clock now
+                    cursor.execute("UPDATE tickets SET resolved_at = ? WHERE status = 'Resolved'", (datetime.now(),))
+
+        # Indexes matched to the hot queries (see HOT_QUERIES / check_query_plans below)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_user_created ON tickets (user_id, created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_created ON tickets (created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_status_created ON tickets (status, created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_category_created ON tickets (category, created_at)")
+
+    init_search_index()
+    init_counters_table()
+    init_daily_rollup_table()
+    init_lifecycle_tables()
+
+# --- TICKET IDS ---
+# Ticket IDs come from a sequence row bumped with UPDATE ... RETURNING inside
+# the caller's write transaction. SQLite's write lock serializes that across
+# threads and processes, so every caller gets a distinct range without
+# retries, and a bulk insert reserves its whole range in one statement.
+# Format: TIC-YYMMDD-NNNNNN (creation date + sequence number). The sequence
+# starts above the highest row id, so it can't reproduce the TIC-HHMMSS-<id>
+# IDs written by earlier bulk ingests.
+def format_ticket_id(seq, day=None):
+    return f"TIC-{(day or datetime.now()):%y%m%d}-{seq:06d}"
+
+def init_ticket_id_sequence():
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ticket_id_sequence (
+                name TEXT PRIMARY KEY,
+                next_value INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            INSERT OR IGNORE INTO ticket_id_sequence (name, next_value)
+            SELECT 'ticket', COALESCE(MAX(id), 0) + 1 FROM tickets
+        ''')
+
+@metrics.timed("db.reserve_ticket_sequence")
+def reserve_ticket_sequence(n=1):
+    """Reserve n sequence numbers and return them as a range. Called inside the inserting
+    transaction, a rollback undoes the reservation too; called on its own, the numbers
+    are simply skipped if unused."""
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE ticket_id_sequence SET next_value = next_value + ? WHERE name = 'ticket' RETURNING next_value",
+                       (n,))
+        end = cursor.fetchone()[0]
+    return range(end - n, end)
+
+@metrics.timed("db.allocate_ticket_ids")
+def allocate_ticket_ids(n=1, day=None):
+    """Reserve n new ticket IDs (see reserve_ticket_sequence)."""
+    return [format_ticket_id(seq, day) for seq in reserve_ticket_sequence(n)]
+
+def backfill_ticket_ids():
+    """Give every ticket without an ID, or sharing one with an older ticket, a fresh ID,
+    then make sure ticket_id has a unique index. Cheap when there is nothing to do."""
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        # Tables created by init_db declare ticket_id UNIQUE; ones migrated with
+        # ALTER TABLE can't, so they may hold duplicates from the old TIC-HHMMSS scheme
+        unique = any(index[2] and [c[2] for c in cursor.execute(f"PRAGMA index_info('{index[1]}')").fetchall()] == ['ticket_id']
+                     for index in cursor.execute("PRAGMA index_list(tickets)").fetchall())
+        if unique:
+            cursor.execute("SELECT id, created_at FROM tickets WHERE ticket_id IS NULL")
+        else:
+            cursor.execute('''
+                SELECT id, created_at FROM tickets t
+                WHERE ticket_id IS NULL
+                   OR EXISTS (SELECT 1 FROM tickets d WHERE d.ticket_id = t.ticket_id AND d.id < t.id)
+            ''')
+        rows = cursor.fetchall()
+        for row_id, created_at in rows:
+            try:
+                day = datetime.fromisoformat(str(created_at))
+            except ValueError:
+                day = None
+            cursor.execute("UPDATE tickets SET ticket_id = ? WHERE id = ?", (allocate_ticket_ids(1, day)[0], row_id))
+        if not unique:
+            cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_tickets_ticket_id ON tickets (ticket_id)")
+    return len(rows)
+
+TICKET_BY_TICKET_ID_SQL = f"SELECT {TICKET_COLUMNS} FROM tickets WHERE ticket_id = ?"
+
+@cached_query
+@metrics.timed("db.get_ticket_by_ticket_id")
+def get_ticket_by_ticket_id(ticket_id):
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(TICKET_BY_TICKET_ID_SQL, (ticket_id,))
+        data = cursor.fetchone()
+    return data
 
 # Save a new ticket generated by the AI
-def add_ticket(user_id, user_name, title, description, category, priority):
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    # Generate ticket ID in format TIC-HHMMSS
-    ticket_id = f"TIC-{datetime.now().strftime('%H%M%S')}"
-    # Requirement 3: Storing tickets so they don't disappear on refresh
-    cursor.execute('''
-        INSERT INTO tickets (ticket_id, user_id, user_name, title, description, category, priority, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (ticket_id, user_id, user_name, title, description, category, priority, datetime.now()))
-    conn.commit()
-    conn.close()
+@metrics.timed("db.add_ticket")
+def add_ticket(user_id, user_name, title, description, category, priority, ticket_id=None, created_at=None):
+    """Insert a ticket and return its ticket ID. ticket_id/created_at are passed by the
+    write-behind queue, which assigns both when the ticket is submitted."""
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        ticket_id = ticket_id or allocate_ticket_ids(1)[0]
+        # Requirement 3: Storing tickets so they don't disappear on refresh
+        cursor.execute('''
+            INSERT INTO tickets (ticket_id, user_id, user_name, title, description, category, priority, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (ticket_id, user_id, user_name, title, description, category, priority, created_at or datetime.now()))
     return ticket_id
 
 # Fetch tickets for a specific user or all tickets for Admin
+USER_TICKETS_SQL = f"SELECT {TICKET_COLUMNS} FROM tickets WHERE user_id = ? ORDER BY created_at DESC"
+ALL_TICKETS_SQL = f"SELECT {TICKET_COLUMNS} FROM tickets ORDER BY created_at DESC"
+
+@cached_query
+@metrics.timed("db.get_tickets")
 def get_tickets(user_id=None):
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    # Select columns in specific order: id, ticket_id, user_id, user_name, title, description, category, priority, status, created_at
-    if user_id:
-        cursor.execute("SELECT id, ticket_id, user_id, user_name, title, description, category, priority, status, created_at FROM tickets WHERE user_id = ? ORDER BY created_at DESC", (user_id,))
-    else:
-        cursor.execute("SELECT id, ticket_id, user_id, user_name, title, description, category, priority, status, created_at FROM tickets ORDER BY created_at DESC")
-    data = cursor.fetchall()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        # Select columns in specific order: id, ticket_id, user_id, user_name, title, description, category, priority, status, created_at
+        if user_id:
+            cursor.execute(USER_TICKETS_SQL, (user_id,))
+        else:
+            cursor.execute(ALL_TICKETS_SQL)
+        data = cursor.fetchall()
     return data
 
 # Requirement 4 & 6: Update Ticket Status via Dropdown
+@metrics.timed("db.update_status")
 def update_status(ticket_id, new_status):
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    cursor.execute("UPDATE tickets SET status = ? WHERE id = ?", (new_status, ticket_id))
-    conn.commit()
-    conn.close()
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE tickets SET status = ? WHERE id = ?", (new_status, ticket_id))
 
 # Delete a ticket (Admin/Support only, not General Users)
+@metrics.timed("db.delete_ticket")
 def delete_ticket(ticket_id):
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM tickets WHERE id = ?", (ticket_id,))
-    conn.commit()
-    conn.close()
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM tickets WHERE id = ?", (ticket_id,))
 
 # Auto-close resolved tickets after 24 hours
+@metrics.timed("db.auto_close_resolved")
 def auto_close_resolved():
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    # Find tickets resolved more than 24 hours ago and close them
-    cursor.execute("""
-        UPDATE tickets 
-        SET status = 'Closed' 
-        WHERE status = 'Resolved' 
-        AND datetime(created_at) <= datetime('now', '-24 hours')
-    """)
-    conn.commit()
-    conn.close()
+    return close_resolved_tickets()
 
 # Get ticket by ID
+TICKET_BY_ID_SQL = f"SELECT {TICKET_COLUMNS} FROM tickets WHERE id = ?"
+
+@cached_query
+@metrics.timed("db.get_ticket_by_id")
 def get_ticket_by_id(ticket_id):
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, ticket_id, user_id, user_name, title, description, category, priority, status, created_at FROM tickets WHERE id = ?", (ticket_id,))
-    data = cursor.fetchone()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(TICKET_BY_ID_SQL, (ticket_id,))
+        data = cursor.fetchone()
     return data
 
 # --- FEEDBACK MANAGEMENT ---
 # Create feedback table
 def init_feedback_table():
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS feedback (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT,
-            user_name TEXT,
-            email TEXT,
-            feedback_type TEXT,
-            message TEXT,
-            rating INTEGER,
-            created_at TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS feedback (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT,
+                user_name TEXT,
+                email TEXT,
+                feedback_type TEXT,
+                message TEXT,
+                rating INTEGER,
+                created_at TIMESTAMP
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_feedback_created ON feedback (created_at)")
 
 # Save feedback
-def add_feedback(user_id, user_name, email, feedback_type, message, rating):
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO feedback (user_id, user_name, email, feedback_type, message, rating, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (user_id, user_name, email, feedback_type, message, rating, datetime.now()))
-    conn.commit()
-    conn.close()
+@metrics.timed("db.add_feedback")
+def add_feedback(user_id, user_name, email, feedback_type, message, rating, created_at=None):
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO feedback (user_id, user_name, email, feedback_type, message, rating, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (user_id, user_name, email, feedback_type, message, rating, created_at or datetime.now()))
 
 # Get all feedback for admin
+ALL_FEEDBACK_SQL = "SELECT id, user_id, user_name, email, feedback_type, message, rating, created_at FROM feedback ORDER BY created_at DESC"
+
+@cached_query
+@metrics.timed("db.get_all_feedback")
 def get_all_feedback():
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, user_id, user_name, email, feedback_type, message, rating, created_at FROM feedback ORDER BY created_at DESC")
-    data = cursor.fetchall()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(ALL_FEEDBACK_SQL)
+        data = cursor.fetchall()
     return data
 
 # --- TICKET COMMENTS SYSTEM ---
 def init_comments_table():
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS ticket_comments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ticket_id TEXT,
-            user_id TEXT,
-            user_name TEXT,
-            comment TEXT,
-            is_internal INTEGER DEFAULT 0,
-            created_at TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-def add_comment(ticket_id, user_id, user_name, comment, is_internal=0):
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO ticket_comments (ticket_id, user_id, user_name, comment, is_internal, created_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (ticket_id, user_id, user_name, comment, is_internal, datetime.now()))
-    conn.commit()
-    conn.close()
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ticket_comments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ticket_id TEXT,
+                user_id TEXT,
+                user_name TEXT,
+                comment TEXT,
+                is_internal INTEGER DEFAULT 0,
+                created_at TIMESTAMP
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_comments_ticket_created ON ticket_comments (ticket_id, created_at)")
+
+@metrics.timed("db.add_comment")
+def add_comment(ticket_id, user_id, user_name, comment, is_internal=0, created_at=None):
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO ticket_comments (ticket_id, user_id, user_name, comment, is_internal, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (ticket_id, user_id, user_name, comment, is_internal, created_at or datetime.now()))
+
+TICKET_COMMENTS_SQL = "SELECT id, user_id, user_name, comment, is_internal, created_at FROM ticket_comments WHERE ticket_id = ? ORDER BY created_at ASC"
 
+@cached_query
+@metrics.timed("db.get_ticket_comments")
 def get_ticket_comments(ticket_id):
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, user_id, user_name, comment, is_internal, created_at FROM ticket_comments WHERE ticket_id = ? ORDER BY created_at ASC", (ticket_id,))
-    data = cursor.fetchall()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(TICKET_COMMENTS_SQL, (ticket_id,))
+        data = cursor.fetchall()
     return data
 
 # --- USER PREFERENCES ---
 def init_preferences_table():
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS user_preferences (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT UNIQUE,
-            theme TEXT DEFAULT 'dark',
-            email_notifications INTEGER DEFAULT 1,
-            created_at TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_preferences (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT UNIQUE,
+                theme TEXT DEFAULT 'dark',
+                email_notifications INTEGER DEFAULT 1,
+                created_at TIMESTAMP
+            )
+        ''')
 
+USER_PREFERENCES_SQL = "SELECT theme, email_notifications FROM user_preferences WHERE user_id = ?"
+
+@cached_query
+@metrics.timed("db.get_user_preferences")
 def get_user_preferences(user_id):
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT theme, email_notifications FROM user_preferences WHERE user_id = ?", (user_id,))
-    data = cursor.fetchone()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(USER_PREFERENCES_SQL, (user_id,))
+        data = cursor.fetchone()
     return data if data else ('dark', 1)
 
+@metrics.timed("db.update_user_preferences")
 def update_user_preferences(user_id, theme, email_notifications):
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT OR REPLACE INTO user_preferences (user_id, theme, email_notifications, created_at)
-        VALUES (?, ?, ?, ?)
-    ''', (user_id, theme, email_notifications, datetime.now()))
-    conn.commit()
-    conn.close()
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT OR REPLACE INTO user_preferences (user_id, theme, email_notifications, created_at)
+            VALUES (?, ?, ?, ?)
+        ''', (user_id, theme, email_notifications, datetime.now()))
 
 # --- MODEL FEEDBACK TRACKING ---
 def init_model_feedback_table():
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS model_feedback (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ticket_id TEXT,
-            predicted_category TEXT,
-            actual_category TEXT,
-            confidence REAL,
-            feedback_type TEXT,
-            created_at TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-def add_model_feedback(ticket_id, predicted_category, actual_category, confidence, feedback_type='misclassification'):
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO model_feedback (ticket_id, predicted_category, actual_category, confidence, feedback_type, created_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (ticket_id, predicted_category, actual_category, confidence, feedback_type, datetime.now()))
-    conn.commit()
-    conn.close()
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS model_feedback (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ticket_id TEXT,
+                predicted_category TEXT,
+                actual_category TEXT,
+                confidence REAL,
+                feedback_type TEXT,
+                created_at TIMESTAMP
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_model_feedback_ticket ON model_feedback (ticket_id)")
+
+@metrics.timed("db.add_model_feedback")
+def add_model_feedback(ticket_id, predicted_category, actual_category, confidence, feedback_type='misclassification', created_at=None):
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO model_feedback (ticket_id, predicted_category, actual_category, confidence, feedback_type, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (ticket_id, predicted_category, actual_category, confidence, feedback_type, created_at or datetime.now()))
+
+MODEL_FEEDBACK_STATS_SQL = "SELECT COUNT(*) as total, COUNT(DISTINCT ticket_id) as unique_tickets FROM model_feedback"
 
+@cached_query
+@metrics.timed("db.get_model_feedback_stats")
 def get_model_feedback_stats():
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) as total, COUNT(DISTINCT ticket_id) as unique_tickets FROM model_feedback")
-    data = cursor.fetchone()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(MODEL_FEEDBACK_STATS_SQL)
+        data = cursor.fetchone()
     return data
 
 # --- SEARCH & ADVANCED FILTERING ---
-def search_tickets(search_query, filters=None):
-    """Search tickets by title, description, or category"""
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    
-    query = "SELECT id, ticket_id, user_id, user_name, title, description, category, priority, status, created_at FROM tickets WHERE "
-    params = []
-    
-    # Search term
-    query += "(title LIKE ? OR description LIKE ? OR category LIKE ?)"
-    search_param = f"%{search_query}%"
-    params.extend([search_param, search_param, search_param])
-    
-    # Additional filters
+# Full-text index over title/description/category. External-content FTS5 table:
+# it stores only the inverted index and reads the text back from `tickets`,
+# kept in sync by the triggers below. prefix='2 3' indexes 2- and 3-character
+# prefixes only: those are the short "pr*" lookups that expand to many terms
+# while someone is typing. Longer prefixes ("print*") aren't served by it; they
+# read the few matching terms straight from the main index.
+def init_search_index():
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'tickets_fts'")
+        exists = cursor.fetchone() is not None
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS tickets_fts USING fts5(
+                title, description, category,
+                content='tickets', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS tickets_fts_insert AFTER INSERT ON tickets BEGIN
+                INSERT INTO tickets_fts (rowid, title, description, category)
+                VALUES (new.id, new.title, new.description, new.category);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS tickets_fts_delete AFTER DELETE ON tickets BEGIN
+                INSERT INTO tickets_fts (tickets_fts, rowid, title, description, category)
+                VALUES ('delete', old.id, old.title, old.description, old.category);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS tickets_fts_update AFTER UPDATE OF title, description, category ON tickets BEGIN
+                INSERT INTO tickets_fts (tickets_fts, rowid, title, description, category)
+                VALUES ('delete', old.id, old.title, old.description, old.category);
+                INSERT INTO tickets_fts (rowid, title, description, category)
+                VALUES (new.id, new.title, new.description, new.category);
+            END
+        ''')
+        if not exists:
+            # BM25 with title hits weighted 5x and category 2x over description. Stored as the
+            # table's default rank so ORDER BY rank is served by FTS5 itself, without a sort step.
+            cursor.execute("INSERT INTO tickets_fts (tickets_fts, rank) VALUES ('rank', 'bm25(5.0, 1.0, 2.0)')")
+            # One-time backfill for databases that had tickets before the index existed
+            cursor.execute("INSERT INTO tickets_fts (tickets_fts) VALUES ('rebuild')")
+
+def fts_query(search_query):
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix.
+
+    User input is never passed through as FTS syntax, so quotes, '-' or 'AND'
+    in a search box can't raise a syntax error. Returns None if there are no words.
+    """
+    words = re.findall(r"\w+", search_query or "")
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words[:-1]] + [f'"{words[-1]}"*']
+    return " ".join(terms)
+
+def _ticket_filters(filters, alias=""):
+    """WHERE clauses and params for the status/category/date filters used by the admin views."""
+    clauses, params = [], []
     if filters:
         if 'status' in filters and filters['status']:
-            query += " AND status IN ({})".format(','.join(['?' for _ in filters['status']]))
+            clauses.append(f"{alias}status IN ({','.join(['?' for _ in filters['status']])})")
             params.extend(filters['status'])
         if 'category' in filters and filters['category']:
-            query += " AND category IN ({})".format(','.join(['?' for _ in filters['category']]))
+            clauses.append(f"{alias}category IN ({','.join(['?' for _ in filters['category']])})")
             params.extend(filters['category'])
+        if 'priority' in filters and filters['priority']:
+            clauses.append(f"{alias}priority IN ({','.join(['?' for _ in filters['priority']])})")
+            params.extend(filters['priority'])
         if 'date_from' in filters and filters['date_from']:
-            query += " AND created_at >= ?"
+            clauses.append(f"{alias}created_at >= ?")
             params.append(filters['date_from'])
         if 'date_to' in filters and filters['date_to']:
-            query += " AND created_at <= ?"
+            clauses.append(f"{alias}created_at <= ?")
             params.append(filters['date_to'])
-    
-    query += " ORDER BY created_at DESC"
-    cursor.execute(query, params)
-    data = cursor.fetchall()
-    conn.close()
+    return clauses, params
+
+@cached_query
+@metrics.timed("db.search_tickets")
+def search_tickets(search_query, filters=None, limit=None, with_snippets=False):
+    """Search tickets by title, description, or category.
+
+    Matches are ranked by BM25 (title hits weigh most, see init_search_index); the last word is
+    prefix-matched so results update while typing. With with_snippets=True each
+    row gets an extra column: the best matching fragment with hits in **bold**.
+    An empty query returns the filtered tickets newest first; one with no words
+    in it (only punctuation) matches nothing.
+    """
+    if (search_query or "").strip() and fts_query(search_query) is None:
+        return []
+    query, params = search_tickets_sql(search_query, filters, limit, with_snippets)
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        data = cursor.fetchall()
+    return data
+
+
+def search_tickets_sql(search_query, filters=None, limit=None, with_snippets=False):
+    """SQL and params for search_tickets()."""
+    match = fts_query(search_query)
+    clauses, params = _ticket_filters(filters, alias="t.")
+    columns = ", ".join(f"t.{c}" for c in TICKET_COLUMNS.split(", "))
+
+    if match:
+        snippet = ", snippet(tickets_fts, -1, '**', '**', '…', 12)" if with_snippets else ""
+        query = f"""
+            SELECT {columns}{snippet} FROM tickets_fts
+            JOIN tickets t ON t.id = tickets_fts.rowid
+            WHERE tickets_fts MATCH ?{''.join(' AND ' + c for c in clauses)}
+            ORDER BY tickets_fts.rank
+        """
+        params = [match] + params
+    else:
+        snippet = ", NULL" if with_snippets else ""
+        query = f"SELECT {columns}{snippet} FROM tickets t"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY t.created_at DESC"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    return query, params
+
+# --- TICKET COUNTERS ---
+# Running counts by status, category and priority (plus the overall total),
+# maintained by triggers in the same transaction as every insert, delete and
+# status/category/priority change. The metrics header reads ~20 small rows
+# instead of loading every ticket.
+COUNTER_DIMENSIONS = ("status", "category", "priority")
+
+def _counter_upsert(row, delta):
+    """Trigger body adding `delta` to the total and to each dimension's counter for `row` (new/old)."""
+    values = [("total", "''")] + [(dim, f"COALESCE({row}.{dim}, '')") for dim in COUNTER_DIMENSIONS]
+    return "".join(f'''
+                INSERT INTO ticket_counters (dimension, value, count) VALUES ('{dim}', {value}, {delta})
+                ON CONFLICT (dimension, value) DO UPDATE SET count = count + ({delta});'''
+        for dim, value in values)
+
+def init_counters_table():
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'ticket_counters'")
+        exists = cursor.fetchone() is not None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ticket_counters (
+                dimension TEXT,
+                value TEXT,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (dimension, value)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS ticket_counters_insert AFTER INSERT ON tickets BEGIN {_counter_upsert('new', 1)} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS ticket_counters_delete AFTER DELETE ON tickets BEGIN {_counter_upsert('old', -1)} END")
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS ticket_counters_update AFTER UPDATE OF status, category, priority ON tickets
+            WHEN old.status IS NOT new.status OR old.category IS NOT new.category OR old.priority IS NOT new.priority
+            BEGIN {_counter_upsert('old', -1)} {_counter_upsert('new', 1)} END
+        ''')
+        # One-time backfill for databases that had tickets before the counters existed
+        if not exists:
+            rebuild_ticket_counters()
+
+def _count_from_tickets(cursor):
+    counts = {("total", ""): cursor.execute("SELECT COUNT(*) FROM tickets").fetchone()[0]}
+    for dim in COUNTER_DIMENSIONS:
+        cursor.execute(f"SELECT COALESCE({dim}, ''), COUNT(*) FROM tickets GROUP BY 1")
+        counts.update({(dim, value): n for value, n in cursor.fetchall()})
+    return counts
+
+@metrics.timed("db.rebuild_ticket_counters")
+def rebuild_ticket_counters():
+    """Recompute every counter from the tickets table."""
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        counts = _count_from_tickets(cursor)
+        cursor.execute("DELETE FROM ticket_counters")
+        cursor.executemany("INSERT INTO ticket_counters (dimension, value, count) VALUES (?, ?, ?)",
+                           [(dim, value, n) for (dim, value), n in counts.items()])
+
+@metrics.timed("db.check_ticket_counters")
+def check_ticket_counters(repair=False):
+    """Compare the counters with a full recount. Returns the mismatches as
+    {(dimension, value): (stored, actual)}; with repair=True they are rebuilt."""
+    with connection(write=repair) as conn:
+        cursor = conn.cursor()
+        actual = _count_from_tickets(cursor)
+        cursor.execute("SELECT dimension, value, count FROM ticket_counters")
+        stored = {(dim, value): n for dim, value, n in cursor.fetchall()}
+        mismatches = {key: (stored.get(key, 0), actual.get(key, 0))
+                      for key in set(actual) | set(stored) if stored.get(key, 0) != actual.get(key, 0)}
+        if mismatches and repair:
+            rebuild_ticket_counters()
+    return mismatches
+
+@cached_query
+@metrics.timed("db.get_ticket_counts")
+def get_ticket_counts():
+    """{"total": n, "status": {value: n}, "category": {...}, "priority": {...}}"""
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT dimension, value, count FROM ticket_counters WHERE count != 0")
+        data = cursor.fetchall()
+    counts = {"total": 0, **{dim: {} for dim in COUNTER_DIMENSIONS}}
+    for dim, value, n in data:
+        if dim == "total":
+            counts["total"] = n
+        else:
+            counts[dim][value] = n
+    return counts
+
+# --- DAILY ROLLUPS ---
+# Ticket counts per created day x category x status x priority, maintained by
+# triggers like ticket_counters. Analytics aggregate a few thousand rollup rows
+# (days x 128 combinations at most) instead of every ticket, with any date window.
+ROLLUP_KEY = ("day", "category", "status", "priority")
+
+def _rollup_upsert(row, delta):
+    """Trigger body adding `delta` to the rollup row of `row` (new/old)."""
+    return f'''
+                INSERT INTO ticket_daily_rollup (day, category, status, priority, count)
+                VALUES (COALESCE(date({row}.created_at), ''), COALESCE({row}.category, ''),
+                        COALESCE({row}.status, ''), COALESCE({row}.priority, ''), {delta})
+                ON CONFLICT (day, category, status, priority) DO UPDATE SET count = count + ({delta});'''
+
+def init_daily_rollup_table():
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'ticket_daily_rollup'")
+        exists = cursor.fetchone() is not None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ticket_daily_rollup (
+                day TEXT,
+                category TEXT,
+                status TEXT,
+                priority TEXT,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, category, status, priority)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS ticket_rollup_insert AFTER INSERT ON tickets BEGIN {_rollup_upsert('new', 1)} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS ticket_rollup_delete AFTER DELETE ON tickets BEGIN {_rollup_upsert('old', -1)} END")
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS ticket_rollup_update AFTER UPDATE OF status, category, priority, created_at ON tickets
+            WHEN old.status IS NOT new.status OR old.category IS NOT new.category
+              OR old.priority IS NOT new.priority OR old.created_at IS NOT new.created_at
+            BEGIN {_rollup_upsert('old', -1)} {_rollup_upsert('new', 1)} END
+        ''')
+        # One-time backfill for databases that had tickets before the rollups existed
+        if not exists:
+            rebuild_daily_rollups()
+
+_ROLLUP_FROM_TICKETS = '''
+    SELECT COALESCE(date(created_at), ''), COALESCE(category, ''), COALESCE(status, ''), COALESCE(priority, ''), COUNT(*)
+    FROM tickets GROUP BY 1, 2, 3, 4
+'''
+
+@metrics.timed("db.rebuild_daily_rollups")
+def rebuild_daily_rollups():
+    """Recompute the rollups from the tickets table."""
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM ticket_daily_rollup")
+        cursor.execute("INSERT INTO ticket_daily_rollup (day, category, status, priority, count) " + _ROLLUP_FROM_TICKETS)
+
+@metrics.timed("db.check_daily_rollups")
+def check_daily_rollups(repair=False):
+    """Compare the rollups with a full recount. Returns {key: (stored, actual)} for rows
+    that differ; with repair=True the rollups are rebuilt."""
+    with connection(write=repair) as conn:
+        cursor = conn.cursor()
+        actual = {row[:4]: row[4] for row in cursor.execute(_ROLLUP_FROM_TICKETS).fetchall()}
+        stored = {row[:4]: row[4] for row in cursor.execute(
+            "SELECT day, category, status, priority, count FROM ticket_daily_rollup").fetchall()}
+        mismatches = {key: (stored.get(key, 0), actual.get(key, 0))
+                      for key in set(actual) | set(stored) if stored.get(key, 0) != actual.get(key, 0)}
+        if mismatches and repair:
+            rebuild_daily_rollups()
+    return mismatches
+
+@cached_query
+@metrics.timed("db.get_ticket_analytics")
+def get_ticket_analytics(date_from=None, date_to=None):
+    """Ticket counts created in [date_from, date_to] (dates or 'YYYY-MM-DD', both optional):
+    {"total": n, "category": {...}, "status": {...}, "priority": {...}, "daily": {day: n}}"""
+    clauses, params = ["count != 0"], []
+    if date_from:
+        clauses.append("day >= ?")
+        params.append(str(date_from))
+    if date_to:
+        clauses.append("day <= ?")
+        params.append(str(date_to))
+    where = " WHERE " + " AND ".join(clauses)
+
+    # All-time breakdowns are already in ticket_counters; only the daily series needs the rollups
+    analytics = {} if params else {dim: values for dim, values in get_ticket_counts().items() if dim != "total"}
+    with connection() as conn:
+        cursor = conn.cursor()
+        if params:
+            for dim in COUNTER_DIMENSIONS:
+                cursor.execute(f"SELECT {dim}, SUM(count) FROM ticket_daily_rollup{where} GROUP BY {dim}", params)
+                analytics[dim] = dict(cursor.fetchall())
+        # The primary key starts with day, so this groups in key order without a sort
+        cursor.execute(f"SELECT day, SUM(count) FROM ticket_daily_rollup{where} GROUP BY day", params)
+        analytics["daily"] = {day: n for day, n in cursor.fetchall() if day}  # '' = no created_at
+    analytics["total"] = sum(analytics["status"].values())
+    return analytics
+
+# --- LIFECYCLE JOBS ---
+# Time-based ticket transitions, run periodically by lifecycle.LifecycleScheduler
+# (not on page renders). Each job is idempotent and only reads the rows it may
+# change, through a partial index, so a run costs O(eligible rows). The jobs
+# name their index (INDEXED BY): without ANALYZE statistics the planner tends
+# to pick the broader status index, which would walk every open ticket.
+AUTO_CLOSE_HOURS = 24       # Resolved -> Closed, measured from resolved_at
+SLA_BREACH_HOURS = 6        # Open/In Progress longer than this breaches the SLA (the red 🔴 in Tab 1)
+ESCALATE_AFTER_HOURS = 12   # Still unresolved this long after the breach -> bump priority one level
+PRIORITY_LADDER = ("Low", "Standard", "High", "Critical")
+
+def init_lifecycle_tables():
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        # resolved_at follows status changes made through any code path. Local time,
+        # same as created_at, so they compare directly.
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS tickets_resolved_at AFTER UPDATE OF status ON tickets
+            WHEN new.status IS NOT old.status
+            BEGIN
+                UPDATE tickets SET resolved_at = CASE
+                    WHEN new.status = 'Resolved' THEN strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')
+                    WHEN new.status = 'Closed' THEN COALESCE(old.resolved_at, strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))
+                    ELSE NULL END
+                WHERE id = new.id;
+            END
+        ''')
+        # A reopened ticket starts a new SLA clock: the next run marks the breach again
+        # and escalation waits ESCALATE_AFTER_HOURS from then
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS tickets_reopened AFTER UPDATE OF status ON tickets
+            WHEN new.status IN ('Open', 'In Progress') AND old.status IN ('Resolved', 'Closed')
+            BEGIN
+                UPDATE tickets SET sla_breached_at = NULL, escalated_at = NULL WHERE id = new.id;
+            END
+        ''')
+        # Partial indexes: each holds only the rows its job may pick up
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_resolved_at ON tickets (resolved_at) WHERE status = 'Resolved'")
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_tickets_sla_pending ON tickets (created_at)
+            WHERE sla_breached_at IS NULL AND status IN ('Open', 'In Progress')
+        ''')
+        # Replaced by idx_tickets_escalation_due, which also leaves out Critical tickets
+        cursor.execute("DROP INDEX IF EXISTS idx_tickets_escalation_pending")
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_tickets_escalation_due ON tickets (sla_breached_at)
+            WHERE escalated_at IS NULL AND sla_breached_at IS NOT NULL AND status IN ('Open', 'In Progress')
+              AND priority IS NOT 'Critical'
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS lifecycle_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job TEXT,
+                started_at TIMESTAMP,
+                rows_touched INTEGER,
+                duration_ms REAL,
+                error TEXT
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_lifecycle_runs_job ON lifecycle_runs (job, started_at)")
+    init_comments_table()  # Escalations leave an internal comment
+
+# Each job names its partial index so the planner never falls back to a full scan
+CLOSE_RESOLVED_SQL = """
+    UPDATE tickets INDEXED BY idx_tickets_resolved_at SET status = 'Closed'
+    WHERE status = 'Resolved' AND resolved_at <= ?
+"""
+MARK_SLA_BREACHES_SQL = """
+    UPDATE tickets INDEXED BY idx_tickets_sla_pending SET sla_breached_at = ?
+    WHERE sla_breached_at IS NULL AND status IN ('Open', 'In Progress') AND created_at <= ?
+"""
+ESCALATION_CANDIDATES_SQL = """
+    SELECT id, priority FROM tickets INDEXED BY idx_tickets_escalation_due
+    WHERE escalated_at IS NULL AND sla_breached_at IS NOT NULL AND status IN ('Open', 'In Progress')
+      AND priority IS NOT 'Critical' AND sla_breached_at <= ?
+"""
+
+@metrics.timed("db.close_resolved_tickets")
+def close_resolved_tickets(now=None, hours=AUTO_CLOSE_HOURS):
+    """Close tickets resolved at least `hours` ago. Returns rows closed."""
+    cutoff = (now or datetime.now()) - timedelta(hours=hours)
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(CLOSE_RESOLVED_SQL, (cutoff,))
+        return cursor.rowcount
+
+@metrics.timed("db.mark_sla_breaches")
+def mark_sla_breaches(now=None, hours=SLA_BREACH_HOURS):
+    """Stamp sla_breached_at on open tickets older than `hours`. Returns rows marked."""
+    now = now or datetime.now()
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(MARK_SLA_BREACHES_SQL, (now, now - timedelta(hours=hours)))
+        return cursor.rowcount
+
+@metrics.timed("db.escalate_breached_tickets")
+def escalate_breached_tickets(now=None, hours=ESCALATE_AFTER_HOURS):
+    """Raise the priority of tickets still open `hours` after their SLA breach, and leave
+    an internal comment saying so. Critical tickets are left alone. Returns rows escalated."""
+    now = now or datetime.now()
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(ESCALATION_CANDIDATES_SQL, (now - timedelta(hours=hours),))
+        rows = cursor.fetchall()
+        escalated = []
+        for row_id, priority in rows:
+            level = PRIORITY_LADDER.index(priority) if priority in PRIORITY_LADDER else 1
+            escalated.append((PRIORITY_LADDER[min(level + 1, len(PRIORITY_LADDER) - 1)], now, row_id, priority))
+        cursor.executemany("UPDATE tickets SET priority = ?, escalated_at = ? WHERE id = ?",
+                           [row[:3] for row in escalated])
+        cursor.executemany('''
+            INSERT INTO ticket_comments (ticket_id, user_id, user_name, comment, is_internal, created_at)
+            VALUES (?, 'system', 'Lifecycle Scheduler', ?, 1, ?)
+        ''', [(row_id, f"Auto-escalated: still unresolved {hours}h after the SLA breach, priority {old} -> {new}", now)
+              for new, _, row_id, old in escalated])
+    return len(escalated)
+
+@metrics.timed("db.claim_lifecycle_run")
+def claim_lifecycle_run(job, min_interval_seconds=0):
+    """Record the start of a job run, unless one started less than min_interval_seconds ago
+    (possibly in another process). Returns the run id, or None if skipped."""
+    now = datetime.now()
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        if min_interval_seconds:
+            cursor.execute("SELECT 1 FROM lifecycle_runs WHERE job = ? AND started_at > ? LIMIT 1",
+                           (job, now - timedelta(seconds=min_interval_seconds)))
+            if cursor.fetchone():
+                return None
+        cursor.execute("INSERT INTO lifecycle_runs (job, started_at) VALUES (?, ?)", (job, now))
+        return cursor.lastrowid
+
+@metrics.timed("db.finish_lifecycle_run")
+def finish_lifecycle_run(run_id, rows_touched, duration_ms, error=None, keep=1000):
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE lifecycle_runs SET rows_touched = ?, duration_ms = ?, error = ? WHERE id = ?",
+                       (rows_touched, duration_ms, error, run_id))
+        cursor.execute("DELETE FROM lifecycle_runs WHERE id <= ?", (run_id - keep,))
+
+@cached_query
+@metrics.timed("db.get_lifecycle_runs")
+def get_lifecycle_runs(limit=50):
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, job, started_at, rows_touched, duration_ms, error FROM lifecycle_runs ORDER BY id DESC LIMIT ?",
+                       (limit,))
+        data = cursor.fetchall()
     return data
 
+# --- QUEUE PAGINATION ---
+# Keyset (cursor) pagination for the support queue: a page is "the next N rows
+# after this (created_at, id)", which the (status|category|*, created_at)
+# indexes answer directly, so cost stays the same on page 1 and page 1000
+# (OFFSET would read and discard every skipped row).
+def page_key(row):
+    """Cursor for a ticket row: (created_at, id)."""
+    return (row[9], row[0])
+
+@cached_query
+@metrics.timed("db.get_tickets_page")
+def get_tickets_page(filters=None, limit=25, after=None, before=None):
+    """One page of tickets, newest first.
+
+    after:  page_key() of the last row shown -> the page after it
+    before: page_key() of the first row shown -> the page before it
+    filters: same dict as search_tickets (status, category, date_from, date_to)
+    """
+    query, params = tickets_page_sql(filters, limit, after, before)
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        data = cursor.fetchall()
+    return data[::-1] if before else data
+
+
+def tickets_page_sql(filters=None, limit=25, after=None, before=None):
+    """SQL and params for get_tickets_page()."""
+    clauses, params = _ticket_filters(filters)
+    if after:
+        clauses.append("(created_at, id) < (?, ?)")
+        params.extend(after)
+        order = "DESC"
+    elif before:
+        clauses.append("(created_at, id) > (?, ?)")
+        params.extend(before)
+        order = "ASC"
+    else:
+        order = "DESC"
+    query = f"SELECT {TICKET_COLUMNS} FROM tickets"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += f" ORDER BY created_at {order}, id {order} LIMIT ?"
+    params.append(limit)
+    return query, params
+
+@cached_query
+@metrics.timed("db.count_tickets")
+def count_tickets(filters=None):
+    """Number of tickets matching the admin filters (see _ticket_filters).
+
+    No filter, or values of a single counted column (e.g. {"status": ["Open", "In Progress"]}),
+    is answered by summing ticket_counters rows. Combined filters, and any date range, fall
+    back to a COUNT(*) over the matching tickets.
+    """
+    active = {k: v for k, v in (filters or {}).items() if v}
+    if not active or (len(active) == 1 and next(iter(active)) in COUNTER_DIMENSIONS):
+        counts = get_ticket_counts()
+        if not active:
+            return counts["total"]
+        dim, values = next(iter(active.items()))
+        return sum(counts[dim].get(value, 0) for value in set(values))
+    clauses, params = _ticket_filters(filters)
+    query = "SELECT COUNT(*) FROM tickets"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        data = cursor.fetchone()
+    return data[0]
+
 # --- PRIORITY OVERRIDE ---
+@metrics.timed("db.update_priority")
 def update_priority(ticket_id, new_priority):
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    cursor.execute("UPDATE tickets SET priority = ? WHERE id = ?", (new_priority, ticket_id))
-    conn.commit()
-    conn.close()
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE tickets SET priority = ? WHERE id = ?", (new_priority, ticket_id))
 
 # --- BULK OPERATIONS ---
+# ID lists of any size are staged into a per-connection temp table and applied
+# with one statement, in the same transaction, instead of an IN (?, ?, ...) list
+# that runs into SQLite's bound-variable limit. The *_where variants take the
+# admin filters (see _ticket_filters) and never round-trip IDs through Python.
+# Every operation returns {"rows_touched", "duration_ms"}.
+
+def _stage_ids(cursor, ticket_ids):
+    """Replace the contents of temp.bulk_ids with ticket_ids (duplicates collapse)."""
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS bulk_ids (id INTEGER PRIMARY KEY)")
+    cursor.execute("DELETE FROM temp.bulk_ids")
+    cursor.executemany("INSERT OR IGNORE INTO temp.bulk_ids (id) VALUES (?)", ((int(i),) for i in ticket_ids))
+
+def _bulk_result(rows_touched, started):
+    return {"rows_touched": rows_touched, "duration_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+def _required_filters(filters):
+    clauses, params = _ticket_filters(filters)
+    if not clauses:
+        raise ValueError("Bulk operations by filter need at least one filter")
+    return " AND ".join(clauses), params
+
+@metrics.timed("db.bulk_update_status")
 def bulk_update_status(ticket_ids, new_status):
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    placeholders = ','.join(['?' for _ in ticket_ids])
-    cursor.execute(f"UPDATE tickets SET status = ? WHERE id IN ({placeholders})", [new_status] + ticket_ids)
-    conn.commit()
-    conn.close()
+    started = time.perf_counter()
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        _stage_ids(cursor, ticket_ids)
+        # Rows already in new_status are skipped, so their triggers don't fire for nothing
+        cursor.execute("UPDATE tickets SET status = ? WHERE id IN (SELECT id FROM temp.bulk_ids) AND status != ?",
+                       (new_status, new_status))
+        rows = cursor.rowcount
+        cursor.execute("DELETE FROM temp.bulk_ids")
+    return _bulk_result(rows, started)
 
+@metrics.timed("db.bulk_delete")
 def bulk_delete(ticket_ids):
-    conn = sqlite3.connect('service_desk.db')
-    cursor = conn.cursor()
-    placeholders = ','.join(['?' for _ in ticket_ids])
-    cursor.execute(f"DELETE FROM tickets WHERE id IN ({placeholders})", ticket_ids)
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    started = time.perf_counter()
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        _stage_ids(cursor, ticket_ids)
+        cursor.execute("DELETE FROM tickets WHERE id IN (SELECT id FROM temp.bulk_ids)")
+        rows = cursor.rowcount
+        cursor.execute("DELETE FROM temp.bulk_ids")
+    return _bulk_result(rows, started)
+
+@metrics.timed("db.bulk_update_status_where")
+def bulk_update_status_where(filters, new_status):
+    """e.g. bulk_update_status_where({"status": ["Resolved"], "category": ["Hardware"],
+    "date_to": datetime.now() - timedelta(days=7)}, "Closed")"""
+    started = time.perf_counter()
+    where, params = _required_filters(filters)
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"UPDATE tickets SET status = ? WHERE {where} AND status != ?",
+                       [new_status] + params + [new_status])
+        rows = cursor.rowcount
+    return _bulk_result(rows, started)
+
+@metrics.timed("db.bulk_delete_where")
+def bulk_delete_where(filters):
+    started = time.perf_counter()
+    where, params = _required_filters(filters)
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"DELETE FROM tickets WHERE {where}", params)
+        rows = cursor.rowcount
+    return _bulk_result(rows, started)
+
+# --- PREDICTION CACHE ---
+# Persistent backing store for prediction_cache.PredictionCache, shared by all Streamlit processes.
+# It lives in its own file next to the main database (service_desk.db -> service_desk.predictions.db)
+# with its own pool: cache writes then never move service_desk.db's data_version, which would
+# empty the read cache on every classification.
+def prediction_cache_path(path):
+    root, ext = os.path.splitext(path)
+    return f"{root}.predictions{ext or '.db'}"
+
+_cache_pool = ConnectionPool(prediction_cache_path(DB_PATH))
+
+# Keys per lookup query, under SQLite's bound-variable limit on every build
+CACHE_LOOKUP_CHUNK = 500
+
+def init_prediction_cache_table():
+    with _cache_pool.connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS prediction_cache (
+                cache_key TEXT PRIMARY KEY,
+                model_version TEXT,
+                probs TEXT,
+                path TEXT,
+                created_at REAL
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_prediction_cache_created ON prediction_cache (created_at)")
+    # Earlier versions kept the table in service_desk.db
+    with connection() as conn:
+        old_table = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'prediction_cache'").fetchone()
+    if old_table:
+        with connection(write=True) as conn:
+            conn.execute("DROP TABLE IF EXISTS prediction_cache")
+
+@metrics.timed("db.get_cached_predictions")
+def get_cached_predictions(cache_keys, min_created_at):
+    """{cache_key: (probs, path, created_at)} for the keys cached since min_created_at."""
+    cache_keys = list(cache_keys)
+    found = {}
+    with _cache_pool.connection() as conn:
+        cursor = conn.cursor()
+        for start in range(0, len(cache_keys), CACHE_LOOKUP_CHUNK):
+            chunk = cache_keys[start:start + CACHE_LOOKUP_CHUNK]
+            cursor.execute(f'''
+                SELECT cache_key, probs, path, created_at FROM prediction_cache
+                WHERE cache_key IN ({','.join('?' * len(chunk))}) AND created_at >= ?
+            ''', chunk + [min_created_at])
+            found.update((row[0], row[1:]) for row in cursor.fetchall())
+    return found
+
+@metrics.timed("db.save_cached_predictions")
+def save_cached_predictions(rows):
+    """rows: list of (cache_key, model_version, probs_json, path, created_at)"""
+    with _cache_pool.connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO prediction_cache (cache_key, model_version, probs, path, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', rows)
+
+@metrics.timed("db.prune_prediction_cache")
+def prune_prediction_cache(min_created_at, max_rows):
+    """Drop expired entries and keep only the newest max_rows. Returns rows removed."""
+    with _cache_pool.connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM prediction_cache WHERE created_at < ?", (min_created_at,))
+        removed = cursor.rowcount
+        cursor.execute('''
+            DELETE FROM prediction_cache WHERE cache_key IN (
+                SELECT cache_key FROM prediction_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+        ''', (max_rows,))
+        removed += cursor.rowcount
+    return removed
+
+
+# --- BULK INGESTION ---
+def init_ingest_checkpoint_table():
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+                source TEXT PRIMARY KEY,
+                records_done INTEGER,
+                updated_at TIMESTAMP
+            )
+        ''')
+
+@metrics.timed("db.get_ingest_checkpoint")
+def get_ingest_checkpoint(source):
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT records_done FROM ingest_checkpoints WHERE source = ?", (source,))
+        data = cursor.fetchone()
+    return data[0] if data else 0
+
+@metrics.timed("db.add_tickets_bulk")
+def add_tickets_bulk(rows, checkpoint=None):
+    """Insert many tickets in one transaction.
+
+    rows: list of (user_id, user_name, title, description, category, priority)
+    checkpoint: optional (source, records_done), saved in the same transaction
+    so a resumed ingestion never double-inserts a batch.
+    Returns the generated ticket IDs in row order.
+    """
+    with connection(write=True) as conn:
+        cursor = conn.cursor()
+        now = datetime.now()
+        ticket_ids = allocate_ticket_ids(len(rows), now)
+        cursor.executemany('''
+            INSERT INTO tickets (ticket_id, user_id, user_name, title, description, category, priority, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(ticket_id,) + tuple(row) + (now,) for ticket_id, row in zip(ticket_ids, rows)])
+        if checkpoint:
+            cursor.execute('''
+                INSERT OR REPLACE INTO ingest_checkpoints (source, records_done, updated_at)
+                VALUES (?, ?, ?)
+            ''', (checkpoint[0], checkpoint[1], now))
+    return ticket_ids
+
+
+# --- STREAMING EXPORT ---
+# Exports read through one cursor, a chunk at a time, so memory stays bounded by
+# chunk_size whatever the table size (see export.py for the CSV/Parquet
+# writers). Rows come in created_at order by walking the created_at index, so
+# neither the ordering nor a date range needs a sort over the whole result.
+# The single statement also means the export sees one consistent snapshot.
+
+EXPORT_TABLES = {
+    "tickets": ("idx_tickets_created", ("id", "ticket_id", "user_id", "user_name", "title", "description", "category",
+                                        "priority", "status", "created_at", "resolved_at", "sla_breached_at",
+                                        "escalated_at")),
+    "feedback": ("idx_feedback_created", ("id", "user_id", "user_name", "email", "feedback_type", "message", "rating",
+                                          "created_at")),
+}
+
+def export_query(table, columns=None, filters=None):
+    """SQL and params for an export of `table` (tickets or feedback).
+
+    columns: subset of EXPORT_TABLES[table] (default: all of them)
+    filters: as for search_tickets; feedback only supports date_from/date_to
+    """
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown export table {table!r} (choose from {', '.join(EXPORT_TABLES)})")
+    index, allowed = EXPORT_TABLES[table]
+    columns = list(columns or allowed)
+    unknown = [c for c in columns if c not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown {table} columns: {', '.join(unknown)}")
+    if table != "tickets" and filters and (filters.get("status") or filters.get("category")):
+        raise ValueError(f"{table} can only be filtered by date")
+    clauses, params = _ticket_filters(filters)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return (f"SELECT {', '.join(columns)} FROM {table} INDEXED BY {index}{where} ORDER BY created_at, id",
+            params)
+
+def iter_export_chunks(table, columns=None, filters=None, chunk_size=5000):
+    """Iterate an export as lists of up to chunk_size row tuples. Arguments are checked
+    before the first chunk is requested (see export_query)."""
+    sql, params = export_query(table, columns, filters)
+
+    def chunks():
+        with connection() as conn:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+    return chunks()
+
+
+# --- QUERY PLAN CHECKS ---
+# The hot read paths, with representative parameters. Each must be answered from
+# an index: no full SCAN of the table and no temp B-tree to sort the result.
+# The SQL is the same constant or builder the function itself executes, so a
+# change to a query is checked as soon as it is made.
+_T = "2026-01-01 00:00:00"
+HOT_QUERIES = {
+    "get_tickets_user": (USER_TICKETS_SQL, ("u1",)),
+    "get_tickets_all": (ALL_TICKETS_SQL, ()),
+    "get_tickets_page": tickets_page_sql(),
+    "get_tickets_page_after": tickets_page_sql(after=(_T, 1)),
+    "get_tickets_page_before": tickets_page_sql(before=(_T, 1)),
+    "get_tickets_page_status": tickets_page_sql({"status": ["Open"]}, after=(_T, 1)),
+    "get_tickets_page_category": tickets_page_sql({"category": ["Hardware"]}),
+    "close_resolved_tickets": (CLOSE_RESOLVED_SQL, (_T,)),
+    "mark_sla_breaches": (MARK_SLA_BREACHES_SQL, (_T, _T)),
+    "escalate_breached_tickets": (ESCALATION_CANDIDATES_SQL, (_T,)),
+    "get_ticket_by_id": (TICKET_BY_ID_SQL, (1,)),
+    "get_ticket_by_ticket_id": (TICKET_BY_TICKET_ID_SQL, ("TIC-260101-000001",)),
+    "get_ticket_comments": (TICKET_COMMENTS_SQL, ("1",)),
+    "get_all_feedback": (ALL_FEEDBACK_SQL, ()),
+    "get_model_feedback_stats": (MODEL_FEEDBACK_STATS_SQL, ()),
+    "search_tickets": search_tickets_sql("printer", limit=50),
+    "get_user_preferences": (USER_PREFERENCES_SQL, ("u1",)),
+    "iter_export_chunks": export_query("tickets", filters={"status": ["Resolved"], "date_from": "2026-01-01",
+                                                           "date_to": "2026-02-01"}),
+}
+
+
+def explain_query_plan(sql, params=()):
+    """Return the EXPLAIN QUERY PLAN detail lines for a query."""
+    with connection() as conn:
+        return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+
+
+def check_query_plans():
+    """Explain every hot query. Returns {name: {"plan": [...], "ok": bool}}."""
+    results = {}
+    for name, (sql, params) in HOT_QUERIES.items():
+        plan = explain_query_plan(sql, params)
+        full_scan = any(d.startswith("SCAN ") and "INDEX" not in d for d in plan)
+        temp_sort = any("USE TEMP B-TREE FOR ORDER BY" in d for d in plan)
+        results[name] = {"plan": plan, "ok": not (full_scan or temp_sort)}
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    init_db()
+    init_feedback_table()
+    init_comments_table()
+    init_preferences_table()
+    init_model_feedback_table()
+    failed = 0
+    for name, result in check_query_plans().items():
+        failed += not result["ok"]
+        print(f"{'ok  ' if result['ok'] else 'SCAN'} {name}: {' | '.join(result['plan'])}")
+
+    # Counter and rollup consistency; --repair-counters rebuilds both from the tickets table
+    repair = "--repair-counters" in sys.argv
+    mismatches = check_ticket_counters(repair=repair)
+    for (dim, value), (stored, actual) in sorted(mismatches.items()):
+        print(f"COUNTER {dim}={value!r}: stored {stored}, actual {actual}")
+    rollup_mismatches = check_daily_rollups(repair=repair)
+    for key, (stored, actual) in sorted(rollup_mismatches.items()):
+        print(f"ROLLUP {'/'.join(key)}: stored {stored}, actual {actual}")
+    if (mismatches or rollup_mismatches) and not repair:
+        failed += 1
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,79 @@
+import threading
+import time
+
+# Background loader for the AI engine.
+# Kept free of torch/transformers/sklearn imports so app.py can render the
+# login screen immediately; the factory (which does the heavy imports) runs on
+# a daemon thread and only the ticket-submit path has to wait for it.
+#
+# A failed load is not permanent: retry() starts a new attempt (the UI's Retry
+# button forces one), and wait() retries by itself once the backoff has passed.
+# The backoff doubles with each consecutive failure, up to max_retry_after.
+
+class EngineLoader:
+    def __init__(self, factory, warm_up=True, retry_after=30.0, max_retry_after=300.0):
+        self._factory = factory
+        self._warm_up = warm_up
+        self.retry_after = retry_after
+        self.max_retry_after = max_retry_after
+        self.failures = 0    # Consecutive failed loads, for the backoff
+        self.next_retry_at = None
+        self._lock = threading.Lock()
+        self._engine = None
+        self._error = None
+        self._start()
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def wait(self, timeout=None):
+        """Block until the engine is loaded and return it.
+
+        Raises TimeoutError if it is still loading after `timeout` seconds, or
+        re-raises the loading error if it failed (starting a retry first when
+        the backoff has passed).
+        """
+        self.retry()
+        if not self._ready.wait(timeout):
+            raise TimeoutError("AI engine is still loading")
+        if self._error is not None:
+            raise self._error
+        return self._engine
+
+    def retry(self, force=False):
+        """Start a new load after a failure; unless `force`, only once the backoff has passed.
+        Returns True if a new attempt was started."""
+        with self._lock:
+            if self.state != "failed":
+                return False
+            if not force and time.monotonic() < self.next_retry_at:
+                return False
+            self._start()
+            return True
+
+    def _start(self):
+        # _error is left as is until the new attempt ends, for callers still reading the last one
+        self._ready = threading.Event()
+        self.state = "loading"
+        self.load_seconds = None
+        self._started = time.monotonic()
+        threading.Thread(target=self._load, args=(self._ready,), name="engine-loader", daemon=True).start()
+
+    def _load(self, ready):
+        try:
+            engine = self._factory()
+            if self._warm_up:
+                engine.warm_up()
+            self._engine, self._error = engine, None
+            self.state = "ready"
+            self.failures = 0
+        except Exception as e:
+            self._error = e
+            self.failures += 1
+            backoff = min(self.max_retry_after, self.retry_after * 2 ** (self.failures - 1))
+            self.next_retry_at = time.monotonic() + backoff
+            self.state = "failed"
+        finally:
+            self.load_seconds = round(time.monotonic() - self._started, 2)
+            ready.set()
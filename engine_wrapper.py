@@ -1,70 +1,637 @@
+import os
+import csv
+import json
+import time
+import hashlib
+import threading
+import warnings
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import torch
 import joblib
 import numpy as np
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from svm_scorer import load_svm, linear_path
+from metrics import REGISTRY
+
+# --- INFERENCE BACKENDS ---
+# Exported artifacts live next to the HuggingFace weights in the BERT model folder
+ONNX_FILE = "model.onnx"
+TORCHSCRIPT_FILE = "model_traced.pt"
+INT8_FILE = "model_int8_traced.pt"
+INT8_REPORT_FILE = "model_int8_report.json"
+# Written next to each exported artifact: the fingerprint of the weights it came from
+META_SUFFIX = ".meta.json"
+
+# Category Mapping - MUST match training labels from M3.ipynb
+CATEGORIES = ['Access', 'Administrative rights', 'Hardware', 'HR Support',
+              'Internal Project', 'Miscellaneous', 'Purchase', 'Storage']
+
+# Labelled tickets (Document,Topic_group as in the Kaggle dataset) for the INT8
+# accuracy guard. Pass the held-out split of the training data for a tighter bound.
+REFERENCE_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Kaggle Dataset", "reference_tickets.csv")
+
+# One representative ticket per category, used for export parity checks
+PARITY_TEXTS = [
+    "I forgot my password and my account is locked out of the VPN",
+    "Please grant me local administrator rights to install Python",
+    "My laptop screen keeps flickering and the keyboard is broken",
+    "I have a question about my payroll and remaining leave balance",
+    "Need a new repository and build pipeline for the internal project",
+    "The coffee machine on the third floor is making strange noises",
+    "Requesting a purchase order for two Visual Studio licenses",
+    "My network drive quota is full and I cannot save any files",
+]
+
+
+class _LogitsOnly(torch.nn.Module):
+    # Wraps the HF model so traced/exported graphs take plain tensors and return logits
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+class TorchBackend:
+    name = "torch"
+
+    def __init__(self, bert_path, model=None):
+        # `model` lets a caller pass already-loaded weights (e.g. shared memory in worker_pool.py)
+        self.model = model if model is not None else AutoModelForSequenceClassification.from_pretrained(bert_path)
+        self.model.eval()
+
+    def logits(self, input_ids, attention_mask):
+        with torch.no_grad():
+            return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+_fingerprints = {}
+
+
+def weights_fingerprint(bert_path):
+    """SHA-256 of the fine-tuned weights file (memoized per size/mtime, the file is large)."""
+    for name in ("model.safetensors", "pytorch_model.bin"):
+        path = os.path.join(bert_path, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if key not in _fingerprints:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            _fingerprints[key] = digest.hexdigest()
+        return _fingerprints[key]
+    raise FileNotFoundError(f"No model weights in {bert_path}")
+
+
+def _check_artifact(bert_path, artifact):
+    """Raise unless `artifact` exists and was exported (and parity-checked) from the current weights."""
+    if not os.path.exists(artifact):
+        raise FileNotFoundError(artifact)
+    try:
+        with open(artifact + META_SUFFIX) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        raise ValueError(f"{artifact} has no export metadata; re-export it")
+    if meta.get("weights") != weights_fingerprint(bert_path):
+        raise ValueError(f"{artifact} was exported from different weights; re-export it")
+    return meta
+
+
+def _publish(bert_path, backend, tmp_path, out_path, atol, **meta):
+    """Parity-check the freshly written tmp_path, then move it and its metadata into place.
+
+    On failure the temp file is deleted and whatever was at out_path is left alone,
+    so a bad export can never be picked up by load_backend().
+    """
+    try:
+        max_diff = check_backend_parity(bert_path, backend, atol=atol, artifact=tmp_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    meta = {"weights": weights_fingerprint(bert_path), "max_diff": max_diff, **meta}
+    # Artifact first: if we die in between, the old metadata doesn't match the new file and it is refused
+    os.replace(tmp_path, out_path)
+    with open(out_path + META_SUFFIX + ".tmp", "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(out_path + META_SUFFIX + ".tmp", out_path + META_SUFFIX)
+    return out_path
+
+
+class TorchScriptBackend:
+    name = "torchscript"
+
+    def __init__(self, bert_path, artifact=None):
+        # `artifact` is only passed to parity-check a new export before it is published
+        if artifact is None:
+            artifact = os.path.join(bert_path, TORCHSCRIPT_FILE)
+            _check_artifact(bert_path, artifact)
+        self.model = torch.jit.load(artifact, map_location="cpu")
+        self.model.eval()
+
+    def logits(self, input_ids, attention_mask):
+        with torch.no_grad():
+            return self.model(input_ids, attention_mask)
+
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, bert_path, artifact=None):
+        import onnxruntime as ort
+        if artifact is None:
+            artifact = os.path.join(bert_path, ONNX_FILE)
+            _check_artifact(bert_path, artifact)
+        self.session = ort.InferenceSession(artifact, providers=["CPUExecutionProvider"])
+
+    def logits(self, input_ids, attention_mask):
+        outputs = self.session.run(["logits"], {
+            "input_ids": input_ids.numpy(),
+            "attention_mask": attention_mask.numpy(),
+        })
+        return torch.from_numpy(outputs[0])
+
+
+class Int8Backend:
+    """DistilBERT with dynamically quantized INT8 Linear layers (CPU serving).
+
+    Uses the cached artifact from quantize_int8(), building it on first use.
+    Refuses to load if the accuracy guard did not pass or the report was made
+    for other weights.
+    """
+    name = "int8"
+
+    def __init__(self, bert_path):
+        model_path = os.path.join(bert_path, INT8_FILE)
+        report_path = os.path.join(bert_path, INT8_REPORT_FILE)
+        if os.path.exists(report_path):
+            with open(report_path) as f:
+                report = json.load(f)
+        else:
+            report = quantize_int8(bert_path)
+
+        if report.get("weights") != weights_fingerprint(bert_path):
+            raise ValueError("INT8 model was quantized from different weights; re-run quantize_int8()")
+        if not report["passed"] or not os.path.exists(model_path):
+            raise ValueError(f"INT8 model failed the accuracy guard: {report}")
+        self.model = torch.jit.load(model_path, map_location="cpu")
+        self.model.eval()
+
+    def logits(self, input_ids, attention_mask):
+        with torch.no_grad():
+            return self.model(input_ids, attention_mask)
+
+
+BACKENDS = {
+    "onnx": OnnxBackend,
+    "torchscript": TorchScriptBackend,
+    "int8": Int8Backend,
+    "torch": TorchBackend,
+}
+
+
+def load_backend(bert_path, backend="auto"):
+    """Load the fastest available BERT backend, falling back to eager torch.
+
+    backend: "auto" (onnx -> torchscript -> torch) or one of BACKENDS.
+    "int8" is opt-in only since it trades a little accuracy for speed.
+    An already-constructed backend object is returned unchanged.
+    """
+    if not isinstance(backend, str):
+        return backend
+    if backend == "auto":
+        candidates = ["onnx", "torchscript", "torch"]
+    elif backend in BACKENDS:
+        candidates = [backend, "torch"]
+    else:
+        raise ValueError(f"Unknown backend '{backend}'. Choose from: auto, {', '.join(BACKENDS)}")
+
+    for name in candidates:
+        try:
+            return BACKENDS[name](bert_path)
+        except (ImportError, FileNotFoundError):
+            if name == "torch":
+                raise
+            continue  # Missing runtime or artifact not exported yet
+        except Exception as e:
+            if name == "torch":
+                raise
+            # Stale or broken artifact: say so instead of silently serving something else
+            warnings.warn(f"{name} backend not used: {e}")
+
+
+def _example_inputs(tokenizer):
+    encoded = tokenizer(PARITY_TEXTS[:2], return_tensors="pt", padding=True, truncation=True, max_length=128)
+    return encoded["input_ids"], encoded["attention_mask"]
+
+
+def export_onnx(bert_path, opset=17, atol=1e-4):
+    """Export the DistilBERT classifier to <bert_path>/model.onnx with dynamic batch/sequence axes.
+    The file only replaces the previous export once it passes the parity check."""
+    tokenizer = AutoTokenizer.from_pretrained(bert_path)
+    model = _LogitsOnly(TorchBackend(bert_path).model).eval()
+    out_path = os.path.join(bert_path, ONNX_FILE)
+    tmp_path = out_path + ".tmp"
+    torch.onnx.export(
+        model, _example_inputs(tokenizer), tmp_path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        },
+        opset_version=opset,
+        dynamo=False,
+    )
+    return _publish(bert_path, "onnx", tmp_path, out_path, atol, opset=opset)
+
+
+def export_torchscript(bert_path, atol=1e-4):
+    """Trace the DistilBERT classifier to <bert_path>/model_traced.pt (published only if parity passes)."""
+    tokenizer = AutoTokenizer.from_pretrained(bert_path)
+    model = _LogitsOnly(TorchBackend(bert_path).model).eval()
+    out_path = os.path.join(bert_path, TORCHSCRIPT_FILE)
+    tmp_path = out_path + ".tmp"
+    with torch.no_grad():
+        traced = torch.jit.trace(model, _example_inputs(tokenizer), strict=False)
+    traced.save(tmp_path)
+    return _publish(bert_path, "torchscript", tmp_path, out_path, atol)
+
+
+def check_backend_parity(bert_path, backend, texts=None, atol=1e-4, artifact=None):
+    """Compare softmax probabilities of `backend` against eager torch.
+
+    Runs the texts one at a time and as one padded batch. Returns the max
+    absolute difference and raises ValueError if it exceeds `atol`.
+    `artifact` checks a specific file instead of the published export.
+    """
+    texts = texts or PARITY_TEXTS
+    tokenizer = AutoTokenizer.from_pretrained(bert_path)
+    reference = TorchBackend(bert_path)
+    candidate = BACKENDS[backend](bert_path) if artifact is None else BACKENDS[backend](bert_path, artifact=artifact)
+
+    max_diff = 0.0
+    for batch in [[t] for t in texts] + [texts]:
+        encoded = tokenizer(batch, return_tensors="pt", padding=True, truncation=True, max_length=128)
+        ref_probs = torch.softmax(reference.logits(encoded["input_ids"], encoded["attention_mask"]), dim=1)
+        new_probs = torch.softmax(candidate.logits(encoded["input_ids"], encoded["attention_mask"]), dim=1)
+        max_diff = max(max_diff, float((ref_probs - new_probs).abs().max()))
+
+    if max_diff > atol:
+        raise ValueError(f"{backend} backend differs from eager torch by {max_diff:.2e} (tolerance {atol:.0e})")
+    return max_diff
+
+
+def load_reference(path=REFERENCE_CSV):
+    """Labelled (texts, label indices) from a CSV with Document and Topic_group columns."""
+    texts, labels = [], []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row["Topic_group"] not in CATEGORIES:
+                raise ValueError(f"Unknown category {row['Topic_group']!r} in {path}")
+            texts.append(row["Document"])
+            labels.append(CATEGORIES.index(row["Topic_group"]))
+    return texts, labels
+
+
+def _batched_probs(model, tokenizer, texts, batch_size=16):
+    # Padded batches, as the engine serves them
+    probs = []
+    with torch.no_grad():
+        for i in range(0, len(texts), batch_size):
+            encoded = tokenizer(texts[i:i + batch_size], return_tensors="pt", padding=True,
+                                truncation=True, max_length=128)
+            probs.append(torch.softmax(model(encoded["input_ids"], encoded["attention_mask"]), dim=1))
+    return torch.cat(probs)
+
+
+def quantize_int8(bert_path, reference=None, max_accuracy_drop=0.02, min_agreement=0.95, max_drift=0.05,
+                  min_reference_size=50):
+    """Build the dynamic INT8 model and cache it if it passes the accuracy guard.
+
+    The guard runs the traced artifact that will actually be served, not the
+    eager quantized model, on a labelled reference set (`reference`: CSV path
+    or (texts, labels); default REFERENCE_CSV). Its accuracy may be at most
+    `max_accuracy_drop` below fp32, it must agree with fp32 on >= `min_agreement`
+    of the tickets, and the mean change in top-class confidence must be
+    <= `max_drift`. The report, with the weights fingerprint, is written to
+    <bert_path>/model_int8_report.json either way; the model only when it passes.
+    """
+    if reference is None or isinstance(reference, str):
+        texts, labels = load_reference(reference or REFERENCE_CSV)
+    else:
+        texts, labels = reference
+    if len(texts) < min_reference_size:
+        raise ValueError(f"Reference set has {len(texts)} tickets; at least {min_reference_size} are needed")
+    labels = torch.tensor(labels)
+    tokenizer = AutoTokenizer.from_pretrained(bert_path)
+    fp32_model = _LogitsOnly(TorchBackend(bert_path).model).eval()
+    int8_model = torch.ao.quantization.quantize_dynamic(fp32_model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    out_path = os.path.join(bert_path, INT8_FILE)
+    tmp_path = out_path + ".tmp"
+    with torch.no_grad():
+        traced = torch.jit.trace(int8_model, _example_inputs(tokenizer), strict=False)
+    traced.save(tmp_path)
+    try:
+        fp32_probs = _batched_probs(fp32_model, tokenizer, texts)
+        int8_probs = _batched_probs(torch.jit.load(tmp_path, map_location="cpu").eval(), tokenizer, texts)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    fp32_top, fp32_idx = fp32_probs.max(dim=1)
+    int8_idx = int8_probs.argmax(dim=1)
+    fp32_accuracy = float((fp32_idx == labels).float().mean())
+    int8_accuracy = float((int8_idx == labels).float().mean())
+    agreement = float((int8_idx == fp32_idx).float().mean())
+    # Drift of the confidence the engine would report for the fp32 category
+    drift = (int8_probs.gather(1, fp32_idx.unsqueeze(1)).squeeze(1) - fp32_top).abs()
+    report = {
+        "weights": weights_fingerprint(bert_path),
+        "reference_size": len(texts),
+        "fp32_accuracy": round(fp32_accuracy, 4),
+        "int8_accuracy": round(int8_accuracy, 4),
+        "accuracy_drop": round(fp32_accuracy - int8_accuracy, 4),
+        "agreement": round(agreement, 4),
+        "mean_confidence_drift": round(float(drift.mean()), 4),
+        "max_confidence_drift": round(float(drift.max()), 4),
+        "max_accuracy_drop": max_accuracy_drop,
+        "min_agreement": min_agreement,
+        "max_drift": max_drift,
+    }
+    report["passed"] = (report["accuracy_drop"] <= max_accuracy_drop and agreement >= min_agreement
+                        and report["mean_confidence_drift"] <= max_drift)
+
+    if report["passed"]:
+        os.replace(tmp_path, out_path)
+    else:
+        os.remove(tmp_path)
+        if os.path.exists(out_path):
+            os.remove(out_path)  # Never leave an older INT8 model next to a failing report
+    with open(os.path.join(bert_path, INT8_REPORT_FILE + ".tmp"), "w") as f:
+        json.dump(report, f, indent=2)
+    os.replace(os.path.join(bert_path, INT8_REPORT_FILE + ".tmp"), os.path.join(bert_path, INT8_REPORT_FILE))
+    return report
+
+
+@contextmanager
+def _stage(timings, name):
+    # Adds the block's duration to timings[name]; a no-op bookkeeping-wise when timings is None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def model_version(bert_path, svm_path, tfidf_path, backend_name, cascade_margin):
+    """Short fingerprint of the model files and settings that affect predictions."""
+    parts = [backend_name, str(cascade_margin)]
+    # The converted SVM (svm_scorer.py) is what is served when it is current, so it counts too
+    for path in [os.path.join(bert_path, "model.safetensors"), svm_path, linear_path(svm_path), tfidf_path]:
+        try:
+            stat = os.stat(path)
+            parts.append(f"{os.path.basename(path)}:{stat.st_size}:{int(stat.st_mtime)}")
+        except OSError:
+            parts.append(f"{os.path.basename(path)}:missing")
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:16]
+
 
 class ProfessionalTicketEngine:
-    def __init__(self, bert_path, svm_path, tfidf_path):
-        # Load BERT
-        self.tokenizer = AutoTokenizer.from_pretrained(bert_path)
-        self.bert_model = AutoModelForSequenceClassification.from_pretrained(bert_path)
-        
-        # Load SVM & TF-IDF
-        self.svm_model = joblib.load(svm_path)
-        self.tfidf = joblib.load(tfidf_path)
-        
-        # Category Mapping - MUST match training labels from M3.ipynb
-        self.categories = ['Access', 'Administrative rights', 'Hardware', 'HR Support', 
-                          'Internal Project', 'Miscellaneous', 'Purchase', 'Storage']
-    
+    # --- CONFIDENCE THRESHOLDS (from M3.ipynb) ---
+    HIGH_CONF = 0.70   # 70%
+    LOW_CONF = 0.45    # 45%
+    MAX_LENGTH = 128   # BERT truncation length used during training
+
+    def __init__(self, bert_path, svm_path, tfidf_path, bert_batch_size=16, backend="auto",
+                 cascade_margin=None, cache=None, metrics=REGISTRY):
+        # Load tokenizer, BERT (ONNX / TorchScript when exported, otherwise eager torch),
+        # SVM (converted linear scorer when available, see svm_scorer.py) and TF-IDF in parallel
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            tokenizer = pool.submit(AutoTokenizer.from_pretrained, bert_path)
+            bert_backend = pool.submit(load_backend, bert_path, backend)
+            svm_model = pool.submit(load_svm, svm_path)
+            tfidf = pool.submit(joblib.load, tfidf_path)
+            self.tokenizer = tokenizer.result()
+            self.bert_backend = bert_backend.result()
+            self.svm_model = svm_model.result()
+            self.tfidf = tfidf.result()
+
+        self.categories = list(CATEGORIES)
+
+        # Max number of tickets per BERT forward pass in process_tickets()
+        self.bert_batch_size = bert_batch_size
+
+        # SVM-first cascade: skip BERT when the SVM top probability clears
+        # HIGH_CONF by at least `cascade_margin` (None = always run the ensemble)
+        self.cascade_margin = cascade_margin
+        self._cascade_lock = threading.Lock()
+        self._cascade_counts = {"svm": 0, "ensemble": 0}
+
+        # Optional PredictionCache (see prediction_cache.py). Entries are keyed by
+        # model_version so new weights or a different backend/cascade never reuse them.
+        self.cache = cache
+        self.model_version = model_version(bert_path, svm_path, tfidf_path,
+                                           self.bert_backend.name, cascade_margin)
+
+        # Per-stage latency histograms (see metrics.py); None disables recording
+        self.metrics = metrics
+
     def process_ticket(self, text):
-        # Validate input length
-        if len(text.strip()) < 10:
+        return self.process_tickets([text])[0]
+
+    def process_tickets(self, texts, batch_size=None, return_timings=False):
+        """Categorize a batch of tickets. Returns one result per text, in input order.
+
+        Invalid texts get the same error result as process_ticket() without
+        failing the rest of the batch. With return_timings=True every result
+        also carries the batch's per-stage durations under "timings_ms".
+        """
+        timings = {}
+        started = time.perf_counter()
+        results = [None] * len(texts)
+        pending = []
+        with _stage(timings, "cache_lookup" if self.cache else "validate"):
+            for i, text in enumerate(texts):
+                # Validate input length
+                error = self._validate(text)
+                if error:
+                    results[i] = error
+                else:
+                    pending.append(i)
+            if self.cache and pending:
+                cached = self.cache.get_many([texts[i] for i in pending], self.model_version)
+                for i, hit in zip(pending, cached):
+                    if hit:
+                        results[i] = self._build_result(texts[i], *hit)
+                pending = [i for i, hit in zip(pending, cached) if not hit]
+
+        if pending:
+            pending_texts = [texts[i] for i in pending]
+
+            # --- 1. SVM Prediction (TF-IDF), one sparse matrix for the whole batch ---
+            svm_probs = self._svm_probs(pending_texts, timings)
+
+            # --- 2. BERT Prediction in length-bucketed micro-batches (skipped for easy tickets in cascade mode) ---
+            bert_rows = [row for row in range(len(pending_texts)) if not self._svm_is_confident(svm_probs[row])]
+            bert_probs = [None] * len(pending_texts)
+            if bert_rows:
+                bert_batch = self._bert_probs([pending_texts[r] for r in bert_rows], batch_size, timings)
+                for row, probs in zip(bert_rows, bert_batch):
+                    bert_probs[row] = probs
+            self._count_paths(len(pending_texts) - len(bert_rows), len(pending_texts))
+
+            # --- 3. Weighted Soft Voting (60% BERT, 40% SVM) ---
+            with _stage(timings, "voting"):
+                predictions = []
+                for row, i in enumerate(pending):
+                    if bert_probs[row] is None:
+                        final_probs, path = svm_probs[row], "svm"  # Cascade: SVM alone was confident enough
+                    else:
+                        final_probs, path = (0.6 * bert_probs[row]) + (0.4 * svm_probs[row]), "ensemble"
+                    predictions.append((texts[i], final_probs, path))
+                    results[i] = self._build_result(texts[i], final_probs, path)
+
+            if self.cache:
+                with _stage(timings, "cache_store"):
+                    self.cache.put_many(predictions, self.model_version)
+
+        timings["total"] = time.perf_counter() - started
+        if self.metrics is not None:
+            for name, seconds in timings.items():
+                self.metrics.observe(f"engine.{name}", seconds)
+        if return_timings:
+            timings_ms = {name: round(seconds * 1000, 3) for name, seconds in timings.items()}
+            for result in results:
+                result["timings_ms"] = dict(timings_ms)  # Results are handed to different callers
+                result["batch_size"] = len(texts)
+        return results
+
+    def warm_up(self):
+        """Run throwaway SVM/BERT passes so the first real ticket doesn't pay
+        graph, allocator and thread-pool initialization. Bypasses the cache and metrics."""
+        self._svm_probs(PARITY_TEXTS)
+        self._bert_probs(PARITY_TEXTS[:1])
+        self._bert_probs(PARITY_TEXTS)
+
+    def cascade_stats(self):
+        """Counters for how often the cascade answered from the SVM alone."""
+        with self._cascade_lock:
+            counts = dict(self._cascade_counts)
+        total = counts["svm"] + counts["ensemble"]
+        return {
+            "svm_only": counts["svm"],
+            "ensemble": counts["ensemble"],
+            "bert_skip_rate": round(counts["svm"] / total, 4) if total else 0.0,
+        }
+
+    def _svm_is_confident(self, svm_probs):
+        if self.cascade_margin is None:
+            return False
+        return float(np.max(svm_probs)) >= self.HIGH_CONF + self.cascade_margin
+
+    def _count_paths(self, svm_only, total):
+        with self._cascade_lock:
+            self._cascade_counts["svm"] += svm_only
+            self._cascade_counts["ensemble"] += total - svm_only
+
+    def _validate(self, text):
+        if not isinstance(text, str) or len(text.strip()) < 10:
             return {
                 "category": "Miscellaneous",
                 "confidence": 0.0,
                 "urgency": "Standard",
                 "error": "Input too short. Please provide at least 10 characters for proper categorization."
             }
-        
-        # --- 1. SVM Prediction (TF-IDF) ---
-        tfidf_feat = self.tfidf.transform([text])
-        svm_probs = self.svm_model.predict_proba(tfidf_feat)[0]
-        
-        # --- 2. BERT Prediction ---
-        inputs = self.tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=128)
-        with torch.no_grad():
-            bert_logits = self.bert_model(**inputs).logits
-            # Use torch.softmax like M3.ipynb for consistency
-            bert_probs = torch.softmax(bert_logits, dim=1).numpy()[0]
-        
-        # --- 3. Weighted Soft Voting (60% BERT, 40% SVM) ---
-        final_probs = (0.6 * bert_probs) + (0.4 * svm_probs)
+        return None
+
+    def _svm_probs(self, texts, timings=None):
+        with _stage(timings, "tfidf"):
+            tfidf_feat = self.tfidf.transform(texts)
+        with _stage(timings, "svm"):
+            return self.svm_model.predict_proba(tfidf_feat)
+
+    def _bert_probs(self, texts, batch_size=None, timings=None):
+        batch_size = batch_size or self.bert_batch_size
+        with _stage(timings, "tokenize"):
+            encoded = self.tokenizer(texts, truncation=True, max_length=self.MAX_LENGTH)['input_ids']
+
+        # Sort by token length so each micro-batch only pads up to its own longest text
+        order = sorted(range(len(texts)), key=lambda i: len(encoded[i]))
+        probs = np.zeros((len(texts), len(self.categories)), dtype=np.float32)
+        pad_id = self.tokenizer.pad_token_id or 0
+
+        for start in range(0, len(order), batch_size):
+            chunk = order[start:start + batch_size]
+            with _stage(timings, "tokenize"):
+                width = max(len(encoded[i]) for i in chunk)
+                input_ids = torch.full((len(chunk), width), pad_id, dtype=torch.long)
+                attention_mask = torch.zeros((len(chunk), width), dtype=torch.long)
+                for row, i in enumerate(chunk):
+                    ids = encoded[i]
+                    input_ids[row, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+                    attention_mask[row, :len(ids)] = 1
+
+            with _stage(timings, "bert_forward"):
+                bert_logits = self.bert_backend.logits(input_ids, attention_mask)
+                # Use torch.softmax like M3.ipynb for consistency
+                probs[chunk] = torch.softmax(bert_logits, dim=1).numpy()
+
+        return probs
+
+    def _build_result(self, text, final_probs, path):
         category_idx = np.argsort(final_probs)[-1]  # Get index of max probability
         confidence = float(final_probs[category_idx])  # Keep as decimal (0-1), not percentage
-        
-        # --- 4. CONFIDENCE THRESHOLDS (from M3.ipynb) ---
-        HIGH_CONF = 0.70   # 70%
-        LOW_CONF = 0.45    # 45%
-        
-        if confidence >= HIGH_CONF:
+
+        # --- 4. CONFIDENCE THRESHOLDS ---
+        if confidence >= self.HIGH_CONF:
             final_category = self.categories[category_idx]
             ticket_status = "Auto-Categorized"
-        elif confidence >= LOW_CONF:
+        elif confidence >= self.LOW_CONF:
             final_category = self.categories[category_idx]
             ticket_status = "Pending Verification"
         else:
             final_category = "Miscellaneous"
             ticket_status = "Requires Manual Review"
-        
+
         # --- 5. URGENCY DETECTION ---
         urgent_keywords = ['urgent', 'broken', 'emergency', 'critical', 'down', 'outage', 'crash', 'severe', 'flickering']
         urgency = "High" if any(word in text.lower() for word in urgent_keywords) else "Standard"
-        
+
         # --- 6. RETURN RESULT ---
         return {
             "category": final_category,
             "confidence": round(confidence * 100, 2),  # Convert to percentage for display
             "urgency": urgency,
-            "status": ticket_status
-        }
\ No newline at end of file
+            "status": ticket_status,
+            "path": path
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the DistilBERT classifier to a faster inference runtime")
+    parser.add_argument("format", choices=["onnx", "torchscript", "int8"])
+    parser.add_argument("--bert-path", default="Kaggle Dataset/models/final_bert_model")
+    parser.add_argument("--reference", default=REFERENCE_CSV,
+                        help="Labelled CSV (Document,Topic_group) for the INT8 accuracy guard")
+    args = parser.parse_args()
+
+    if args.format == "int8":
+        report = quantize_int8(args.bert_path, reference=args.reference)
+        print(json.dumps(report, indent=2))
+        print("INT8 model cached" if report["passed"] else "INT8 model rejected by the accuracy guard")
+    else:
+        exporter = export_onnx if args.format == "onnx" else export_torchscript
+        path = exporter(args.bert_path)
+        print(f"Exported {args.format} model to {path} (parity check passed)")
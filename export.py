@@ -0,0 +1,145 @@
+import io
+import os
+import csv
+import time
+import shlex
+import argparse
+from datetime import datetime, timedelta
+import database as db
+
+# Streaming export of tickets / feedback to CSV or Parquet.
+# Rows are read in chunks (database.iter_export_chunks) and each chunk is
+# written out before the next is fetched: CSV line by line, Parquet as one row
+# group per chunk. Memory stays bounded by chunk_size, not by the table.
+#
+#   python export.py tickets exports/tickets.csv
+#   python export.py tickets exports/resolved.parquet --status Resolved --category Hardware --since-days 7
+#   python export.py feedback exports/feedback.csv --columns created_at rating message
+
+FORMATS = ("csv", "parquet")
+INTEGER_COLUMNS = {"id", "rating"}
+
+
+def _format_for(out, fmt):
+    if fmt:
+        return fmt
+    name = out if isinstance(out, str) else getattr(out, "name", "")
+    return "parquet" if str(name).lower().endswith(".parquet") else "csv"
+
+
+def _write_csv_rows(text, columns, chunks):
+    writer = csv.writer(text)
+    writer.writerow(columns)
+    rows = 0
+    for chunk in chunks:
+        writer.writerows(chunk)
+        rows += len(chunk)
+    return rows
+
+
+def write_csv(out, columns, chunks):
+    """Write chunks to `out` (path or binary file). Returns the number of rows."""
+    if isinstance(out, str):
+        with open(out, "w", newline="", encoding="utf-8") as f:
+            return _write_csv_rows(f, columns, chunks)
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="", write_through=True)
+    try:
+        return _write_csv_rows(text, columns, chunks)
+    finally:
+        text.detach()  # Leave the caller's file open
+
+
+def write_parquet(out, columns, chunks):
+    """Write chunks to `out` (path or binary file), one row group per chunk. Returns the number of rows."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+
+    # created_at & co. are stored as text, so everything but the integer columns is a string
+    schema = pa.schema([(c, pa.int64() if c in INTEGER_COLUMNS else pa.string()) for c in columns])
+    rows = 0
+    with pq.ParquetWriter(out, schema) as writer:
+        for chunk in chunks:
+            arrays = [
+                pa.array([row[i] if c in INTEGER_COLUMNS or row[i] is None else str(row[i]) for row in chunk],
+                         type=schema.field(i).type)
+                for i, c in enumerate(columns)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            rows += len(chunk)
+    return rows
+
+
+def export(out, table="tickets", fmt=None, columns=None, filters=None, chunk_size=10000):
+    """Stream `table` into `out` (file path or binary file object). Returns a report dict."""
+    fmt = _format_for(out, fmt)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r} (choose from {', '.join(FORMATS)})")
+    if columns is not None and not list(columns):
+        raise ValueError("No columns selected")
+    columns = list(columns or db.EXPORT_TABLES.get(table, (None, ()))[1])
+    chunks = db.iter_export_chunks(table, columns, filters, chunk_size)
+
+    started = time.perf_counter()
+    if isinstance(out, str) and os.path.dirname(out):
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+    rows = (write_parquet if fmt == "parquet" else write_csv)(out, columns, chunks)
+    elapsed = time.perf_counter() - started
+
+    size = os.path.getsize(out) if isinstance(out, str) else out.tell()
+    return {
+        "table": table,
+        "output": out if isinstance(out, str) else getattr(out, "name", None),
+        "format": fmt,
+        "columns": columns,
+        "rows": rows,
+        "bytes": size,
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def cli_command(table, output, columns=None, filters=None):
+    """The `python export.py ...` command line that writes the same export to `output`."""
+    args = ["python", "export.py", table, output]
+    if columns and list(columns) != list(db.EXPORT_TABLES[table][1]):
+        args += ["--columns", *columns]
+    filters = filters or {}
+    for key, flag in (("status", "--status"), ("category", "--category")):
+        if filters.get(key):
+            args += [flag, *filters[key]]
+    for key, flag in (("date_from", "--from"), ("date_to", "--to")):
+        if filters.get(key):
+            args += [flag, str(filters[key])]
+    return shlex.join(args)
+
+
+def print_report(report):
+    print(f"Exported {report['rows']} {report['table']} rows to {report['output']} "
+          f"({report['format']}, {report['bytes'] / 1e6:.1f} MB)")
+    print(f"Total: {report['elapsed_s']}s, {report['rows_per_sec']} rows/sec")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream tickets or feedback from service_desk.db to CSV/Parquet")
+    parser.add_argument("table", choices=sorted(db.EXPORT_TABLES))
+    parser.add_argument("output", help="Destination file (.csv or .parquet)")
+    parser.add_argument("--format", choices=FORMATS, help="Default: from the file extension")
+    parser.add_argument("--columns", nargs="+", help="Columns to export (default: all)")
+    parser.add_argument("--status", nargs="+", help="Only tickets with these statuses")
+    parser.add_argument("--category", nargs="+", help="Only tickets in these categories")
+    parser.add_argument("--from", dest="date_from", help="Created on/after (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", help="Created before (YYYY-MM-DD)")
+    parser.add_argument("--since-days", type=int, help="Created in the last N days (for scheduled exports)")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Rows fetched and written per chunk")
+    args = parser.parse_args()
+
+    filters = {"status": args.status, "category": args.category, "date_from": args.date_from, "date_to": args.date_to}
+    if args.since_days is not None:
+        filters["date_from"] = datetime.now() - timedelta(days=args.since_days)
+
+    db.init_db()
+    report = export(args.output, args.table, args.format, args.columns, filters, args.chunk_size)
+    print_report(report)
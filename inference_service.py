@@ -0,0 +1,270 @@
+import json
+import queue
+import asyncio
+import urllib.error
+import urllib.request
+from engine_loader import EngineLoader
+from batch_scheduler import TicketBatcher
+from metrics import REGISTRY
+
+# Standalone ticket-categorization HTTP service (stdlib asyncio only).
+# Other intake channels (email gateway, chat bot, monitoring alerts) and the
+# Streamlit UI in client mode can share one loaded engine instead of each
+# loading their own models.
+#
+#   POST /classify        {"text": "..."}          -> result dict
+#   POST /classify/batch  {"texts": ["...", ...]}  -> {"results": [...]}
+#   GET  /health                                   -> liveness (always 200 while the process is up)
+#   GET  /ready                                    -> 200 once models are loaded, 503 before
+#   GET  /metrics                                  -> per-stage latency histograms (Prometheus text)
+#
+# All inference goes through one TicketBatcher, so concurrent requests are
+# coalesced and the engine is only ever used from a single thread. With
+# --workers N each coalesced batch is split over N processes (worker_pool.py).
+
+MAX_BODY_BYTES = 1024 * 1024
+MAX_BATCH_TEXTS = 256
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               408: "Request Timeout", 413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+               504: "Gateway Timeout"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class InferenceService:
+    def __init__(self, engine_factory, max_inflight=64, request_timeout=10.0,
+                 max_batch_size=16, max_wait_ms=10, max_queue_size=512):
+        self.loader = EngineLoader(engine_factory, warm_up=True)
+        self.request_timeout = request_timeout
+        self.max_inflight = max_inflight
+        self._batcher_args = dict(max_batch_size=max_batch_size, max_wait_ms=max_wait_ms,
+                                  max_queue_size=max_queue_size)
+        self._batcher = None
+        self._inflight = 0
+        self._server = None
+
+    # --- Request handling ---
+    async def handle(self, method, path, body):
+        if path == "/metrics":
+            return 200, REGISTRY.prometheus()
+        if path == "/health":
+            return 200, {"status": "ok", "engine": self.loader.state, "inflight": self._inflight}
+        if not self.loader.ready:
+            self.loader.retry()  # A failed load is retried once its backoff has passed
+        if path == "/ready":
+            if not self.loader.ready:
+                raise HttpError(503, f"Engine {self.loader.state}", {"Retry-After": "5"})
+            return 200, {"status": "ready", "batcher": self._get_batcher().stats()}
+
+        if path not in ("/classify", "/classify/batch"):
+            raise HttpError(404, f"No route for {path}")
+        if method != "POST":
+            raise HttpError(405, "Use POST")
+        if not self.loader.ready:
+            raise HttpError(503, f"Engine {self.loader.state}", {"Retry-After": "5"})
+
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            raise HttpError(400, "Body must be JSON")
+        if not isinstance(payload, dict):
+            raise HttpError(400, "Body must be a JSON object")
+        if path == "/classify":
+            texts = [payload.get("text")]
+            if not isinstance(texts[0], str):
+                raise HttpError(400, "'text' must be a string")
+        else:
+            texts = payload.get("texts")
+            if (not isinstance(texts, list) or len(texts) > MAX_BATCH_TEXTS
+                    or not all(isinstance(t, str) for t in texts)):
+                raise HttpError(400, f"'texts' must be a list of at most {MAX_BATCH_TEXTS} strings")
+
+        # Backpressure: shed load instead of queueing unboundedly
+        if self._inflight >= self.max_inflight:
+            raise HttpError(503, "Server overloaded", {"Retry-After": "1"})
+        self._inflight += 1
+        try:
+            results = await asyncio.wait_for(self._classify(texts), self.request_timeout)
+        except asyncio.TimeoutError:
+            raise HttpError(504, f"Inference timed out after {self.request_timeout}s")
+        finally:
+            self._inflight -= 1
+
+        if path == "/classify":
+            return 200, results[0]
+        return 200, {"results": results}
+
+    async def _classify(self, texts):
+        batcher = self._get_batcher()
+        try:
+            futures = [asyncio.wrap_future(batcher.submit(text, timeout=0)) for text in texts]
+        except queue.Full:
+            raise HttpError(503, "Inference queue full", {"Retry-After": "1"})
+        return list(await asyncio.gather(*futures))
+
+    def _get_batcher(self):
+        if self._batcher is None:
+            self._batcher = TicketBatcher(self.loader.wait(), **self._batcher_args)
+        return self._batcher
+
+    # --- Minimal HTTP/1.1 server ---
+    async def _serve_connection(self, reader, writer):
+        status, payload, headers = 500, {"error": "Internal error"}, {}
+        try:
+            method, path, body = await asyncio.wait_for(self._read_request(reader), self.request_timeout)
+            status, payload = await self.handle(method, path, body)
+        except HttpError as e:
+            status, payload, headers = e.status, {"error": e.message}, e.headers
+        except asyncio.TimeoutError:
+            status, payload = 408, {"error": "Request read timed out"}
+        except Exception as e:
+            payload = {"error": f"{type(e).__name__}: {e}"}
+
+        if isinstance(payload, str):
+            data, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            data, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+        head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                f"Content-Type: {content_type}",
+                f"Content-Length: {len(data)}",
+                "Connection: close"]
+        head += [f"{k}: {v}" for k, v in headers.items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        parts = request_line.split()
+        if len(parts) != 3:
+            raise HttpError(400, "Malformed request line")
+        method, target = parts[0].upper(), parts[1]
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1")
+            if line in ("\r\n", "\n", ""):
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HttpError(400, "Invalid Content-Length")
+        if length < 0:
+            raise HttpError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, f"Body larger than {MAX_BODY_BYTES} bytes")
+        try:
+            body = await reader.readexactly(length) if length else b""
+        except asyncio.IncompleteReadError:
+            raise HttpError(400, "Body shorter than Content-Length")
+        return method, target.split("?", 1)[0], body
+
+    async def start(self, host="127.0.0.1", port=8765):
+        self._server = await asyncio.start_server(self._serve_connection, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self, host="127.0.0.1", port=8765):
+        await self.start(host, port)
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._batcher:
+            self._batcher.shutdown(wait=False)
+        engine = self.loader.wait(0) if self.loader.ready else None
+        if hasattr(engine, "shutdown"):
+            engine.shutdown()  # Worker processes of an InferencePool
+
+
+class InferenceClient:
+    """Blocking client with the same process_ticket / process_tickets shape as the engine."""
+
+    def __init__(self, base_url, timeout=15.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def process_ticket(self, text):
+        return self._request("POST", "/classify", {"text": text})
+
+    def process_tickets(self, texts):
+        return self._request("POST", "/classify/batch", {"texts": list(texts)})["results"]
+
+    def ready(self, timeout=1.0):
+        try:
+            self._request("GET", "/ready", timeout=timeout)
+            return True
+        except Exception:
+            return False
+
+    def _request(self, method, path, payload=None, timeout=None):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error", e.reason)
+            except ValueError:
+                message = e.reason
+            raise RuntimeError(f"Inference service error {e.code}: {message}")
+
+
+MODEL_PATHS = dict(
+    bert_path="Kaggle Dataset/models/final_bert_model",
+    svm_path="Kaggle Dataset/models/svm_model.pkl",
+    tfidf_path="Kaggle Dataset/models/tfidf_vectorizer.pkl",
+)
+
+
+def default_engine():
+    from engine_wrapper import ProfessionalTicketEngine
+    from prediction_cache import PredictionCache
+    return ProfessionalTicketEngine(**MODEL_PATHS, cache=PredictionCache())
+
+
+def default_pool(n_workers, threads_per_worker=1):
+    """The default engine in `n_workers` processes (worker_pool.py); same interface as the engine."""
+    from worker_pool import InferencePool
+    return InferencePool(**MODEL_PATHS, n_workers=n_workers, threads_per_worker=threads_per_worker,
+                         prediction_cache={})
+
+
+def engine_factory(workers=0):
+    """default_engine, or with workers > 0 a process pool of that size."""
+    if workers and workers > 0:
+        return lambda: default_pool(workers)
+    return default_engine
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the ticket categorization HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-inflight", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-request inference timeout (seconds)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Run inference in N worker processes (worker_pool.py); 0 = in this process")
+    args = parser.parse_args()
+
+    service = InferenceService(engine_factory(args.workers), max_inflight=args.max_inflight,
+                               request_timeout=args.timeout)
+    print(f"Serving on http://{args.host}:{args.port} (models loading in the background)")
+    asyncio.run(service.serve_forever(args.host, args.port))
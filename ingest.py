@@ -0,0 +1,133 @@
+import os
+import csv
+import json
+import time
+import argparse
+from itertools import islice
+import database as db
+
+# Bulk ingestion of ticket backlogs (legacy queue migrations, replays).
+# Streams a JSONL or CSV file record by record, categorizes each batch with one
+# engine.process_tickets() call and writes it with one transaction. The number
+# of records done is checkpointed in the same transaction, so an interrupted
+# run resumes exactly where it stopped.
+#
+#   python ingest.py backlog.jsonl --batch-size 64
+#   python ingest.py legacy_queue.csv --text-field description --title-field subject
+
+TEXT_FIELDS = ("description", "body", "text")
+TITLE_FIELDS = ("title", "subject")
+
+
+def read_records(path):
+    """Yield one dict per record without loading the whole file."""
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _pick(record, preferred, fallbacks):
+    if preferred:
+        return record.get(preferred) or ""
+    for name in fallbacks:
+        if record.get(name):
+            return record[name]
+    return ""
+
+
+def ingest(path, classifier, batch_size=64, text_field=None, title_field=None,
+           user_id="bulk-ingest", user_name="Bulk Ingest", resume=True, limit=None):
+    """Ingest `path` through `classifier` (anything with process_tickets). Returns a report dict."""
+    db.init_ingest_checkpoint_table()
+    source = os.path.abspath(path)
+    start_at = db.get_ingest_checkpoint(source) if resume else 0
+
+    timings = {"read": 0.0, "categorize": 0.0, "write": 0.0}
+    counts = {"ingested": 0, "flagged": 0, "skipped": start_at}
+    records_done = start_at
+    started = time.perf_counter()
+
+    records = islice(read_records(path), start_at, None if limit is None else start_at + limit)
+    while True:
+        t0 = time.perf_counter()
+        batch = list(islice(records, batch_size))
+        t1 = time.perf_counter()
+        timings["read"] += t1 - t0
+        if not batch:
+            break
+
+        titles = [str(_pick(r, title_field, TITLE_FIELDS))[:200] for r in batch]
+        texts = [str(_pick(r, text_field, TEXT_FIELDS)) for r in batch]
+        results = classifier.process_tickets(texts)
+        t2 = time.perf_counter()
+        timings["categorize"] += t2 - t1
+
+        rows = []
+        for title, text, result in zip(titles, texts, results):
+            if result.get("error"):
+                counts["flagged"] += 1  # Kept (legacy tickets must not vanish) but left for manual triage
+            rows.append((user_id, user_name, title, text, result["category"], result["urgency"]))
+        records_done += len(batch)
+        db.add_tickets_bulk(rows, checkpoint=(source, records_done))
+        timings["write"] += time.perf_counter() - t2
+        counts["ingested"] += len(batch)
+
+    elapsed = time.perf_counter() - started
+    n = counts["ingested"]
+    return {
+        "source": source,
+        **counts,
+        "records_done": records_done,
+        "elapsed_s": round(elapsed, 3),
+        "tickets_per_sec": round(n / elapsed, 1) if elapsed else 0.0,
+        "stages": {
+            stage: {"seconds": round(seconds, 3), "tickets_per_sec": round(n / seconds, 1) if seconds else None}
+            for stage, seconds in timings.items()
+        },
+    }
+
+
+def print_report(report):
+    print(f"Ingested {report['ingested']} tickets from {report['source']} "
+          f"({report['skipped']} already done, {report['flagged']} flagged for manual review)")
+    print(f"Total: {report['elapsed_s']}s, {report['tickets_per_sec']} tickets/sec")
+    for stage, stats in report["stages"].items():
+        print(f"  {stage:<11} {stats['seconds']:>9.3f}s  {stats['tickets_per_sec'] or '-':>10} tickets/sec")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a JSONL/CSV ticket backlog into service_desk.db")
+    parser.add_argument("path", help="JSONL (one object per line) or .csv file")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--text-field", help="Field holding the ticket description (default: description/body/text)")
+    parser.add_argument("--title-field", help="Field holding the ticket title (default: title/subject)")
+    parser.add_argument("--user-id", default="bulk-ingest")
+    parser.add_argument("--user-name", default="Bulk Ingest")
+    parser.add_argument("--limit", type=int, help="Stop after this many records")
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint and start from the top")
+    parser.add_argument("--service-url", help="Categorize through inference_service.py instead of loading models")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Split each batch over N worker processes (worker_pool.py); 0 = in this process")
+    args = parser.parse_args()
+
+    db.init_db()
+    if args.service_url:
+        from inference_service import InferenceClient
+        classifier = InferenceClient(args.service_url, timeout=120)
+    else:
+        from inference_service import engine_factory
+        classifier = engine_factory(args.workers)()
+        if args.workers:
+            classifier.warm_up()  # Every worker loaded before the first batch is split over them
+
+    report = ingest(args.path, classifier, batch_size=args.batch_size, text_field=args.text_field,
+                    title_field=args.title_field, user_id=args.user_id, user_name=args.user_name,
+                    resume=not args.restart, limit=args.limit)
+    print_report(report)
+    if hasattr(classifier, "shutdown"):
+        classifier.shutdown()
@@ -0,0 +1,94 @@
+import time
+import argparse
+import threading
+import database as db
+
+# Background runner for the time-based ticket lifecycle jobs in database.py
+# (auto-close, SLA breach marking, escalation). Started once per process, e.g.
+# from a st.cache_resource in app.py, instead of running on every page render.
+# Each run is claimed in the lifecycle_runs table first, so when several
+# processes (Streamlit workers, the inference service) run a scheduler against
+# the same database, a job still fires at most once per interval.
+#
+#   python lifecycle.py            # run the jobs every 60 s in the foreground
+#   python lifecycle.py --once     # run them once (cron-style) and print the stats
+
+JOBS = {
+    "sla_breach": db.mark_sla_breaches,
+    "escalate": db.escalate_breached_tickets,
+    "auto_close": db.close_resolved_tickets,
+}
+
+
+class LifecycleScheduler:
+    def __init__(self, interval=60.0, jobs=None):
+        self.interval = interval
+        self.jobs = dict(jobs or JOBS)
+        self.last_runs = {}
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="lifecycle-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_once(self, force=False):
+        """Run every job that is due. force=True ignores the interval (the Tab 1 button).
+        Returns one stats dict per job that ran."""
+        runs = []
+        with self._lock:  # A manual run and the timer never overlap within a process
+            for name, job in self.jobs.items():
+                # Slightly under the interval so timer jitter doesn't skip every other run
+                run_id = db.claim_lifecycle_run(name, 0 if force else self.interval * 0.9)
+                if run_id is None:
+                    continue  # Another process ran it recently
+                started = time.perf_counter()
+                rows, error = 0, None
+                try:
+                    rows = job()
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                duration_ms = round((time.perf_counter() - started) * 1000, 2)
+                db.finish_lifecycle_run(run_id, rows, duration_ms, error)
+                stats = {"job": name, "rows_touched": rows, "duration_ms": duration_ms, "error": error}
+                self.last_runs[name] = stats
+                runs.append(stats)
+        return runs
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                pass  # Database briefly unavailable; try again next tick
+            self._stop.wait(self.interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the ticket lifecycle jobs")
+    parser.add_argument("--interval", type=float, default=60.0, help="Seconds between runs")
+    parser.add_argument("--once", action="store_true", help="Run every job once and exit")
+    args = parser.parse_args()
+
+    db.init_db()
+    scheduler = LifecycleScheduler(args.interval)
+    if args.once:
+        for run in scheduler.run_once(force=True):
+            print(f"{run['job']:<11} {run['rows_touched']:>6} rows  {run['duration_ms']:>8.2f} ms"
+                  + (f"  ERROR {run['error']}" if run["error"] else ""))
+    else:
+        print(f"Running lifecycle jobs every {args.interval:g}s (Ctrl+C to stop)")
+        scheduler.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            scheduler.stop()
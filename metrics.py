@@ -0,0 +1,114 @@
+import time
+import bisect
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# Lightweight per-stage latency instrumentation.
+# Each stage keeps a rolling window of recent durations (for percentiles and
+# throughput in the admin panel) plus cumulative histogram buckets (for the
+# Prometheus text export). Recording is a perf_counter() pair, a deque append
+# and a bisect under a lock, so it can stay on in the hot path.
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Stage:
+    __slots__ = ("recent", "bucket_counts", "count", "total")
+
+    def __init__(self, window, n_buckets):
+        self.recent = deque(maxlen=window)   # (finished_at, seconds)
+        self.bucket_counts = [0] * (n_buckets + 1)  # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+
+
+class StageMetrics:
+    def __init__(self, window=1000, buckets=DEFAULT_BUCKETS):
+        self.window = window
+        self.buckets = tuple(buckets)
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        now = time.monotonic()
+        with self._lock:
+            s = self._stages.get(stage)
+            if s is None:
+                s = self._stages[stage] = _Stage(self.window, len(self.buckets))
+            s.recent.append((now, seconds))
+            s.bucket_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            s.count += 1
+            s.total += seconds
+
+    @contextmanager
+    def time(self, stage, timings=None):
+        """Time a block. If `timings` (a dict) is given, the duration is also added to it."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(stage, elapsed)
+            if timings is not None:
+                timings[stage] = timings.get(stage, 0.0) + elapsed
+
+    def timed(self, stage):
+        """Decorator form of time()."""
+        def wrap(fn):
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                with self.time(stage):
+                    return fn(*args, **kwargs)
+            return inner
+        return wrap
+
+    def summary(self):
+        """Recent-window percentiles and throughput per stage."""
+        now = time.monotonic()
+        with self._lock:
+            snapshot = {name: (list(s.recent), s.count) for name, s in self._stages.items()}
+
+        out = {}
+        for name, (recent, total_count) in sorted(snapshot.items()):
+            durations = sorted(d for _, d in recent)
+            span = now - recent[0][0] if recent else 0.0
+
+            def pct(p):
+                return round(durations[min(len(durations) - 1, int(len(durations) * p / 100))] * 1000, 3)
+
+            out[name] = {
+                "count": total_count,
+                "window": len(durations),
+                "p50_ms": pct(50),
+                "p95_ms": pct(95),
+                "p99_ms": pct(99),
+                "per_sec": round((len(durations) - 1) / span, 2) if len(durations) > 1 and span > 0 else None,
+            }
+        return out
+
+    def prometheus(self, prefix="ticket_stage"):
+        """Cumulative histograms in the Prometheus text exposition format."""
+        with self._lock:
+            snapshot = {name: (list(s.bucket_counts), s.count, s.total) for name, s in self._stages.items()}
+
+        lines = [f"# HELP {prefix}_seconds Duration of each pipeline stage",
+                 f"# TYPE {prefix}_seconds histogram"]
+        for name, (bucket_counts, count, total) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{prefix}_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_seconds_sum{{stage="{name}"}} {total:.6f}')
+            lines.append(f'{prefix}_seconds_count{{stage="{name}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+# Process-wide registry shared by the engine and the database layer
+REGISTRY = StageMetrics()
@@ -1,6 +1,6 @@
 import streamlit as st
-import time
 import database as db
+from write_behind import shared_writer
 
 # Page configuration
 st.set_page_config(page_title="Help & Support", layout="wide")
@@ -36,7 +36,7 @@ with tab1:
             "The system uses a hybrid ensemble approach combining:\n- **BERT**: Advanced language model (60% weight) for deep semantic understanding\n- **SVM**: Support Vector Machine with TF-IDF (40% weight) for statistical pattern matching\n- **Weighted Soft Voting**: Combines both models with 60/40 weighting for accurate predictions",
         
         "What are the ticket statuses?": 
-            "Tickets flow through these statuses:\n- **Open**: Initial state when created\n- **In Progress**: Support team is working on it\n- **Resolved**: Issue has been fixed\n- **Closed**: Resolved tickets auto-close after 24 hours",
+            "Tickets flow through these statuses:\n- **Open**: Initial state when created\n- **In Progress**: Support team is working on it\n- **Resolved**: Issue has been fixed\n- **Closed**: Resolved tickets auto-close 24 hours after they were resolved",
         
         "What is SLA Status?": 
             "SLA (Service Level Agreement) Status shows response time:\n- 🟢 **On Track**: < 2 hours (within SLA)\n- 🟡 **Warning**: 2-6 hours (approaching SLA breach)\n- 🔴 **Breached**: > 6 hours (SLA violated)",
@@ -108,6 +108,11 @@ with tab3:
     user_id = st.session_state.get('user_id', 'Anonymous')
     user_name = st.session_state.get('user_name', 'Unknown')
     
+    # Confirmation for the submission that triggered this rerun
+    if st.session_state.pop("feedback_saved", False):
+        st.success("✅ Thank you! Your feedback has been saved and will be reviewed by our team.")
+        st.info("📧 Our team will analyze your feedback and use it to improve the system.")
+    
     with st.form("feedback_form"):
         st.subheader("Feedback Details")
         
@@ -141,7 +146,8 @@ with tab3:
         if submit_feedback:
             if message.strip():
                 try:
-                    db.add_feedback(
+                    writer = shared_writer()
+                    (writer or db).add_feedback(
                         user_id=user_id,
                         user_name=user_name,
                         email=email,
@@ -149,9 +155,9 @@ with tab3:
                         message=message,
                         rating=rating
                     )
-                    st.success("✅ Thank you! Your feedback has been saved and will be reviewed by our team.")
-                    st.info("📧 Our team will analyze your feedback and use it to improve the system.")
-                    time.sleep(1)
+                    if writer:
+                        writer.flush()  # Committed before the rerun reads feedback back
+                    st.session_state.feedback_saved = True
                     st.rerun()
                 except Exception as e:
                     st.error(f"Error saving feedback: {str(e)}")
@@ -0,0 +1,129 @@
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import database as db
+
+# Prediction cache for ProfessionalTicketEngine.
+# Resubmitted tickets (retries, reloads, copy-pasted outage reports) reuse the
+# final ensemble probabilities instead of running SVM + BERT again. Lookups go
+# to an in-process LRU first, then to the prediction_cache table in
+# service_desk.predictions.db, which survives restarts and is shared between
+# processes. It is kept out of service_desk.db so that caching a prediction
+# doesn't invalidate database.py's read cache. A batch is looked up with
+# get_many(): one query for all of its memory misses.
+
+
+def normalize_text(text):
+    # TF-IDF and the uncased DistilBERT tokenizer both ignore case and whitespace runs
+    return " ".join(text.lower().split())
+
+
+def cache_key(text, model_version):
+    return hashlib.sha256(f"{model_version}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class PredictionCache:
+    def __init__(self, max_entries=10000, ttl_seconds=7 * 24 * 3600, persist=True, prune_every=500):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.persist = persist
+        self.prune_every = prune_every
+        self._entries = OrderedDict()  # key -> (probs, path, created_at)
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self._stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "evictions": 0, "db_errors": 0}
+        if persist:
+            db.init_prediction_cache_table()
+
+    def get(self, text, model_version):
+        """Return (final_probs, path) for a cached ticket text, or None."""
+        return self.get_many([text], model_version)[0]
+
+    def get_many(self, texts, model_version):
+        """(final_probs, path) or None for each text. Memory misses are looked up in one query."""
+        keys = [cache_key(text, model_version) for text in texts]
+        results = [None] * len(keys)
+        missing = []
+        now = time.time()
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None:
+                    probs, path, created_at = entry
+                    if now - created_at <= self.ttl:
+                        self._entries.move_to_end(key)
+                        self._stats["memory_hits"] += 1
+                        results[i] = (probs, path)
+                        continue
+                    del self._entries[key]
+                    self._stats["evictions"] += 1
+                missing.append(i)
+
+        rows = {}
+        if self.persist and missing:
+            try:
+                rows = db.get_cached_predictions({keys[i] for i in missing}, now - self.ttl)
+            except Exception:
+                self._bump("db_errors")
+        with self._lock:
+            for i in missing:
+                row = rows.get(keys[i])
+                if row:
+                    probs, path = np.array(json.loads(row[0])), row[1]
+                    self._store(keys[i], probs, path, row[2])
+                    self._stats["db_hits"] += 1
+                    results[i] = (probs, path)
+                else:
+                    self._stats["misses"] += 1
+        return results
+
+    def put_many(self, predictions, model_version):
+        """predictions: iterable of (text, final_probs, path)"""
+        now = time.time()
+        rows = []
+        with self._lock:
+            for text, probs, path in predictions:
+                key = cache_key(text, model_version)
+                self._store(key, probs, path, now)
+                rows.append((key, model_version, json.dumps([float(p) for p in probs]), path, now))
+            self._writes_since_prune += len(rows)
+            prune = self.persist and self._writes_since_prune >= self.prune_every
+            if prune:
+                self._writes_since_prune = 0
+
+        if self.persist and rows:
+            try:
+                db.save_cached_predictions(rows)
+                if prune:
+                    removed = db.prune_prediction_cache(now - self.ttl, self.max_entries)
+                    self._bump("evictions", removed)
+            except Exception:
+                self._bump("db_errors")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        hits = stats["memory_hits"] + stats["db_hits"]
+        stats["hits"] = hits
+        stats["hit_rate"] = round(hits / (hits + stats["misses"]), 4) if hits + stats["misses"] else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, key, probs, path, created_at):
+        # Caller holds self._lock
+        self._entries[key] = (probs, path, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _bump(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
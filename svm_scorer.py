@@ -0,0 +1,174 @@
+import os
+import hashlib
+import warnings
+import joblib
+import numpy as np
+
+# Fast replacement for SVC(kernel='linear', probability=True).predict_proba.
+# libsvm scores every one-vs-one pair against the support vectors and then
+# couples the Platt-scaled pairwise probabilities one sample at a time. For a
+# linear kernel each pair collapses to a single weight vector, so a whole
+# TF-IDF batch is one sparse x dense matmul followed by the same coupling,
+# vectorized over the batch.
+
+MIN_PROB = 1e-7  # Same clipping libsvm applies to pairwise probabilities
+
+
+def linear_path(svm_path):
+    """Location of the converted model for a given svm_model.pkl."""
+    return os.path.splitext(svm_path)[0] + "_linear.npz"
+
+
+def file_fingerprint(path):
+    """SHA-256 of a model file; the converted scorer records the one of the pkl it came from."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class LinearSVMScorer:
+    def __init__(self, weights, intercept, prob_a, prob_b, classes, source=""):
+        self.source = source          # Fingerprint of the svm_model.pkl this was converted from
+        self.weights = weights        # (n_features, n_pairs)
+        self.intercept = intercept    # (n_pairs,)
+        self.prob_a = prob_a          # Platt parameters per pair
+        self.prob_b = prob_b
+        self.classes_ = classes
+
+    @classmethod
+    def from_svc(cls, svc):
+        if getattr(svc, "kernel", None) != "linear" or not getattr(svc, "probability", False):
+            raise ValueError("Only SVC(kernel='linear', probability=True) models can be converted")
+        coef = svc.coef_
+        coef = coef.toarray() if hasattr(coef, "toarray") else np.asarray(coef, dtype=np.float64)
+        intercept = np.asarray(svc.intercept_, dtype=np.float64)
+        if len(svc.classes_) == 2:
+            # sklearn flips the sign of binary coef_/intercept_ relative to libsvm;
+            # the Platt parameters are fitted on libsvm's decision value, so undo it
+            coef, intercept = -coef, -intercept
+        return cls(
+            weights=np.ascontiguousarray(coef.T, dtype=np.float64),
+            intercept=intercept,
+            prob_a=np.asarray(svc.probA_, dtype=np.float64),
+            prob_b=np.asarray(svc.probB_, dtype=np.float64),
+            # Object-dtype labels would need pickle to round-trip through np.savez
+            classes=np.asarray(svc.classes_).astype(str) if svc.classes_.dtype == object else np.asarray(svc.classes_),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            source = str(data["source"]) if "source" in data.files else ""
+            return cls(data["weights"], data["intercept"], data["prob_a"], data["prob_b"], data["classes"], source)
+
+    def save(self, path):
+        np.savez(path, weights=self.weights, intercept=self.intercept,
+                 prob_a=self.prob_a, prob_b=self.prob_b, classes=self.classes_, source=np.array(self.source))
+
+    def decision_function(self, X):
+        # One-vs-one decision values, same pair order and sign as libsvm: (0,1), (0,2), ..., (k-2,k-1)
+        return np.asarray(X @ self.weights) + self.intercept
+
+    def predict_proba(self, X):
+        dec = self.decision_function(X)
+
+        # Platt scaling per pair (numerically stable sigmoid, as in libsvm's sigmoid_predict)
+        f = dec * self.prob_a + self.prob_b
+        pos = np.exp(-np.abs(f))
+        pairwise = np.where(f >= 0, pos / (1.0 + pos), 1.0 / (1.0 + pos))
+        pairwise = np.clip(pairwise, MIN_PROB, 1 - MIN_PROB)
+
+        # sklearn's libsvm couples the binary case too (iteratively, so not exactly pairwise[:, 0])
+        k = len(self.classes_)
+        r = np.zeros((len(dec), k, k))
+        pair = 0
+        for i in range(k):
+            for j in range(i + 1, k):
+                r[:, i, j] = pairwise[:, pair]
+                r[:, j, i] = 1 - pairwise[:, pair]
+                pair += 1
+        return _couple(r)
+
+
+def _couple(r):
+    """Wu, Lin & Weng pairwise coupling (libsvm multiclass_probability), batched.
+
+    r[n, i, j] is the probability of class i over class j for sample n.
+    """
+    n, k = r.shape[0], r.shape[1]
+    eps = 0.005 / k
+    max_iter = max(100, k)
+
+    # Q[t][t] = sum_{j != t} r[j][t]^2 ; Q[t][j] = -r[j][t] * r[t][j]
+    rt = np.transpose(r, (0, 2, 1))
+    Q = -rt * r
+    idx = np.arange(k)
+    Q[:, idx, idx] = np.sum(rt ** 2, axis=2)  # r[t][t] is zero
+
+    p = np.full((n, k), 1.0 / k)
+    active = np.ones(n, dtype=bool)
+    for _ in range(max_iter):
+        Qp = np.einsum("ntj,nj->nt", Q, p)
+        pQp = np.sum(p * Qp, axis=1)
+        max_error = np.max(np.abs(Qp - pQp[:, None]), axis=1)
+        active &= max_error >= eps
+        if not active.any():
+            break
+
+        # Gauss-Seidel sweep over classes; converged samples get diff = 0, i.e. no change
+        for t in range(k):
+            diff = np.where(active, (-Qp[:, t] + pQp) / Q[:, t, t], 0.0)
+            p[:, t] += diff
+            scale = 1.0 + diff
+            pQp = (pQp + diff * (diff * Q[:, t, t] + 2 * Qp[:, t])) / scale / scale
+            Qp = (Qp + diff[:, None] * Q[:, t, :]) / scale[:, None]
+            p /= scale[:, None]
+    return p
+
+
+def convert_svm(svm_path, check_X=None, atol=1e-6):
+    """Convert svm_model.pkl into the dense linear form next to it.
+
+    If `check_X` (a TF-IDF matrix) is given, the converted scorer must match
+    the pickled model's predict_proba within `atol` or ValueError is raised.
+    """
+    svc = joblib.load(svm_path)
+    scorer = LinearSVMScorer.from_svc(svc)
+    scorer.source = file_fingerprint(svm_path)
+    if check_X is not None:
+        max_diff = float(np.abs(scorer.predict_proba(check_X) - svc.predict_proba(check_X)).max())
+        if max_diff > atol:
+            raise ValueError(f"Linear scorer differs from the pickled SVC by {max_diff:.2e} (tolerance {atol:.0e})")
+    out_path = linear_path(svm_path)
+    scorer.save(out_path)
+    return out_path
+
+
+def load_svm(svm_path):
+    """Load the converted linear scorer if present and converted from this svm_model.pkl,
+    otherwise unpickle the SVC."""
+    path = linear_path(svm_path)
+    if os.path.exists(path):
+        scorer = LinearSVMScorer.load(path)
+        if not os.path.exists(svm_path) or scorer.source == file_fingerprint(svm_path):
+            return scorer
+        # Retrained pkl, old conversion: serving it would silently use the previous weights
+        warnings.warn(f"{path} was converted from a different {os.path.basename(svm_path)}; "
+                      "using the pickled SVC (re-run svm_scorer.py)")
+    return joblib.load(svm_path)
+
+
+if __name__ == "__main__":
+    import argparse
+    from engine_wrapper import PARITY_TEXTS
+
+    parser = argparse.ArgumentParser(description="Convert the linear SVC into a fast NumPy scorer")
+    parser.add_argument("--svm-path", default="Kaggle Dataset/models/svm_model.pkl")
+    parser.add_argument("--tfidf-path", default="Kaggle Dataset/models/tfidf_vectorizer.pkl")
+    args = parser.parse_args()
+
+    check_X = joblib.load(args.tfidf_path).transform(PARITY_TEXTS)
+    path = convert_svm(args.svm_path, check_X)
+    print(f"Converted SVM written to {path} (probability check passed)")
@@ -0,0 +1,73 @@
+import os
+import sys
+import shutil
+import warnings
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+# The checked-in DistilBERT weights are LFS pointers; tests build a tiny random
+# model with the same tokenizer and label count instead.
+TOKENIZER_DIR = os.path.join(REPO_DIR, "Kaggle Dataset", "models", "final_bert_model")
+TOKENIZER_FILES = ("tokenizer.json", "tokenizer_config.json", "special_tokens_map.json", "vocab.txt")
+
+
+def save_tiny_bert(path, seed=0):
+    import torch
+    from transformers import DistilBertConfig, DistilBertForSequenceClassification
+
+    torch.manual_seed(seed)
+    config = DistilBertConfig(vocab_size=30522, dim=32, n_layers=1, n_heads=2, hidden_dim=64,
+                              max_position_embeddings=128, num_labels=8)
+    DistilBertForSequenceClassification(config).eval().save_pretrained(path, safe_serialization=True)
+    for name in TOKENIZER_FILES:
+        shutil.copy(os.path.join(TOKENIZER_DIR, name), path)
+    return str(path)
+
+
+@pytest.fixture
+def tiny_bert(tmp_path):
+    return save_tiny_bert(tmp_path / "bert")
+
+
+def save_tiny_models(path):
+    """Tiny BERT plus a TF-IDF/SVC pair trained on PARITY_TEXTS: enough for a real ProfessionalTicketEngine."""
+    import joblib
+    from sklearn.svm import SVC
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from engine_wrapper import PARITY_TEXTS
+
+    os.makedirs(path, exist_ok=True)
+    bert = save_tiny_bert(os.path.join(path, "bert"))
+    texts = [f"{text} {suffix}" for text in PARITY_TEXTS for suffix in ("", "please", "urgent", "today", "thanks")]
+    labels = [i for i in range(len(PARITY_TEXTS)) for _ in range(5)]
+    tfidf = TfidfVectorizer().fit(texts)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)  # SVC(probability=True) is what the shipped model uses
+        svm = SVC(kernel="linear", probability=True, random_state=0).fit(tfidf.transform(texts), labels)
+    svm_path, tfidf_path = os.path.join(path, "svm_model.pkl"), os.path.join(path, "tfidf_vectorizer.pkl")
+    joblib.dump(svm, svm_path)
+    joblib.dump(tfidf, tfidf_path)
+    return bert, svm_path, tfidf_path
+
+
+@pytest.fixture
+def tiny_models(tmp_path):
+    return save_tiny_models(str(tmp_path / "models"))
+
+
+@pytest.fixture
+def temp_db(tmp_path):
+    """database.py pointed at a fresh service_desk.db with every table created."""
+    import database as db
+
+    original = db._pool.path
+    db.configure(str(tmp_path / "service_desk.db"))
+    db.init_db()
+    db.init_feedback_table()
+    db.init_comments_table()
+    db.init_preferences_table()
+    db.init_model_feedback_table()
+    yield db
+    db.configure(original)
@@ -0,0 +1,44 @@
+import os
+import pytest
+import engine_wrapper as ew
+from conftest import save_tiny_bert
+
+
+def test_torchscript_export_matches_eager(tiny_bert):
+    path = ew.export_torchscript(tiny_bert)
+    assert os.path.exists(path) and os.path.exists(path + ew.META_SUFFIX)
+    assert ew.load_backend(tiny_bert, "torchscript").name == "torchscript"
+    assert ew.check_backend_parity(tiny_bert, "torchscript") <= 1e-4
+
+
+def test_onnx_export_matches_eager(tiny_bert):
+    pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    ew.export_onnx(tiny_bert)
+    assert ew.load_backend(tiny_bert, "auto").name == "onnx"
+    assert ew.check_backend_parity(tiny_bert, "onnx") <= 1e-4
+
+
+def test_failed_parity_leaves_no_artifact(tiny_bert):
+    with pytest.raises(ValueError):
+        ew.export_torchscript(tiny_bert, atol=-1.0)  # Impossible tolerance: parity always fails
+    assert not os.path.exists(os.path.join(tiny_bert, ew.TORCHSCRIPT_FILE))
+    assert not os.path.exists(os.path.join(tiny_bert, ew.TORCHSCRIPT_FILE + ".tmp"))
+    assert ew.load_backend(tiny_bert, "auto").name == "torch"
+
+
+def test_export_from_other_weights_is_refused(tiny_bert):
+    ew.export_torchscript(tiny_bert)
+    save_tiny_bert(tiny_bert, seed=1)  # Retrained weights, old export still on disk
+
+    with pytest.raises(ValueError, match="different weights"):
+        ew.TorchScriptBackend(tiny_bert)
+    with pytest.warns(UserWarning, match="torchscript backend not used"):
+        assert ew.load_backend(tiny_bert, "torchscript").name == "torch"
+
+
+def test_export_without_metadata_is_refused(tiny_bert):
+    ew.export_torchscript(tiny_bert)
+    os.remove(os.path.join(tiny_bert, ew.TORCHSCRIPT_FILE + ew.META_SUFFIX))
+    with pytest.raises(ValueError, match="no export metadata"):
+        ew.TorchScriptBackend(tiny_bert)
@@ -0,0 +1,144 @@
+import time
+import queue
+import threading
+import pytest
+
+from batch_scheduler import TicketBatcher
+
+
+class BlockingEngine:
+    """Holds every batch until `release` is set."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def process_tickets(self, texts):
+        self.started.set()
+        self.release.wait(10)
+        return [text.upper() for text in texts]
+
+
+@pytest.fixture
+def stuck_batcher():
+    # Worker busy on the first ticket and a queue of one that is already full
+    engine = BlockingEngine()
+    batcher = TicketBatcher(engine, max_batch_size=1, max_wait_ms=0, max_queue_size=1)
+    first = batcher.submit("first")
+    assert engine.started.wait(5)
+    queued = batcher.submit("queued")
+    yield batcher, engine, [first, queued]
+    engine.release.set()
+    batcher.shutdown()
+
+
+def test_batches_requests():
+    engine = BlockingEngine()
+    engine.release.set()
+    batcher = TicketBatcher(engine)
+    assert batcher.process_ticket("printer", timeout=5) == "PRINTER"
+    batcher.shutdown()
+    assert batcher.stats()["processed"] == 1
+
+
+def test_process_ticket_timeout_covers_a_full_queue(stuck_batcher):
+    batcher, _, _ = stuck_batcher
+    started = time.monotonic()
+    with pytest.raises(queue.Full):
+        batcher.process_ticket("late", timeout=0.2)
+    assert time.monotonic() - started < 2
+    assert batcher.stats()["rejected"] == 1
+
+
+def test_shutdown_does_not_block_on_a_full_queue(stuck_batcher):
+    batcher, engine, futures = stuck_batcher
+    started = time.monotonic()
+    batcher.shutdown(wait=False)
+    assert time.monotonic() - started < 1
+    with pytest.raises(RuntimeError):
+        batcher.submit("after shutdown")
+
+    # Queued work still completes, then the worker exits
+    engine.release.set()
+    assert [f.result(timeout=5) for f in futures] == ["FIRST", "QUEUED"]
+    batcher._worker.join(5)
+    assert not batcher._worker.is_alive()
+
+
+def test_submit_racing_shutdown_is_never_stranded():
+    engine = BlockingEngine()
+    engine.release.set()
+    batcher = TicketBatcher(engine)
+    in_put, resume = threading.Event(), threading.Event()
+    put_nowait = batcher._queue.put_nowait
+
+    def slow_put(item):
+        if item is not None:  # Pause a submit after its stop check, just before the put
+            in_put.set()
+            resume.wait(5)
+        put_nowait(item)
+
+    batcher._queue.put_nowait = slow_put
+    futures = []
+    submitter = threading.Thread(target=lambda: futures.append(batcher.submit("racing")))
+    submitter.start()
+    assert in_put.wait(5)
+    stopper = threading.Thread(target=batcher.shutdown)
+    stopper.start()
+    time.sleep(0.1)
+    assert stopper.is_alive()  # shutdown() waits for the submit to finish queueing
+    resume.set()
+    submitter.join(5)
+    stopper.join(5)
+    assert futures[0].result(timeout=5) == "RACING"
+    with pytest.raises(RuntimeError):
+        batcher.submit("after shutdown")
+
+
+def test_submit_waiting_for_room_fails_on_shutdown(stuck_batcher):
+    batcher, engine, futures = stuck_batcher
+    errors = []
+
+    def submit():
+        try:
+            batcher.submit("waiting", timeout=5)
+        except Exception as e:
+            errors.append(e)
+
+    waiter = threading.Thread(target=submit)
+    waiter.start()
+    time.sleep(0.1)
+    batcher.shutdown(wait=False)
+    waiter.join(2)
+    assert not waiter.is_alive() and isinstance(errors[0], RuntimeError)
+
+    engine.release.set()
+    assert [f.result(timeout=5) for f in futures] == ["FIRST", "QUEUED"]
+
+
+def test_many_submits_racing_shutdown_all_resolve():
+    engine = BlockingEngine()
+    engine.release.set()
+    for _ in range(20):
+        batcher = TicketBatcher(engine, max_batch_size=4, max_wait_ms=1)
+        futures, refused = [], []
+
+        def submit_many():
+            for i in range(50):
+                try:
+                    futures.append(batcher.submit(f"t{i}"))
+                except RuntimeError:
+                    refused.append(i)
+
+        threads = [threading.Thread(target=submit_many) for _ in range(4)]
+        for t in threads:
+            t.start()
+        batcher.shutdown()
+        for t in threads:
+            t.join(5)
+        for future in futures:
+            try:
+                future.result(timeout=5)  # A result, or the shut-down error: never a hang
+            except RuntimeError:
+                pass
+        assert len(futures) + len(refused) == 200
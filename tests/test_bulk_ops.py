@@ -0,0 +1,88 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+import database as db
+
+# Builds differ (999 before SQLite 3.32, 32766 after, some distros raise it further),
+# so connections are capped at the old default and the tests go well past it
+VARIABLE_LIMIT = 999
+MANY = 5000
+
+
+def all_ids():
+    with db.connection() as conn:
+        return [row[0] for row in conn.execute("SELECT id FROM tickets ORDER BY id")]
+
+
+def status_counts():
+    with db.connection() as conn:
+        return dict(conn.execute("SELECT status, COUNT(*) FROM tickets GROUP BY status").fetchall())
+
+
+@pytest.fixture(autouse=True)
+def capped_variables(temp_db, monkeypatch):
+    open_connection = db._pool._open
+
+    def _open():
+        conn = open_connection()
+        conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, VARIABLE_LIMIT)
+        return conn
+
+    db.close_connections()
+    monkeypatch.setattr(db._pool, "_open", _open)
+
+
+@pytest.fixture
+def many_tickets(temp_db):
+    rows = [("u", "U", "T", "D", ("Hardware", "Network")[i % 2], "Low") for i in range(MANY + 100)]
+    db.add_tickets_bulk(rows)
+    return all_ids()
+
+
+def test_bulk_update_status_beyond_the_variable_limit(many_tickets):
+    with pytest.raises(sqlite3.OperationalError, match="too many SQL variables"):  # What an IN (?, ...) list hits
+        with db.connection() as conn:
+            conn.execute(f"SELECT COUNT(*) FROM tickets WHERE id IN ({','.join('?' * MANY)})", many_tickets[:MANY])
+
+    ids = many_tickets[:MANY]
+    assert db.bulk_update_status(ids + ids[:10], "Resolved")["rows_touched"] == MANY  # Duplicates collapse
+    assert status_counts() == {"Resolved": MANY, "Open": 100}
+    assert db.bulk_update_status(ids, "Resolved")["rows_touched"] == 0  # Already there: skipped
+    assert db.check_ticket_counters() == {}
+
+
+def test_bulk_delete_beyond_the_variable_limit(many_tickets):
+    outcome = db.bulk_delete(many_tickets[100:])
+    assert outcome["rows_touched"] == MANY and outcome["duration_ms"] >= 0
+    assert all_ids() == many_tickets[:100]
+    assert db.get_ticket_counts()["total"] == 100
+    assert db.check_daily_rollups() == {}
+
+
+def test_bulk_operations_by_filter(temp_db):
+    db.add_tickets_bulk([("u", "U", "T", "D", category, "Low")
+                         for category in ("Hardware", "Network", "Access") for _ in range(10)])
+    with db.connection(write=True) as conn:
+        conn.execute("UPDATE tickets SET created_at = ? WHERE id <= 5", (datetime(2026, 1, 1),))
+
+    assert db.bulk_update_status_where({"category": ["Hardware"]}, "Resolved")["rows_touched"] == 10
+    assert db.bulk_update_status_where({"category": ["Hardware"]}, "Resolved")["rows_touched"] == 0
+    old = {"status": ["Resolved"], "date_to": datetime(2026, 1, 2)}
+    assert db.bulk_update_status_where(old, "Closed")["rows_touched"] == 5
+    assert status_counts() == {"Open": 20, "Resolved": 5, "Closed": 5}
+
+    assert db.bulk_delete_where({"category": ["Network", "Access"], "status": ["Open"]})["rows_touched"] == 20
+    assert db.count_tickets() == 10
+    assert db.check_ticket_counters() == {}
+
+
+def test_bulk_operations_by_filter_need_a_filter(temp_db):
+    db.add_ticket("u", "U", "T", "D", "Hardware", "Low")
+    for filters in (None, {}, {"status": []}):
+        with pytest.raises(ValueError):
+            db.bulk_update_status_where(filters, "Closed")
+        with pytest.raises(ValueError):
+            db.bulk_delete_where(filters)
+    assert db.count_tickets() == 1
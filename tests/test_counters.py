@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+import database as db
+
+CATEGORIES = ("Hardware", "Network", "Access", None)
+PRIORITIES = ("Low", "Standard", "High", None)
+
+
+def add_tickets(n):
+    start = datetime(2026, 3, 1, 9, 0)
+    for i in range(n):
+        db.add_ticket(f"user{i % 3}", "User", f"Ticket {i}", f"Description {i}", CATEGORIES[i % 4],
+                      PRIORITIES[i % 4], created_at=start + timedelta(hours=7 * i))
+    return sorted(row[0] for row in db.get_tickets())
+
+
+def churn(ids):
+    """Every kind of write the triggers have to follow."""
+    db.update_status(ids[0], "In Progress")
+    db.update_status(ids[1], "Resolved")
+    db.update_status(ids[1], "Closed")
+    db.update_status(ids[2], "Open")  # No-op: same status
+    db.update_priority(ids[3], "Critical")
+    db.update_priority(ids[4], None)
+    with db.connection(write=True) as conn:
+        conn.execute("UPDATE tickets SET category = 'Storage' WHERE id = ?", (ids[5],))
+        conn.execute("UPDATE tickets SET category = NULL, status = 'Resolved' WHERE id = ?", (ids[6],))
+        conn.execute("UPDATE tickets SET created_at = ? WHERE id = ?", (datetime(2026, 2, 1, 8, 0), ids[7]))
+    db.bulk_update_status(ids[8:12], "In Progress")
+    db.delete_ticket(ids[12])
+    db.bulk_delete(ids[13:15])
+    db.add_tickets_bulk([("bulk", "Bulk", "Bulk ticket", "Imported", "Network", "High")] * 3)
+
+
+def test_counters_follow_every_write(temp_db):
+    ids = add_tickets(20)
+    churn(ids)
+
+    assert db.check_ticket_counters() == {}
+    counts = db.get_ticket_counts()
+    assert counts["total"] == 20 - 3 + 3
+    assert counts["status"] == {"Open": 13, "In Progress": 5, "Closed": 1, "Resolved": 1}
+    assert counts["priority"]["Critical"] == 1
+    assert sum(counts["category"].values()) == counts["total"]
+
+
+def test_counter_check_repairs_drift(temp_db):
+    add_tickets(5)
+    with db.connection(write=True) as conn:
+        conn.execute("UPDATE ticket_counters SET count = count + 7 WHERE dimension = 'status' AND value = 'Open'")
+
+    assert db.check_ticket_counters() == {("status", "Open"): (12, 5)}
+    assert db.check_ticket_counters(repair=True)
+    assert db.check_ticket_counters() == {}
+
+
+def test_daily_rollups_follow_every_write(temp_db):
+    ids = add_tickets(20)
+    churn(ids)
+
+    assert db.check_daily_rollups() == {}
+    analytics = db.get_ticket_analytics("2026-03-01", "2026-03-02")
+    with db.connection() as conn:
+        expected = conn.execute("SELECT COUNT(*) FROM tickets WHERE date(created_at) BETWEEN '2026-03-01' AND '2026-03-02'").fetchone()[0]
+    assert analytics["total"] == expected
+    assert db.get_ticket_analytics("2026-02-01", "2026-02-01")["total"] == 1  # The moved created_at
+
+
+def test_rollup_check_repairs_drift(temp_db):
+    add_tickets(5)
+    with db.connection(write=True) as conn:
+        conn.execute("DELETE FROM ticket_daily_rollup WHERE day = '2026-03-01'")
+
+    assert db.check_daily_rollups()
+    assert db.check_daily_rollups(repair=True)
+    assert db.check_daily_rollups() == {}
+
+
+def test_count_tickets_matches_a_recount(temp_db, monkeypatch):
+    ids = add_tickets(20)
+    churn(ids)
+
+    def recount(where="1", params=()):
+        with db._pool.connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM tickets WHERE {where}", params).fetchone()[0]
+
+    queries = []
+    connection = db.connection
+    monkeypatch.setattr(db, "connection", lambda write=False: queries.append(write) or connection(write))
+    db.read_cache.clear()
+
+    assert db.count_tickets() == recount()
+    assert db.count_tickets({"status": ["Open"]}) == recount("status = 'Open'")
+    assert db.count_tickets({"status": ["Open", "In Progress", "Open"]}) == recount("status IN ('Open', 'In Progress')")
+    assert db.count_tickets({"status": ["Open"], "category": []}) == recount("status = 'Open'")  # Empty = unset
+    assert db.count_tickets({"priority": ["High", "Critical"]}) == recount("priority IN ('High', 'Critical')")
+    assert len(queries) == 1  # One read of ticket_counters, then served from the read cache
+
+    assert db.count_tickets({"status": ["Open"], "category": ["Hardware"]}) == \
+        recount("status = 'Open' AND category = 'Hardware'")
+    assert db.count_tickets({"status": ["Open"], "priority": ["High"]}) == recount("status = 'Open' AND priority = 'High'")
+    assert db.count_tickets({"status": ["Open"], "date_from": datetime(2026, 3, 3)}) == \
+        recount("status = 'Open' AND created_at >= ?", (datetime(2026, 3, 3),))
+    assert len(queries) == 1 + 3  # Combined filters count the rows
@@ -0,0 +1,66 @@
+import pytest
+from engine_wrapper import ProfessionalTicketEngine, PARITY_TEXTS
+
+LONG_TEXT = "The VPN client disconnects every few minutes and the laptop fan is loud. " * 40  # > MAX_LENGTH tokens
+BATCH = [
+    PARITY_TEXTS[0],
+    "",
+    PARITY_TEXTS[3] + " urgent",
+    None,
+    "too short",
+    LONG_TEXT,
+    PARITY_TEXTS[1],
+    "   ",
+    "Printer on floor two is broken and shows a paper jam even though the tray is empty.",
+]
+
+
+@pytest.fixture
+def engine(tiny_models):
+    bert, svm_path, tfidf_path = tiny_models
+    return ProfessionalTicketEngine(bert, svm_path, tfidf_path, bert_batch_size=2, metrics=None)
+
+
+def assert_same(batch, single):
+    assert len(batch) == len(single)
+    for got, want in zip(batch, single):
+        assert got.keys() == want.keys()
+        for key in want:
+            if key == "confidence":
+                # Padding to a different width moves BERT logits by float noise only
+                assert got[key] == pytest.approx(want[key], abs=0.02)
+            else:
+                assert got[key] == want[key]
+
+
+def test_batch_matches_single_tickets(engine):
+    assert len(engine.tokenizer(LONG_TEXT)["input_ids"]) > engine.MAX_LENGTH
+    assert_same(engine.process_tickets(BATCH), [engine.process_ticket(t) for t in BATCH])
+
+
+def test_batch_of_invalid_inputs_only(engine):
+    texts = [None, "", "short"]
+    results = engine.process_tickets(texts)
+    assert_same(results, [engine.process_ticket(t) for t in texts])
+    assert all("error" in r for r in results)
+
+
+def test_empty_batch(engine):
+    assert engine.process_tickets([]) == []
+
+
+def test_cached_batch_matches_uncached(tiny_models, temp_db):
+    from prediction_cache import PredictionCache
+
+    bert, svm_path, tfidf_path = tiny_models
+    engine = ProfessionalTicketEngine(bert, svm_path, tfidf_path, cache=PredictionCache(), metrics=None)
+    first = engine.process_tickets(BATCH)
+    assert engine.process_tickets(BATCH) == first
+    assert engine.cache.stats()["memory_hits"] == 5  # Every valid text, none of the invalid ones
+
+
+def test_each_result_gets_its_own_timings(engine):
+    results = engine.process_tickets(BATCH, return_timings=True)
+    assert all(r["timings_ms"] == results[0]["timings_ms"] and r["batch_size"] == len(BATCH) for r in results)
+    results[0]["timings_ms"]["total"] = -1.0
+    assert results[1]["timings_ms"]["total"] >= 0
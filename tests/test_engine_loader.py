@@ -0,0 +1,57 @@
+import time
+import pytest
+
+from engine_loader import EngineLoader
+
+
+class FlakyFactory:
+    """Fails the first `failures` calls, then returns an engine."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError(f"load failed ({self.calls})")
+        return "engine"
+
+
+def test_loads_in_background():
+    loader = EngineLoader(FlakyFactory(0), warm_up=False)
+    assert loader.wait(5) == "engine"
+    assert loader.ready and loader.load_seconds is not None
+
+
+def test_forced_retry_recovers_from_a_failed_load():
+    factory = FlakyFactory(1)
+    loader = EngineLoader(factory, warm_up=False, retry_after=60)
+    with pytest.raises(RuntimeError, match=r"load failed \(1\)"):
+        loader.wait(5)
+    assert loader.state == "failed"
+    assert not loader.retry()  # Still inside the backoff
+    assert loader.retry(force=True)
+    assert loader.wait(5) == "engine"
+    assert loader.ready and loader.failures == 0
+
+
+def test_wait_retries_after_backoff():
+    factory = FlakyFactory(2)
+    loader = EngineLoader(factory, warm_up=False, retry_after=0.1)
+    with pytest.raises(RuntimeError):
+        loader.wait(5)
+    # Backoff doubles: 0.1s after the first failure, 0.2s after the second
+    time.sleep(0.15)
+    with pytest.raises(RuntimeError, match=r"load failed \(2\)"):
+        loader.wait(5)
+    assert loader.next_retry_at - time.monotonic() > 0.1
+    time.sleep(0.25)
+    assert loader.wait(5) == "engine"
+    assert factory.calls == 3
+
+
+def test_retry_is_a_no_op_unless_failed():
+    loader = EngineLoader(FlakyFactory(0), warm_up=False)
+    loader.wait(5)
+    assert not loader.retry(force=True)
@@ -0,0 +1,108 @@
+import json
+import socket
+import asyncio
+import threading
+import pytest
+
+from inference_service import InferenceService, InferenceClient
+
+
+class FakeEngine:
+    def warm_up(self):
+        pass
+
+    def process_tickets(self, texts):
+        return [{"category": "Hardware", "text": text} for text in texts]
+
+
+@pytest.fixture
+def serve():
+    """Start an InferenceService on an ephemeral localhost port; yields (service, port)."""
+    started = []
+
+    def run(factory=FakeEngine, **kwargs):
+        service = InferenceService(factory, **kwargs)
+        loop = asyncio.new_event_loop()
+        port = loop.run_until_complete(service.start("127.0.0.1", 0))
+        threading.Thread(target=loop.run_forever, daemon=True).start()
+        started.append((service, loop))
+        return service, port
+
+    yield run
+    for service, loop in started:
+        asyncio.run_coroutine_threadsafe(service.stop(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+
+
+def _raw(port, data, timeout=5.0):
+    """Send raw bytes, return (status, json body)."""
+    with socket.create_connection(("127.0.0.1", port), timeout=timeout) as sock:
+        sock.sendall(data)
+        response = b""
+        while chunk := sock.recv(65536):
+            response += chunk
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+def _post(port, path, body, content_length=None):
+    body = body if isinstance(body, bytes) else json.dumps(body).encode()
+    length = len(body) if content_length is None else content_length
+    return _raw(port, f"POST {path} HTTP/1.1\r\nHost: x\r\nContent-Length: {length}\r\n\r\n".encode() + body)
+
+
+def test_classify_and_health(serve):
+    service, port = serve()
+    service.loader.wait(5)
+    client = InferenceClient(f"http://127.0.0.1:{port}")
+    assert client.ready()
+    assert client.process_ticket("My screen is broken")["category"] == "Hardware"
+    assert [r["text"] for r in client.process_tickets(["a", "b"])] == ["a", "b"]
+    assert _raw(port, b"GET /health HTTP/1.1\r\n\r\n") == (200, {"status": "ok", "engine": "ready", "inflight": 0})
+
+
+@pytest.mark.parametrize("body", [b"[]", b'"text"', b"not json", {"text": 5}, {"texts": "abc"}, {"texts": [1, 2]}])
+def test_bad_bodies_are_400(serve, body):
+    service, port = serve()
+    service.loader.wait(5)
+    path = "/classify/batch" if isinstance(body, dict) and "texts" in body else "/classify"
+    status, payload = _post(port, path, body)
+    assert status == 400, payload
+
+
+@pytest.mark.parametrize("length", ["abc", "-1"])
+def test_bad_content_length_is_400(serve, length):
+    _, port = serve()
+    status, payload = _post(port, "/classify", b"{}", content_length=length)
+    assert status == 400
+    assert payload["error"] == "Invalid Content-Length"
+
+
+def test_routes_and_methods(serve):
+    _, port = serve()
+    assert _raw(port, b"GET /nope HTTP/1.1\r\n\r\n")[0] == 404
+    assert _raw(port, b"GET /classify HTTP/1.1\r\n\r\n")[0] == 405
+    assert _raw(port, b"garbage\r\n\r\n")[0] == 400
+
+
+def test_slow_client_gets_408(serve):
+    _, port = serve(request_timeout=0.3)
+    # Headers promise a body that never arrives
+    status, payload = _raw(port, b"POST /classify HTTP/1.1\r\nContent-Length: 10\r\n\r\n{")
+    assert status == 408
+
+
+def test_not_ready_is_503(serve):
+    release = threading.Event()
+
+    def slow_factory():
+        release.wait(5)
+        return FakeEngine()
+
+    service, port = serve(slow_factory)
+    try:
+        assert _post(port, "/classify", {"text": "hi"})[0] == 503
+        assert _raw(port, b"GET /ready HTTP/1.1\r\n\r\n")[0] == 503
+        assert not InferenceClient(f"http://127.0.0.1:{port}").ready()
+    finally:
+        release.set()
@@ -0,0 +1,48 @@
+import os
+from collections import Counter
+import pytest
+import engine_wrapper as ew
+from conftest import save_tiny_bert
+
+# A random tiny model has no real accuracy to lose; these bounds let the guard pass
+LOOSE = dict(max_accuracy_drop=1.0, min_agreement=0.0, max_drift=1.0)
+
+
+def test_reference_set_covers_every_category():
+    texts, labels = ew.load_reference()
+    counts = Counter(ew.CATEGORIES[i] for i in labels)
+    assert set(counts) == set(ew.CATEGORIES)
+    assert min(counts.values()) >= 10
+    assert len(texts) == len(labels)
+
+
+def test_passing_guard_publishes_the_checked_artifact(tiny_bert):
+    report = ew.quantize_int8(tiny_bert, **LOOSE)
+    assert report["passed"]
+    assert report["weights"] == ew.weights_fingerprint(tiny_bert)
+    assert report["reference_size"] == len(ew.load_reference()[0])
+    assert {"fp32_accuracy", "int8_accuracy", "accuracy_drop", "agreement"} <= set(report)
+    assert not os.path.exists(os.path.join(tiny_bert, ew.INT8_FILE + ".tmp"))
+    assert ew.load_backend(tiny_bert, "int8").name == "int8"
+
+
+def test_failing_guard_leaves_no_model(tiny_bert):
+    ew.quantize_int8(tiny_bert, **LOOSE)
+    report = ew.quantize_int8(tiny_bert, max_accuracy_drop=1.0, min_agreement=1.01, max_drift=1.0)
+    assert not report["passed"]
+    assert not os.path.exists(os.path.join(tiny_bert, ew.INT8_FILE))
+    assert not os.path.exists(os.path.join(tiny_bert, ew.INT8_FILE + ".tmp"))
+    with pytest.warns(UserWarning, match="int8 backend not used"):
+        assert ew.load_backend(tiny_bert, "int8").name == "torch"
+
+
+def test_report_for_other_weights_is_refused(tiny_bert):
+    ew.quantize_int8(tiny_bert, **LOOSE)
+    save_tiny_bert(tiny_bert, seed=1)  # Retrained weights, old report still on disk
+    with pytest.raises(ValueError, match="different weights"):
+        ew.Int8Backend(tiny_bert)
+
+
+def test_reference_set_must_be_large_enough(tiny_bert):
+    with pytest.raises(ValueError, match="at least 50"):
+        ew.quantize_int8(tiny_bert, reference=(ew.PARITY_TEXTS, list(range(8))), **LOOSE)
@@ -0,0 +1,107 @@
+import functools
+from datetime import datetime, timedelta
+
+import database as db
+from lifecycle import LifecycleScheduler
+
+NOW = datetime(2026, 3, 10, 12, 0)
+
+
+def add(priority="Standard", age_hours=0, status="Open"):
+    ticket_id = db.add_ticket("u", "U", "Title", "Description", "Hardware", priority,
+                              created_at=NOW - timedelta(hours=age_hours))
+    row_id = db.get_ticket_by_ticket_id(ticket_id)[0]
+    if status != "Open":
+        db.update_status(row_id, status)
+    return row_id
+
+
+def lifecycle_row(row_id):
+    with db.connection() as conn:
+        return conn.execute("SELECT status, priority, resolved_at, sla_breached_at, escalated_at FROM tickets "
+                            "WHERE id = ?", (row_id,)).fetchone()
+
+
+def set_resolved_at(row_id, when):
+    with db.connection(write=True) as conn:
+        conn.execute("UPDATE tickets SET resolved_at = ? WHERE id = ?", (when, row_id))
+
+
+def test_close_resolved_tickets(temp_db):
+    old, recent, reopened = add(status="Resolved"), add(status="Resolved"), add(status="Resolved")
+    set_resolved_at(old, NOW - timedelta(hours=db.AUTO_CLOSE_HOURS, minutes=1))
+    set_resolved_at(recent, NOW - timedelta(hours=db.AUTO_CLOSE_HOURS - 1))
+    db.update_status(reopened, "Open")
+
+    assert db.close_resolved_tickets(now=NOW) == 1
+    assert lifecycle_row(old)[0] == "Closed" and lifecycle_row(old)[2] is not None  # Keeps its resolved_at
+    assert lifecycle_row(recent)[0] == "Resolved"
+    assert lifecycle_row(reopened)[:3] == ("Open", "Standard", None)
+    assert db.close_resolved_tickets(now=NOW) == 0
+
+
+def test_mark_sla_breaches(temp_db):
+    late = add(age_hours=db.SLA_BREACH_HOURS + 1)
+    working = add(age_hours=db.SLA_BREACH_HOURS + 1, status="In Progress")
+    fresh = add(age_hours=db.SLA_BREACH_HOURS - 1)
+    done = add(age_hours=db.SLA_BREACH_HOURS + 1, status="Resolved")
+
+    assert db.mark_sla_breaches(now=NOW) == 2
+    assert str(lifecycle_row(late)[3]) == str(NOW) and lifecycle_row(working)[3] is not None
+    assert lifecycle_row(fresh)[3] is None and lifecycle_row(done)[3] is None
+    assert db.mark_sla_breaches(now=NOW) == 0  # Already stamped
+    assert db.mark_sla_breaches(now=NOW + timedelta(hours=2)) == 1  # fresh breaches later
+
+
+def test_escalate_breached_tickets(temp_db):
+    low, high, critical = add("Low", 20), add("High", 20), add("Critical", 20)
+    unranked = add("Medium", 20)  # Off the ladder: treated as Standard
+    db.mark_sla_breaches(now=NOW - timedelta(hours=db.ESCALATE_AFTER_HOURS))
+
+    assert db.escalate_breached_tickets(now=NOW - timedelta(hours=1)) == 0  # Not long enough after the breach
+    assert db.escalate_breached_tickets(now=NOW) == 3
+    assert [lifecycle_row(i)[1] for i in (low, high, critical, unranked)] == ["Standard", "Critical", "Critical", "High"]
+    assert lifecycle_row(critical)[4] is None  # Already at the top: skipped, no comment
+    assert db.get_ticket_comments(critical) == []
+    comment = db.get_ticket_comments(low)[0]
+    assert "Low -> Standard" in comment[3] and comment[4] == 1  # Internal
+    assert db.escalate_breached_tickets(now=NOW + timedelta(days=1)) == 0  # Once per breach
+
+
+def test_reopening_restarts_the_sla_clock(temp_db):
+    ticket = add("Low", 20)
+    db.mark_sla_breaches(now=NOW - timedelta(hours=db.ESCALATE_AFTER_HOURS))
+    db.escalate_breached_tickets(now=NOW)
+    db.update_status(ticket, "Resolved")
+    assert lifecycle_row(ticket)[3:] != (None, None)
+
+    db.update_status(ticket, "Open")
+    assert lifecycle_row(ticket)[3:] == (None, None)
+    later = NOW + timedelta(hours=1)
+    assert db.mark_sla_breaches(now=later) == 1
+    assert db.escalate_breached_tickets(now=later) == 0
+    assert db.escalate_breached_tickets(now=later + timedelta(hours=db.ESCALATE_AFTER_HOURS)) == 1
+    assert lifecycle_row(ticket)[1] == "High"
+
+
+def test_in_progress_tickets_keep_their_breach(temp_db):
+    ticket = add(age_hours=20)
+    db.mark_sla_breaches(now=NOW)
+    db.update_status(ticket, "In Progress")
+    db.update_status(ticket, "Open")
+    assert lifecycle_row(ticket)[3] is not None
+
+
+def test_scheduler_runs_each_job_once_per_interval(temp_db):
+    add("Low", 30)
+    jobs = {name: functools.partial(job, now=NOW) for name, job in
+            (("sla_breach", db.mark_sla_breaches), ("escalate", db.escalate_breached_tickets),
+             ("auto_close", db.close_resolved_tickets))}
+    first, second = LifecycleScheduler(interval=3600, jobs=jobs), LifecycleScheduler(interval=3600, jobs=jobs)
+
+    runs = first.run_once()
+    assert [(r["job"], r["rows_touched"], r["error"]) for r in runs] == [
+        ("sla_breach", 1, None), ("escalate", 0, None), ("auto_close", 0, None)]  # Breached just now
+    assert second.run_once() == []  # Claimed by the other scheduler within the interval
+    assert [r["job"] for r in second.run_once(force=True)] == ["sla_breach", "escalate", "auto_close"]
+    assert len(db.get_lifecycle_runs()) == 6
@@ -0,0 +1,93 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+import database as db
+from prediction_cache import PredictionCache
+
+VERSION = "v1"
+
+
+def probs(i):
+    row = np.zeros(8)
+    row[i % 8] = 0.9
+    return row
+
+
+@pytest.fixture
+def cache(temp_db):
+    return PredictionCache(max_entries=3, ttl_seconds=60)
+
+
+def test_memory_and_database_hits(cache):
+    assert cache.get("Printer is jammed again", VERSION) is None
+    cache.put_many([("Printer is jammed again", probs(1), "ensemble")], VERSION)
+
+    hit_probs, path = cache.get("  printer IS jammed   again", VERSION)  # Normalized text, same entry
+    assert path == "ensemble" and np.allclose(hit_probs, probs(1))
+    assert cache.get("Printer is jammed again", "v2") is None  # Other model version
+
+    cache.clear()
+    hit_probs, path = cache.get("Printer is jammed again", VERSION)
+    assert np.allclose(hit_probs, probs(1))
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["db_hits"], stats["misses"]) == (1, 1, 2)
+
+
+def test_get_many_keeps_order_and_batches_the_lookup(cache, monkeypatch):
+    texts = [f"ticket number {i}" for i in range(3)]
+    cache.put_many([(t, probs(i), "svm") for i, t in enumerate(texts)], VERSION)
+    cache.clear()
+    lookups = []
+    lookup = db.get_cached_predictions
+    monkeypatch.setattr(db, "get_cached_predictions", lambda keys, since: lookups.append(keys) or lookup(keys, since))
+
+    results = cache.get_many([texts[2], "never seen", texts[0], texts[2]], VERSION)
+    assert results[1] is None
+    assert [np.argmax(r[0]) for r in (results[0], results[2], results[3])] == [2, 0, 2]
+    assert len(lookups) == 1 and len(lookups[0]) == 3  # One query, duplicates collapsed
+
+
+def test_ttl_expiry(cache, monkeypatch):
+    cache.put_many([("VPN drops every hour", probs(2), "ensemble")], VERSION)
+    later = time.time() + 61
+    monkeypatch.setattr(time, "time", lambda: later)
+
+    assert cache.get("VPN drops every hour", VERSION) is None  # Expired in memory...
+    cache.clear()
+    assert cache.get("VPN drops every hour", VERSION) is None  # ...and in the database
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_eviction(cache):
+    cache.persist = False  # Memory only, so a miss really means evicted
+    cache.put_many([(f"ticket {i}", probs(i), "svm") for i in range(3)], VERSION)
+    assert cache.get("ticket 0", VERSION) is not None  # Now most recently used
+    cache.put_many([("ticket 3", probs(3), "svm")], VERSION)
+
+    assert cache.get("ticket 1", VERSION) is None
+    assert all(cache.get(f"ticket {i}", VERSION) is not None for i in (0, 2, 3))
+    assert cache.stats()["size"] == 3 and cache.stats()["evictions"] == 1
+
+
+def test_prune_keeps_the_newest_rows(temp_db):
+    cache = PredictionCache(max_entries=5, ttl_seconds=60, prune_every=10)
+    for i in range(12):
+        cache.put_many([(f"ticket {i}", probs(i), "svm")], VERSION)
+    with db._cache_pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM prediction_cache").fetchone()[0] == 5 + 2
+
+
+def test_caching_does_not_invalidate_the_read_cache(cache):
+    db.add_ticket("u", "U", "T", "D", "Hardware", "Low")
+    assert len(db.get_tickets()) == 1
+    version = db._pool.data_version()
+    cache.put_many([(f"ticket {i}", probs(i), "svm") for i in range(10)], VERSION)
+
+    assert db._pool.data_version() == version
+    hits = db.cache_stats()["hits"]
+    db.get_tickets()
+    assert db.cache_stats()["hits"] == hits + 1
+    assert os.path.exists(db.prediction_cache_path(db._pool.path))
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+import database as db
+
+
+def test_hot_queries_use_indexes(temp_db):
+    results = db.check_query_plans()
+    assert set(results) == set(db.HOT_QUERIES)
+    for name, result in results.items():
+        plan = " | ".join(result["plan"])
+        # Walking an index in order ("SCAN tickets USING INDEX ...") is fine; reading the table is not
+        assert not any(d.startswith("SCAN tickets") and "INDEX" not in d for d in result["plan"]), f"{name}: {plan}"
+        assert "USE TEMP B-TREE FOR ORDER BY" not in plan, f"{name}: {plan}"
+        assert result["ok"], f"{name}: {plan}"
+
+
+def test_checks_cover_the_executed_sql():
+    # The checks must explain what the functions run, not a copy of it
+    assert db.HOT_QUERIES["close_resolved_tickets"][0] is db.CLOSE_RESOLVED_SQL
+    assert db.HOT_QUERIES["get_tickets_page_status"] == db.tickets_page_sql({"status": ["Open"]},
+                                                                             after=("2026-01-01 00:00:00", 1))
+
+
+def test_a_full_scan_is_reported(temp_db):
+    plan = db.explain_query_plan("SELECT id FROM tickets WHERE description = ?", ("x",))
+    assert any(d.startswith("SCAN tickets") for d in plan)
+
+
+def test_paging_and_lifecycle_queries_still_work(temp_db):
+    for i in range(5):
+        db.add_ticket(f"u{i}", "User", f"Ticket {i}", "Printer is jammed", "Hardware", "Medium")
+    page = db.get_tickets_page(limit=2)
+    assert len(page) == 2
+    following = db.get_tickets_page(limit=2, after=db.page_key(page[-1]))
+    assert len(following) == 2 and following[0][0] < page[-1][0]
+    assert db.get_tickets_page(limit=2, before=db.page_key(following[0])) == page
+
+    assert len(db.search_tickets("printer")) == 5
+    assert db.mark_sla_breaches(now=datetime.now() + timedelta(days=30)) == 5
+    assert db.escalate_breached_tickets(now=datetime.now() + timedelta(days=60)) == 5
@@ -0,0 +1,53 @@
+import sqlite3
+import subprocess
+import sys
+
+import database as db
+from conftest import REPO_DIR
+from metrics import REGISTRY as metrics
+
+
+def ticket_count():
+    return len(db.get_tickets())
+
+
+def test_repeated_reads_are_served_from_the_cache(temp_db):
+    db.add_ticket("u", "U", "T", "D", "Hardware", "Low")
+    assert ticket_count() == 1
+    hits = db.cache_stats()["hits"]
+    assert ticket_count() == 1
+    assert db.cache_stats()["hits"] == hits + 1
+
+
+def test_write_on_another_connection_invalidates(temp_db):
+    db.add_ticket("u", "U", "T", "D", "Hardware", "Low")
+    assert ticket_count() == 1
+    version = db._pool.data_version()
+
+    with sqlite3.connect(db._pool.path) as other:
+        other.execute("INSERT INTO tickets (ticket_id, user_id, description) VALUES ('TIC-X', 'u', 'd')")
+    assert db._pool.data_version() != version
+    assert ticket_count() == 2
+
+
+def test_write_from_another_process_invalidates(temp_db):
+    assert ticket_count() == 0
+    assert db.get_ticket_counts()["total"] == 0
+
+    code = ("import database as db; db.configure(%r); "
+            "db.add_ticket('p', 'P', 'T', 'D', 'Network', 'High')" % db._pool.path)
+    subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, check=True)
+    assert ticket_count() == 1
+    assert db.get_ticket_counts()["total"] == 1
+
+
+def test_cache_hits_are_timed_apart_from_queries(temp_db):
+    def count(stage):
+        return metrics.summary().get(stage, {}).get("count", 0)
+
+    db.get_tickets("someone")
+    queries, hits = count("db.get_tickets"), count("db.read_cache_hit")
+    db.get_tickets("someone")
+    db.get_tickets("someone")
+    assert count("db.get_tickets") == queries  # The db.* histograms only see real queries
+    assert count("db.read_cache_hit") == hits + 2
@@ -0,0 +1,77 @@
+from datetime import datetime
+
+import pytest
+
+import database as db
+
+
+def add(title, description, category="Hardware", created_at=None):
+    ticket_id = db.add_ticket("u", "U", title, description, category, "Standard", created_at=created_at)
+    return db.get_ticket_by_ticket_id(ticket_id)[0]
+
+
+def titles(search_query, filters=None, **kwargs):
+    return [row[4] for row in db.search_tickets(search_query, filters, **kwargs)]
+
+
+def assert_index_in_sync():
+    with db.connection(write=True) as conn:
+        conn.execute("INSERT INTO tickets_fts (tickets_fts) VALUES ('integrity-check')")  # Raises if out of sync
+
+
+@pytest.fixture
+def tickets(temp_db):
+    return {
+        "printer": add("Printer jammed", "Paper stuck in tray two", created_at=datetime(2026, 3, 1)),
+        "vpn": add("VPN drops", "Connection to the office network drops hourly", "Network", datetime(2026, 3, 5)),
+        "laptop": add("Laptop screen", "Screen flickers near the printer", created_at=datetime(2026, 3, 9)),
+    }
+
+
+def test_triggers_keep_the_index_in_sync(tickets):
+    assert titles("printer") == ["Printer jammed", "Laptop screen"]  # Title hits rank first
+
+    with db.connection(write=True) as conn:
+        conn.execute("UPDATE tickets SET title = 'Scanner jammed', description = 'Feeder stuck' WHERE id = ?",
+                     (tickets["printer"],))
+        conn.execute("UPDATE tickets SET category = 'Storage' WHERE id = ?", (tickets["vpn"],))
+    assert titles("printer") == ["Laptop screen"]
+    assert titles("scanner") == ["Scanner jammed"]
+    assert titles("storage") == ["VPN drops"] and titles("network drops") == ["VPN drops"]
+
+    db.delete_ticket(tickets["laptop"])
+    db.bulk_delete([tickets["vpn"]])
+    assert titles("printer") == [] and titles("vpn") == []
+    assert_index_in_sync()
+
+
+def test_status_changes_do_not_touch_the_index(tickets):
+    db.update_status(tickets["vpn"], "Resolved")
+    assert titles("vpn") == ["VPN drops"]
+    assert_index_in_sync()
+
+
+def test_filtered_search(tickets):
+    db.update_status(tickets["laptop"], "In Progress")
+    assert titles("printer", {"status": ["In Progress"]}) == ["Laptop screen"]
+    assert titles("printer", {"status": ["Open"]}) == ["Printer jammed"]
+    assert titles("printer", {"category": ["Network"]}) == []
+    assert titles("printer", {"date_from": datetime(2026, 3, 2), "date_to": datetime(2026, 3, 10)}) == ["Laptop screen"]
+    assert titles("", {"category": ["Hardware"]}) == ["Laptop screen", "Printer jammed"]  # Newest first
+    assert titles("printer", limit=1) == ["Printer jammed"]
+
+
+def test_prefix_and_snippets(tickets):
+    assert titles("pr") == titles("prin") == titles("printer")  # Last word matches as a prefix
+    assert titles("network d") == ["VPN drops"]
+    row = db.search_tickets("flickers", with_snippets=True)[0]
+    assert "**flickers**" in row[-1]
+
+
+def test_queries_without_words_match_nothing(tickets):
+    for query in ("!!!", "?", "-- *", '"'):
+        assert db.search_tickets(query) == []
+        assert db.search_tickets(query, {"status": ["Open"]}) == []
+    assert len(db.search_tickets("   ")) == 3  # Blank means no text filter
+    assert titles('printer" OR vpn -') == []  # FTS syntax is matched as words, never parsed
+    assert titles("tray AND two") == []
@@ -0,0 +1,74 @@
+import warnings
+import numpy as np
+import pytest
+from scipy import sparse
+from sklearn.svm import SVC
+
+from svm_scorer import LinearSVMScorer, convert_svm, linear_path, load_svm
+
+
+def _fit(n_classes, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_classes, 20)) * 1.5
+    y = np.repeat(np.arange(n_classes), 30)
+    X = sparse.csr_matrix(np.abs(centers[y] + rng.normal(size=(len(y), 20))))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        svc = SVC(kernel="linear", probability=True, random_state=0).fit(X, y)
+    return svc, X
+
+
+@pytest.mark.parametrize("n_classes", [2, 3, 8])
+def test_predict_proba_matches_sklearn(n_classes):
+    svc, X = _fit(n_classes)
+    scorer = LinearSVMScorer.from_svc(svc)
+    expected = svc.predict_proba(X)
+    proba = scorer.predict_proba(X)
+    np.testing.assert_allclose(proba, expected, atol=1e-6)
+    assert (proba.argmax(axis=1) == expected.argmax(axis=1)).all()
+
+
+def test_convert_round_trip(tmp_path):
+    import joblib
+
+    svc, X = _fit(2, seed=1)
+    svm_path = str(tmp_path / "svm_model.pkl")
+    joblib.dump(svc, svm_path)
+    assert convert_svm(svm_path, check_X=X) == linear_path(svm_path)
+    scorer = load_svm(svm_path)
+    assert isinstance(scorer, LinearSVMScorer)
+    np.testing.assert_allclose(scorer.predict_proba(X), svc.predict_proba(X), atol=1e-6)
+
+
+def test_rejects_non_linear_models():
+    with pytest.raises(ValueError):
+        LinearSVMScorer.from_svc(SVC(kernel="rbf", probability=True))
+
+
+def test_stale_conversion_is_not_served(tmp_path):
+    import joblib
+
+    svc, X = _fit(3)
+    svm_path = str(tmp_path / "svm_model.pkl")
+    joblib.dump(svc, svm_path)
+    convert_svm(svm_path)
+    assert isinstance(load_svm(svm_path), LinearSVMScorer)
+
+    retrained, _ = _fit(3, seed=2)
+    joblib.dump(retrained, svm_path)  # Old _linear.npz still on disk
+    with pytest.warns(UserWarning, match="different svm_model.pkl"):
+        model = load_svm(svm_path)
+    assert isinstance(model, SVC)
+    np.testing.assert_allclose(model.predict_proba(X), retrained.predict_proba(X))
+
+
+def test_model_version_tracks_the_converted_scorer(tmp_path):
+    import joblib
+    from engine_wrapper import model_version
+
+    svc, _ = _fit(2)
+    svm_path = str(tmp_path / "svm_model.pkl")
+    joblib.dump(svc, svm_path)
+    before = model_version(str(tmp_path), svm_path, svm_path, "torch", None)
+    convert_svm(svm_path)
+    assert model_version(str(tmp_path), svm_path, svm_path, "torch", None) != before
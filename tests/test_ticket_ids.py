@@ -0,0 +1,60 @@
+import sqlite3
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import database as db
+
+
+def add_tickets_in_process(path, n):
+    db.configure(path)
+    return [db.add_ticket("proc", "Proc", "Title", "Description", "Hardware", "High") for _ in range(n)]
+
+
+def test_concurrent_add_ticket_ids_are_unique(temp_db):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        threaded = list(pool.map(lambda i: db.add_ticket(f"u{i}", "U", "T", "D", "Network", "Low"), range(200)))
+        bulk = [ids for ids in pool.map(lambda i: db.add_tickets_bulk([("b", "B", "T", "D", "Access", "Low")] * 25),
+                                        range(4))]
+    with multiprocessing.get_context("spawn").Pool(3) as procs:
+        processes = procs.starmap(add_tickets_in_process, [(db._pool.path, 50)] * 3)
+
+    returned = threaded + [i for ids in bulk for i in ids] + [i for ids in processes for i in ids]
+    assert len(returned) == 200 + 100 + 150
+    assert len(set(returned)) == len(returned)
+    with db.connection() as conn:
+        stored = [row[0] for row in conn.execute("SELECT ticket_id FROM tickets")]
+    assert sorted(stored) == sorted(returned)
+
+
+def test_backfill_fixes_duplicate_ids(tmp_path):
+    # A table migrated with ALTER TABLE: no UNIQUE on ticket_id, IDs from the old TIC-HHMMSS-<id> scheme
+    path = str(tmp_path / "legacy.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute('''
+            CREATE TABLE tickets (id INTEGER PRIMARY KEY AUTOINCREMENT, ticket_id TEXT, user_id TEXT NOT NULL,
+                                  user_name TEXT, description TEXT NOT NULL, category TEXT, priority TEXT,
+                                  status TEXT DEFAULT 'Open', created_at TIMESTAMP)
+        ''')
+        conn.executemany("INSERT INTO tickets (ticket_id, user_id, description, created_at) VALUES (?, 'u', 'd', ?)",
+                         [("TIC-101500-1", "2025-01-01 10:15:00"), ("TIC-101500-1", "2025-01-02 10:15:00"),
+                          ("TIC-101500-1", "2025-01-03 10:15:00"), (None, "2025-01-04 09:00:00"),
+                          ("TIC-090000-5", "2025-01-05 09:00:00")])
+
+    original = db._pool.path
+    db.configure(path)
+    try:
+        db.init_db()
+        with db.connection() as conn:
+            ids = [row[0] for row in conn.execute("SELECT ticket_id FROM tickets ORDER BY id")]
+            assert len(set(ids)) == 5 and None not in ids
+            assert ids[0] == "TIC-101500-1" and ids[4] == "TIC-090000-5"  # The oldest keeps its ID
+            assert ids[1].startswith("TIC-250102-") and ids[3].startswith("TIC-250104-")
+            with pytest.raises(sqlite3.IntegrityError):
+                conn.execute("INSERT INTO tickets (ticket_id, user_id, description) VALUES (?, 'u', 'd')", (ids[2],))
+        assert db.backfill_ticket_ids() == 0
+        # New IDs never collide with the backfilled ones
+        assert db.add_ticket("u", "U", "T", "D", "Hardware", "Low") not in ids
+    finally:
+        db.configure(original)
@@ -0,0 +1,111 @@
+import time
+import pytest
+
+from worker_pool import InferencePool
+
+
+@pytest.fixture
+def pool(tiny_models):
+    pool = InferencePool(*tiny_models, n_workers=1, health_interval=0, restart_backoff=0.05,
+                         engine_kwargs={"backend": "torch"})
+    assert pool.wait_ready(timeout=120)
+    yield pool
+    pool.shutdown()
+
+
+def _wait_for(predicate, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_pool_serves_requests(pool):
+    results = pool.process_tickets(["My laptop screen is broken", "I forgot my password"], timeout=60)
+    assert len(results) == 2
+
+
+def test_health_pings_do_not_leak_inflight(pool):
+    worker = pool._workers[0]
+    for _ in range(3):
+        assert pool.health(timeout=30)[0]["healthy"]
+    worker.process.kill()
+    worker.process.join()
+    assert not pool.health(timeout=0.5)[0]["healthy"]
+    assert worker.inflight == {}
+
+
+def test_killed_worker_never_strands_requests(pool):
+    worker = pool._workers[0]
+    worker.process.kill()
+    # Every request submitted around the exit and restart resolves one way or the other
+    futures = [pool.submit(["My network drive is full"]) for _ in range(20)]
+    for future in futures:
+        try:
+            future.result(timeout=60)
+        except RuntimeError:
+            pass
+    assert pool.wait_ready(timeout=120)
+    assert worker.restarts == 1
+    assert len(pool.process_tickets(["Need admin rights"], timeout=60)) == 1
+
+
+def test_crash_looping_worker_is_given_up(tmp_path):
+    pool = InferencePool(str(tmp_path / "missing"), "missing.pkl", "missing.pkl", n_workers=1,
+                         share_weights=False, health_interval=0, max_restarts=2, restart_backoff=0.05)
+    try:
+        worker = pool._workers[0]
+        _wait_for(lambda: worker.dead, timeout=180)
+        assert worker.restarts == 2
+        assert not pool.wait_ready(timeout=1)
+        with pytest.raises(RuntimeError, match="No inference workers"):
+            pool.process_tickets(["anything"], timeout=5)
+    finally:
+        pool.shutdown()
+
+
+def test_default_backend_is_resolved_like_the_engine(tiny_models):
+    import engine_wrapper as ew
+
+    ew.export_torchscript(tiny_models[0])
+    pool = InferencePool(*tiny_models, n_workers=1, health_interval=0)  # backend defaults to "auto"
+    try:
+        assert pool._shared_model is None  # The export is served, not shared eager weights
+        assert pool.wait_ready(timeout=120)
+        assert pool.stats()[0]["backend"] == "torchscript"
+    finally:
+        pool.shutdown()
+
+
+def test_pool_serves_the_inference_service(tiny_models):
+    import json
+    import asyncio
+    import threading
+    import urllib.request
+    from engine_wrapper import ProfessionalTicketEngine
+    from inference_service import InferenceService
+
+    texts = ["My laptop screen is broken", "I forgot my password", "Need admin rights", "Order a monitor",
+             "Payroll question"]
+    expected = ProfessionalTicketEngine(*tiny_models, backend="torch").process_tickets(texts)
+
+    service = InferenceService(lambda: InferencePool(*tiny_models, n_workers=2, health_interval=0))
+    loop = asyncio.new_event_loop()
+    port = loop.run_until_complete(service.start("127.0.0.1", 0))
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    try:
+        pool = service.loader.wait(180)
+        # A batch is split over both workers and comes back in order
+        results = pool.process_tickets(texts, timeout=60)
+        assert [r["category"] for r in results] == [r["category"] for r in expected]
+        assert all(w["ready"] for w in pool.stats())
+
+        request = urllib.request.Request(f"http://127.0.0.1:{port}/classify/batch", method="POST",
+                                         data=json.dumps({"texts": texts}).encode())
+        with urllib.request.urlopen(request, timeout=60) as response:
+            served = json.loads(response.read())["results"]
+        assert [r["category"] for r in served] == [r["category"] for r in expected]
+    finally:
+        asyncio.run_coroutine_threadsafe(service.stop(), loop).result(30)
+        loop.call_soon_threadsafe(loop.stop)
+    assert not any(w.process.is_alive() for w in pool._workers)
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+import database as db
+from write_behind import WriteBehindQueue
+
+
+@pytest.fixture
+def writer(temp_db):
+    queue = WriteBehindQueue(max_wait_ms=500)
+    yield queue
+    queue.close()
+
+
+def ticket_ids():
+    with db.connection() as conn:
+        return {row[0] for row in conn.execute("SELECT ticket_id FROM tickets")}
+
+
+def test_ticket_id_is_returned_before_the_commit(writer):
+    started = time.perf_counter()
+    ticket_id = writer.add_ticket("u", "U", "Title", "Description", "Hardware", "High")
+    assert time.perf_counter() - started < 0.25  # Well inside the 500 ms batching window
+    assert ticket_id.startswith("TIC-") and ticket_id not in ticket_ids()
+
+    writer.flush(timeout=5)
+    assert db.get_ticket_by_ticket_id(ticket_id)[1] == ticket_id
+
+
+def test_flush_and_close_make_rows_durable(writer):
+    first = [writer.add_ticket(f"u{i}", "U", "T", "D", "Network", "Low") for i in range(20)]
+    writer.add_comment(1, "u0", "U", "First comment")
+    writer.add_feedback("u0", "U", "u@example.com", "General", "Nice", 5)
+    writer.add_model_feedback(first[0], "Network", "Hardware", 0.5)
+    writer.flush(timeout=5)
+    assert ticket_ids() == set(first)
+    assert len(db.get_ticket_comments(1)) == 1
+    assert len(db.get_all_feedback()) == 1
+    assert db.get_model_feedback_stats()[0] == 1
+
+    second = [writer.add_ticket(f"v{i}", "V", "T", "D", "Access", "Low") for i in range(20)]
+    writer.close()
+    assert ticket_ids() == set(first + second)
+    stats = writer.stats()
+    assert stats["committed"] == stats["submitted"] == 43 and stats["failed"] == 0
+    assert stats["queue_depth"] == 0
+
+
+def test_inserts_after_close_go_straight_to_the_database(writer):
+    writer.close()
+    ticket_id = writer.add_ticket("u", "U", "T", "D", "Hardware", "Low")
+    assert ticket_id in ticket_ids()
+    writer.flush(timeout=1)  # Returns at once after close()
+    assert writer.stats()["submitted"] == 0
+
+
+def test_a_failing_row_does_not_drop_its_batch(writer):
+    good = [writer.add_ticket(f"u{i}", "U", "T", "D", "Hardware", "Low") for i in range(5)]
+    bad = writer.add_ticket(None, "U", "T", "D", "Hardware", "Low")  # user_id is NOT NULL
+    good += [writer.add_ticket(f"w{i}", "W", "T", "D", "Hardware", "Low") for i in range(5)]
+    writer.flush(timeout=5)
+
+    assert ticket_ids() == set(good) and bad not in ticket_ids()
+    stats = writer.stats()
+    assert stats["batches"] == 1  # All in one transaction, which failed and was retried row by row
+    assert stats["committed"] == 10 and stats["failed"] == 1
+    assert "IntegrityError" in stats["last_error"]
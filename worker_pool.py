@@ -0,0 +1,324 @@
+import os
+import time
+import itertools
+import threading
+from concurrent.futures import Future
+
+# Multi-process inference pool for ProfessionalTicketEngine.
+# N worker processes each run the ensemble and serve process_tickets() requests
+# over a local pipe. With the eager torch backend the DistilBERT weights are
+# loaded once in the parent and moved to shared memory, so workers map the same
+# pages instead of holding N copies in RSS. Each worker pins torch to
+# `threads_per_worker` intra-op threads so the pool doesn't oversubscribe cores.
+# torch is imported lazily so importing this module stays cheap.
+#
+# A worker that exits is restarted with exponential backoff. One that keeps
+# dying before it becomes ready (e.g. the engine fails to load) is given up on
+# after `max_restarts` attempts; requests then go to the remaining workers or,
+# if none are left, fail immediately instead of waiting forever.
+
+
+def _worker_main(conn, bert_path, svm_path, tfidf_path, engine_kwargs, threads, shared_model,
+                 prediction_cache=None):
+    # Thread limits must be in place before torch spins up its thread pools
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+    from engine_wrapper import ProfessionalTicketEngine, TorchBackend
+
+    engine_kwargs = dict(engine_kwargs)
+    if shared_model is not None:
+        engine_kwargs["backend"] = TorchBackend(bert_path, model=shared_model)
+    if prediction_cache is not None:
+        # Each worker has its own LRU in front of the shared prediction_cache table
+        from prediction_cache import PredictionCache
+        engine_kwargs["cache"] = PredictionCache(**prediction_cache)
+    engine = ProfessionalTicketEngine(bert_path, svm_path, tfidf_path, **engine_kwargs)
+    engine.warm_up()
+    conn.send(("ready", True, (os.getpid(), engine.bert_backend.name)))
+
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            break  # Parent went away
+        if msg is None:
+            break
+        kind, req_id, payload = msg
+        if kind == "ping":
+            conn.send((req_id, True, os.getpid()))
+            continue
+        try:
+            conn.send((req_id, True, engine.process_tickets(payload)))
+        except Exception as e:
+            conn.send((req_id, False, f"{type(e).__name__}: {e}"))
+    conn.close()
+
+
+class _Worker:
+    def __init__(self, slot):
+        self.slot = slot
+        self.process = None
+        self.conn = None
+        self.pid = None
+        self.backend = None
+        self.ready = threading.Event()
+        self.send_lock = threading.Lock()
+        self.inflight = {}
+        self.restarts = 0
+        self.failures = 0    # Consecutive exits without becoming ready (reset once ready)
+        self.dead = False    # Gave up restarting
+
+
+class InferencePool:
+    def __init__(self, bert_path, svm_path, tfidf_path, n_workers=2, threads_per_worker=1,
+                 engine_kwargs=None, share_weights=True, health_interval=10.0, health_timeout=30.0,
+                 max_restarts=5, restart_backoff=1.0, max_backoff=30.0, prediction_cache=None):
+        import torch.multiprocessing as mp
+
+        self.bert_path = bert_path
+        self.svm_path = svm_path
+        self.tfidf_path = tfidf_path
+        self.threads_per_worker = threads_per_worker
+        self.engine_kwargs = dict(engine_kwargs or {})
+        self.prediction_cache = prediction_cache  # PredictionCache kwargs, or None for no cache
+        self.health_timeout = health_timeout
+        self.max_restarts = max_restarts
+        self.restart_backoff = restart_backoff
+        self.max_backoff = max_backoff
+        self._ctx = mp.get_context("spawn")
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._closing = False
+
+        # Resolve the backend as the engine would ("auto": onnx -> torchscript -> torch).
+        # If that ends at eager torch, load BERT once and put its parameters in shared
+        # memory; spawned workers receive handles to the same storage instead of copies.
+        # Otherwise every worker loads the same exported artifact.
+        self._shared_model = None
+        backend = self.engine_kwargs.get("backend", "auto")
+        if share_weights and isinstance(backend, str):
+            from engine_wrapper import load_backend
+            resolved = load_backend(bert_path, backend)
+            if resolved.name == "torch":
+                self._shared_model = resolved.model
+                self._shared_model.share_memory()
+                self.engine_kwargs.pop("backend", None)
+            else:
+                self.engine_kwargs["backend"] = resolved.name
+
+        self._workers = [_Worker(slot) for slot in range(n_workers)]
+        with self._lock:
+            for worker in self._workers:
+                self._start(worker)
+
+        if health_interval:
+            threading.Thread(target=self._health_loop, args=(health_interval,),
+                             name="pool-health", daemon=True).start()
+
+    # --- Public API (same shape as ProfessionalTicketEngine) ---
+    def submit(self, texts):
+        """Send a batch to the least-loaded worker. Returns a Future for the list of results."""
+        if self._closing:
+            raise RuntimeError("InferencePool has been shut down")
+        future = Future()
+        req_id = next(self._ids)
+        with self._lock:
+            # Workers between an exit and their restart have no connection
+            live = [w for w in self._workers if w.conn is not None]
+            if not live:
+                future.set_exception(RuntimeError("No inference workers available"))
+                return future
+            worker = min(live, key=lambda w: (not w.ready.is_set(), len(w.inflight)))
+            worker.inflight[req_id] = future
+            conn = worker.conn
+        self._send(worker, conn, ("tickets", req_id, list(texts)), req_id)
+        return future
+
+    def process_tickets(self, texts, timeout=None):
+        """Categorize a batch, split evenly over the live workers so they run it in parallel."""
+        texts = list(texts)
+        if not texts:
+            return []
+        live = max(1, sum(w.conn is not None for w in self._workers))
+        size = -(-len(texts) // live)
+        futures = [self.submit(texts[i:i + size]) for i in range(0, len(texts), size)]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        results = []
+        for future in futures:
+            results.extend(future.result(None if deadline is None else max(0, deadline - time.monotonic())))
+        return results
+
+    def process_ticket(self, text, timeout=None):
+        return self.process_tickets([text], timeout=timeout)[0]
+
+    def warm_up(self, timeout=None):
+        """Block until every worker has loaded and warmed up its engine (EngineLoader calls this)."""
+        if not self.wait_ready(timeout):
+            raise RuntimeError("Inference workers failed to start; see health()")
+
+    def wait_ready(self, timeout=None):
+        """True once every worker is ready; False on timeout or if a worker was given up on."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for worker in self._workers:
+            while not worker.ready.wait(0.1):
+                if worker.dead or (deadline is not None and time.monotonic() >= deadline):
+                    return False
+        return True
+
+    def stats(self):
+        """Per-worker state without pinging (cheap enough for a status page)."""
+        with self._lock:
+            return [{"slot": w.slot, "pid": w.pid, "backend": w.backend, "ready": w.ready.is_set(),
+                     "inflight": len(w.inflight), "restarts": w.restarts, "dead": w.dead}
+                    for w in self._workers]
+
+    def health(self, timeout=2.0):
+        """Ping every worker. Returns one status dict per worker slot."""
+        pings = []
+        for worker in self._workers:
+            future = Future()
+            req_id = next(self._ids)
+            started = time.monotonic()
+            with self._lock:
+                worker.inflight[req_id] = future
+                conn = worker.conn
+            self._send(worker, conn, ("ping", req_id, None), req_id)
+            pings.append((worker, req_id, future, started))
+
+        status = []
+        for worker, req_id, future, started in pings:
+            try:
+                future.result(timeout=timeout)
+                healthy, latency = True, round((time.monotonic() - started) * 1000, 1)
+            except Exception:
+                healthy, latency = False, None
+            with self._lock:
+                worker.inflight.pop(req_id, None)  # Unanswered pings must not count as load forever
+            status.append({
+                "slot": worker.slot,
+                "pid": worker.pid,
+                "backend": worker.backend,
+                "alive": worker.process.is_alive(),
+                "healthy": healthy,
+                "ping_ms": latency,
+                "inflight": len(worker.inflight),
+                "restarts": worker.restarts,
+                "dead": worker.dead,
+            })
+        return status
+
+    def shutdown(self, timeout=5.0):
+        with self._lock:
+            # Taken so no restart is half-way through _start() while we stop the workers
+            self._closing = True
+            workers = [(w, w.conn, w.process) for w in self._workers]
+        for worker, conn, _ in workers:
+            self._send(worker, conn, None)
+        for _, _, process in workers:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+    # --- Internals ---
+    def _start(self, worker):
+        # Caller holds self._lock, so submit() never sees a half-installed worker
+        parent_conn, child_conn = self._ctx.Pipe()
+        worker.ready.clear()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.bert_path, self.svm_path, self.tfidf_path,
+                  self.engine_kwargs, self.threads_per_worker, self._shared_model, self.prediction_cache),
+            name=f"inference-worker-{worker.slot}",
+            daemon=True,
+        )
+        process.start()
+        worker.process = process
+        child_conn.close()  # So recv() raises EOFError when the worker dies
+        worker.conn = parent_conn
+        threading.Thread(target=self._read, args=(worker, parent_conn),
+                         name=f"pool-reader-{worker.slot}", daemon=True).start()
+
+    def _send(self, worker, conn, msg, req_id=None):
+        """Send on `conn`; if that fails, fail the request's future instead of leaving it pending."""
+        try:
+            if conn is None:
+                raise OSError("worker is restarting")
+            with worker.send_lock:
+                conn.send(msg)
+        except (OSError, ValueError) as e:
+            if req_id is None:
+                return
+            with self._lock:
+                future = worker.inflight.pop(req_id, None)
+            if future is not None:
+                _fail(future, RuntimeError(f"Inference worker {worker.slot} unavailable: {e}"))
+
+    def _read(self, worker, conn):
+        while True:
+            try:
+                req_id, ok, payload = conn.recv()
+            except (EOFError, OSError):
+                break
+            if req_id == "ready":
+                worker.pid, worker.backend = payload
+                worker.failures = 0
+                worker.ready.set()
+                continue
+            with self._lock:
+                future = worker.inflight.pop(req_id, None)
+            if future is None:
+                continue
+            if ok:
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+        self._on_exit(worker, conn)
+
+    def _on_exit(self, worker, conn):
+        with self._lock:
+            if worker.conn is not conn:
+                return  # Already replaced
+            # Swap under the lock: from here on submit() skips this worker until it is restarted
+            failed, worker.inflight = worker.inflight, {}
+            worker.conn = None
+            if not worker.ready.is_set():
+                worker.failures += 1
+            worker.ready.clear()
+            give_up = worker.failures > self.max_restarts
+            worker.dead = give_up
+        for future in failed.values():
+            _fail(future, RuntimeError(f"Inference worker {worker.slot} exited"))
+        worker.process.join(1.0)
+        if self._closing or give_up:
+            return
+
+        # Back off while the worker keeps dying before it gets ready (e.g. the engine fails to load)
+        delay = min(self.max_backoff, self.restart_backoff * (2 ** (worker.failures - 1))) if worker.failures else 0.0
+        time.sleep(delay)
+        with self._lock:
+            if self._closing:
+                return
+            worker.restarts += 1
+            self._start(worker)
+
+    def _health_loop(self, interval):
+        while not self._closing:
+            time.sleep(interval)
+            if self._closing:
+                break
+            for status in self.health(timeout=self.health_timeout):
+                worker = self._workers[status["slot"]]
+                # A hung worker is killed; its reader sees EOF and restarts it
+                if worker.ready.is_set() and not status["healthy"] and worker.process.is_alive():
+                    worker.process.kill()
+
+
+def _fail(future, exc):
+    # The reader and a failed send can race to fail the same future
+    if not future.done():
+        try:
+            future.set_exception(exc)
+        except Exception:
+            pass
@@ -0,0 +1,198 @@
+import os
+import time
+import queue
+import atexit
+import threading
+from datetime import datetime
+from concurrent.futures import Future
+import database as db
+from metrics import REGISTRY as metrics
+
+# Optional write-behind queue for the insert paths (tickets, comments, feedback,
+# model feedback). Instead of every request thread taking the SQLite write lock
+# and committing on its own, inserts are queued and one writer thread commits
+# everything that arrived within a few milliseconds in a single transaction.
+#
+# add_ticket() still returns the ticket ID straight away: IDs are handed out
+# from a block reserved in ticket_id_sequence (one small write per `id_block`
+# tickets), so they stay unique across processes. Numbers left in a block at
+# shutdown are skipped, as with any reservation.
+#
+# Queued rows are committed within max_wait_ms; call flush() before reading
+# them back (e.g. before st.rerun()). close(), also registered with atexit,
+# drains the queue, so nothing accepted is lost on a clean shutdown. Insert
+# errors are not raised to the caller, who has already moved on; they are
+# counted in stats() instead.
+#
+# Enabled in the UI with SERVICE_DESK_WRITE_BEHIND=1 (see shared_writer()).
+
+INSERTS = {
+    "ticket": db.add_ticket,
+    "comment": db.add_comment,
+    "feedback": db.add_feedback,
+    "model_feedback": db.add_model_feedback,
+}
+
+_FLUSH = "flush"
+
+
+class WriteBehindQueue:
+    def __init__(self, max_batch_size=256, max_wait_ms=5, max_queue_size=10000, id_block=16):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.id_block = id_block
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()  # Orders submits against close()
+        self._ids = iter(())
+        self._stats = {
+            "submitted": 0,
+            "committed": 0,
+            "failed": 0,
+            "batches": 0,
+            "last_batch_size": 0,
+            "max_batch_size_seen": 0,
+            "last_commit_ms": 0.0,
+            "last_error": None,
+        }
+        self._stopped = False
+        self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    # --- Same signatures as the database.py inserts ---
+    def add_ticket(self, user_id, user_name, title, description, category, priority):
+        created_at = datetime.now()
+        ticket_id = db.format_ticket_id(self._next_seq(), created_at)
+        self._submit("ticket", (user_id, user_name, title, description, category, priority, ticket_id, created_at))
+        return ticket_id
+
+    def add_comment(self, ticket_id, user_id, user_name, comment, is_internal=0):
+        self._submit("comment", (ticket_id, user_id, user_name, comment, is_internal, datetime.now()))
+
+    def add_feedback(self, user_id, user_name, email, feedback_type, message, rating):
+        self._submit("feedback", (user_id, user_name, email, feedback_type, message, rating, datetime.now()))
+
+    def add_model_feedback(self, ticket_id, predicted_category, actual_category, confidence,
+                           feedback_type='misclassification'):
+        self._submit("model_feedback", (ticket_id, predicted_category, actual_category, confidence,
+                                        feedback_type, datetime.now()))
+
+    def flush(self, timeout=None):
+        """Block until everything queued before this call is committed."""
+        future = Future()
+        with self._state_lock:
+            if self._stopped:
+                return  # close() already committed everything
+            self._queue.put((_FLUSH, future))
+        future.result(timeout=timeout)
+
+    def close(self):
+        """Commit whatever is queued and stop the writer thread. Later inserts are written directly."""
+        with self._state_lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._queue.put(None)
+        self._worker.join()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["avg_batch_size"] = round(stats["committed"] / stats["batches"], 2) if stats["batches"] else 0.0
+        return stats
+
+    def _next_seq(self):
+        with self._lock:
+            seq = next(self._ids, None)
+            if seq is None:
+                self._ids = iter(db.reserve_ticket_sequence(self.id_block))
+                seq = next(self._ids)
+            return seq
+
+    def _submit(self, kind, args):
+        with self._state_lock:
+            stopped = self._stopped
+            if not stopped:
+                self._queue.put((kind, args))  # Blocks when full: backpressure instead of unbounded memory
+        if stopped:
+            INSERTS[kind](*args)
+            return
+        with self._lock:
+            self._stats["submitted"] += 1
+
+    def _collect(self):
+        # Block for the first item, then gather more until the batch is full or max_wait expires
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _commit(self, rows):
+        started = time.perf_counter()
+        failed, error = 0, None
+        try:
+            with metrics.time("db.write_behind.commit"):
+                with db.connection(write=True):
+                    for kind, args in rows:
+                        INSERTS[kind](*args)
+        except Exception:
+            # One bad row must not take the rest of the batch with it: retry them one by one
+            for kind, args in rows:
+                try:
+                    INSERTS[kind](*args)
+                except Exception as e:
+                    failed += 1
+                    error = f"{kind}: {type(e).__name__}: {e}"
+        with self._lock:
+            self._stats["committed"] += len(rows) - failed
+            self._stats["failed"] += failed
+            self._stats["batches"] += 1
+            self._stats["last_batch_size"] = len(rows)
+            self._stats["max_batch_size_seen"] = max(self._stats["max_batch_size_seen"], len(rows))
+            self._stats["last_commit_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            if error:
+                self._stats["last_error"] = error
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+            rows = [item for item in batch if item[0] != _FLUSH]
+            if rows:
+                self._commit(rows)
+            for kind, future in batch:
+                if kind == _FLUSH:
+                    future.set_result(None)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_writer():
+    """The process-wide queue when SERVICE_DESK_WRITE_BEHIND=1, otherwise None (write directly)."""
+    global _shared
+    if os.environ.get("SERVICE_DESK_WRITE_BEHIND", "") not in ("1", "true", "yes"):
+        return None
+    with _shared_lock:
+        if _shared is None:
+            _shared = WriteBehindQueue()
+        return _shared